@@ -3,12 +3,14 @@ AI面试官：支持完整面试流程的智能面试助手
 """
 import json
 import re
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
+from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from core.config import get_llm
+from core.config import get_llm, with_json_mode
+from core.json_stream import IncrementalJSONParser, extract_json_object, parse_bool
 from services.interview_session import InterviewSession, InterviewStage
 from services.question_bank import QuestionBank
 
@@ -18,6 +20,10 @@ class Interviewer:
     
     def __init__(self, model: Optional[str] = None) -> None:
         self.llm = get_llm(model=model)
+        # 提示词固定（或同一简历/职位重复请求）的调用走持久化响应缓存
+        self.cached_llm = get_llm(model=model, cache=True)
+        # 评估和总结要求模型输出 JSON，开启 JSON 模式避免解析失败
+        self.json_llm = with_json_mode(self.llm)
         self.question_bank = QuestionBank()
     
     def generate_opening(self, resume_content: str, job_requirements: Optional[str] = None) -> str:
@@ -31,32 +37,62 @@ class Interviewer:
         Returns:
             开场白文本
         """
+        chain = self._opening_prompt(resume_content, job_requirements) | self.cached_llm | StrOutputParser()
+        return chain.invoke({})
+    
+    async def agenerate_opening(self, resume_content: str, job_requirements: Optional[str] = None) -> str:
+        """异步生成面试开场白"""
+        chain = self._opening_prompt(resume_content, job_requirements) | self.cached_llm | StrOutputParser()
+        return await chain.ainvoke({})
+    
+    async def astream_opening(
+        self,
+        resume_content: str,
+        job_requirements: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """流式生成面试开场白（走响应缓存，流式调用会一次性返回完整结果）"""
+        chain = self._opening_prompt(resume_content, job_requirements) | self.cached_llm | StrOutputParser()
+        async for token in chain.astream({}):
+            yield token
+    
+    def _opening_prompt(self, resume_content: str, job_requirements: Optional[str] = None) -> ChatPromptTemplate:
+        """构建开场白提示词"""
         context = f"简历内容：\n{resume_content[:2000]}\n"  # 限制长度
         if job_requirements:
             context += f"\n职位要求：\n{job_requirements}"
         
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官。"
                         "根据职位要求和当前岗位竞争者水平，评价面试者的简历。"
                         "要做到真实、客观，以高要求、严格的方式对待面试者，不应该太客气。"
                         "现在需要你做一个简洁的面试开场白（2-3句话），欢迎面试者并说明面试流程。"),
             ("human", context + "\n\n请生成面试开场白："),
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({})
     
     def ask_self_introduction(self) -> str:
         """请面试者自我介绍"""
-        prompt = ChatPromptTemplate.from_messages([
+        chain = self._self_introduction_prompt() | self.cached_llm | StrOutputParser()
+        return chain.invoke({})
+    
+    async def aask_self_introduction(self) -> str:
+        """异步请面试者自我介绍"""
+        chain = self._self_introduction_prompt() | self.cached_llm | StrOutputParser()
+        return await chain.ainvoke({})
+    
+    async def astream_self_introduction(self) -> AsyncIterator[str]:
+        """流式生成自我介绍请求（走响应缓存，流式调用会一次性返回完整结果）"""
+        chain = self._self_introduction_prompt() | self.cached_llm | StrOutputParser()
+        async for token in chain.astream({}):
+            yield token
+    
+    def _self_introduction_prompt(self) -> ChatPromptTemplate:
+        """构建自我介绍请求提示词"""
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官。"
                         "现在面试刚开始，请礼貌地请面试者做一个自我介绍。"
                         "只需要一句话即可。"),
             ("human", "请让面试者做自我介绍"),
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({})
     
     def generate_project_questions(
         self,
@@ -73,6 +109,28 @@ class Interviewer:
         Returns:
             问题列表
         """
+        prompt, target_count = self._project_questions_prompt(session, question_count)
+        chain = prompt | self.llm | StrOutputParser()
+        response = chain.invoke({"count": target_count})
+        return self._parse_project_questions(response, target_count)
+    
+    async def agenerate_project_questions(
+        self,
+        session: InterviewSession,
+        question_count: int = 1,
+    ) -> List[str]:
+        """异步根据简历生成项目相关问题"""
+        prompt, target_count = self._project_questions_prompt(session, question_count)
+        chain = prompt | self.llm | StrOutputParser()
+        response = await chain.ainvoke({"count": target_count})
+        return self._parse_project_questions(response, target_count)
+    
+    def _project_questions_prompt(
+        self,
+        session: InterviewSession,
+        question_count: int,
+    ) -> Tuple[ChatPromptTemplate, int]:
+        """构建项目问题提示词，返回 (提示词, 目标问题数)"""
         resume_content = session.resume_content or ""
         job_requirements = session.job_requirements or ""
         
@@ -100,11 +158,10 @@ class Interviewer:
                         "请生成{count}个项目相关的问题，只输出问题，不要输出任何其他内容，每个问题一行，用序号标记。"),
             ("human", context + "\n\n请生成项目问题："),
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        response = chain.invoke({"count": target_count})
-        
-        # 解析问题列表
+        return prompt, target_count
+    
+    def _parse_project_questions(self, response: str, target_count: int) -> List[str]:
+        """解析问题列表"""
         questions = []
         for line in response.split('\n'):
             line = line.strip()
@@ -134,45 +191,230 @@ class Interviewer:
         Returns:
             (分数, 反馈, 是否追问)
         """
+        chain = self._evaluation_prompt(question, answer, resume_content) | self.json_llm | StrOutputParser()
+        response = chain.invoke({})
+        return self._parse_evaluation(response)
+    
+    async def aevaluate_answer(
+        self,
+        question: str,
+        answer: str,
+        resume_content: Optional[str] = None,
+    ) -> Tuple[int, str, Optional[str]]:
+        """异步评估面试者回答并打分"""
+        chain = self._evaluation_prompt(question, answer, resume_content) | self.json_llm | StrOutputParser()
+        response = await chain.ainvoke({})
+        return self._parse_evaluation(response)
+    
+    def _evaluation_prompt(
+        self,
+        question: str,
+        answer: str,
+        resume_content: Optional[str] = None,
+        with_followup: bool = False,
+    ) -> ChatPromptTemplate:
+        """构建回答评估提示词，with_followup=True 时要求同时给出追问问题"""
         context = f"问题：{question}\n回答：{answer}\n"
         if resume_content:
             context += f"\n简历内容（参考）：\n{resume_content[:1000]}"
         
-        prompt = ChatPromptTemplate.from_messages([
+        if with_followup:
+            return ChatPromptTemplate.from_messages([
+                ("system", "你是一位专业的高级JAVA开发工程师面试官。"
+                            "请评估面试者的回答：\n"
+                            "1. 给出客观的分数（0-100分），必须客观，不要虚高；\n"
+                            "2. 提供结构化反馈，指出优点和不足；\n"
+                            "3. 判断是否需要追问（如果回答有明显漏洞、逻辑不清，或需要深入时追问）；\n"
+                            "4. 如果明显缺乏实际经验、只是背诵或随意回答，给低分并说明理由；\n"
+                            "5. 如果需要追问，直接给出一个简洁明确、有面试价值的追问问题。\n\n"
+                            "请以JSON格式返回，字段按以下顺序输出：{{\"score\": 分数, \"need_followup\": true/false, \"followup_reason\": \"追问原因（如果需要追问）\", \"followup_question\": \"追问问题（如果需要追问）\", \"feedback\": \"反馈内容\"}}"),
+                ("human", context + "\n\n请评估这个回答："),
+            ])
+        
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官。"
                         "请评估面试者的回答：\n"
                         "1. 给出客观的分数（0-100分），必须客观，不要虚高；\n"
                         "2. 提供结构化反馈，指出优点和不足；\n"
                         "3. 判断是否需要追问（如果回答有明显漏洞、逻辑不清，或需要深入时追问）；\n"
                         "4. 如果明显缺乏实际经验、只是背诵或随意回答，给低分并说明理由。\n\n"
-                        "请以JSON格式返回：{{\"score\": 分数, \"feedback\": \"反馈内容\", \"need_followup\": true/false, \"followup_reason\": \"追问原因（如果需要追问）\"}}"),
+                        "请以JSON格式返回，字段按以下顺序输出：{{\"score\": 分数, \"need_followup\": true/false, \"followup_reason\": \"追问原因（如果需要追问）\", \"feedback\": \"反馈内容\"}}"),
             ("human", context + "\n\n请评估这个回答："),
         ])
+    
+    async def astream_evaluation(
+        self,
+        question: str,
+        answer: str,
+        resume_content: Optional[str] = None,
+        with_followup: bool = False,
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        流式评估面试者回答，每个字段输出完整时立即返回
         
-        chain = prompt | self.llm | StrOutputParser()
-        response = chain.invoke({})
+        提示词要求 score、need_followup、followup_reason 先于 feedback 输出，
+        调用方可以在反馈文本生成期间就决定是否追问。
         
-        # 解析JSON响应
-        try:
-            # 提取JSON部分
-            json_match = re.search(r'\{[^}]+\}', response, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                # 如果没找到JSON，尝试解析整段文本
-                result = {"score": 70, "feedback": response, "need_followup": False}
+        Args:
+            question: 问题
+            answer: 回答
+            resume_content: 简历内容
+            with_followup: 是否同时生成追问问题
             
+        Returns:
+            (字段名, 值) 的异步迭代器；最后一项为 ("result", 完整结果字典)，
+            字典包含 score、feedback、need_followup、followup_reason、followup_question
+        """
+        chain = self._evaluation_prompt(question, answer, resume_content, with_followup) | self.json_llm | StrOutputParser()
+        parser = IncrementalJSONParser()
+        async for token in chain.astream({}):
+            for key, value in parser.feed(token):
+                yield key, value
+        
+        result = parser.fields if parser.done else extract_json_object(parser.text)
+        yield "result", self._evaluation_fields(result, parser.text)
+    
+    def _parse_evaluation(self, response: str) -> Tuple[int, str, Optional[str]]:
+        """解析评估结果JSON"""
+        result = self._evaluation_fields(extract_json_object(response), response)
+        return result["score"], result["feedback"], result["followup_reason"]
+    
+    def _parse_evaluation_with_followup(
+        self,
+        response: str,
+    ) -> Tuple[int, str, Optional[str], Optional[str]]:
+        """解析带追问问题的评估结果JSON"""
+        result = self._evaluation_fields(extract_json_object(response), response)
+        return result["score"], result["feedback"], result["followup_reason"], result["followup_question"]
+    
+    def _evaluation_fields(self, result: Optional[Dict], response: str) -> Dict:
+        """规范化评估结果字段，不需要追问时 followup_reason 和 followup_question 为 None"""
+        if result is None:
+            # 没有合法JSON，整段文本作为反馈
+            print(f"评估结果中没有找到JSON，使用默认分数, 响应: {response}")
+            result = {"score": 70, "feedback": response, "need_followup": False}
+        
+        try:
             score = int(result.get("score", 70))
-            feedback = result.get("feedback", "回答基本符合要求")
-            need_followup = result.get("need_followup", False)
-            followup_reason = result.get("followup_reason")
-            
-            return score, feedback, followup_reason if need_followup else None
+        except (TypeError, ValueError):
+            print(f"解析评估分数失败, 响应: {response}")
+            score = 70
+        
+        need_followup = parse_bool(result.get("need_followup", False))
+        return {
+            "score": score,
+            "feedback": result.get("feedback") or "回答基本符合要求",
+            "need_followup": need_followup,
+            "followup_reason": result.get("followup_reason") if need_followup else None,
+            "followup_question": (result.get("followup_question") or None) if need_followup else None,
+        }
+    
+    def evaluate_answers_batch(
+        self,
+        qa_pairs: List[Tuple[str, str]],
+        resume_content: Optional[str] = None,
+    ) -> List[Optional[Tuple[int, str]]]:
+        """
+        在一次调用中评估同一场面试的多个回答（用于离线批量重新评分）
+        
+        Args:
+            qa_pairs: (问题, 回答) 列表
+            resume_content: 简历内容（多个回答共用）
             
+        Returns:
+            与输入顺序一致的 (分数, 反馈) 列表，模型漏评或解析失败的位置为 None
+        """
+        chain = self._batch_evaluation_prompt(qa_pairs, resume_content) | self.llm | StrOutputParser()
+        response = chain.invoke({})
+        return self._parse_batch_evaluation(response, len(qa_pairs))
+    
+    async def aevaluate_answers_batch(
+        self,
+        qa_pairs: List[Tuple[str, str]],
+        resume_content: Optional[str] = None,
+    ) -> List[Optional[Tuple[int, str]]]:
+        """异步在一次调用中评估多个回答"""
+        chain = self._batch_evaluation_prompt(qa_pairs, resume_content) | self.llm | StrOutputParser()
+        response = await chain.ainvoke({})
+        return self._parse_batch_evaluation(response, len(qa_pairs))
+    
+    def _batch_evaluation_prompt(
+        self,
+        qa_pairs: List[Tuple[str, str]],
+        resume_content: Optional[str] = None,
+    ) -> ChatPromptTemplate:
+        """构建批量评估提示词"""
+        context = "\n\n".join(
+            f"【{index}】\n问题：{question}\n回答：{answer}"
+            for index, (question, answer) in enumerate(qa_pairs, start=1)
+        )
+        if resume_content:
+            context += f"\n\n简历内容（参考）：\n{resume_content[:1000]}"
+        
+        return ChatPromptTemplate.from_messages([
+            ("system", "你是一位专业的高级JAVA开发工程师面试官。"
+                        "请逐个评估面试者的多个回答，每个回答独立评分：\n"
+                        "1. 给出客观的分数（0-100分），必须客观，不要虚高；\n"
+                        "2. 提供结构化反馈，指出优点和不足；\n"
+                        "3. 如果明显缺乏实际经验、只是背诵或随意回答，给低分并说明理由。\n\n"
+                        "请以JSON数组格式返回，每个回答一项：[{{\"index\": 序号, \"score\": 分数, \"feedback\": \"反馈内容\"}}]"),
+            ("human", context + "\n\n请评估以上回答："),
+        ])
+    
+    def _parse_batch_evaluation(self, response: str, count: int) -> List[Optional[Tuple[int, str]]]:
+        """解析批量评估结果JSON数组"""
+        results: List[Optional[Tuple[int, str]]] = [None] * count
+        try:
+            start, end = response.index("["), response.rindex("]")
+            items = json.loads(response[start:end + 1])
         except Exception as e:
-            # 解析失败，返回默认值
-            print(f"解析评估结果失败: {e}, 响应: {response}")
-            return 70, "回答基本符合要求", None
+            print(f"解析批量评估结果失败: {e}, 响应: {response}")
+            return results
+        
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or "score" not in item:
+                continue
+            index = item.get("index", position + 1)
+            try:
+                index = int(index)
+                if 1 <= index <= count:
+                    results[index - 1] = (int(item["score"]), item.get("feedback", "回答基本符合要求"))
+            except (TypeError, ValueError):
+                continue
+        
+        return results
+    
+    def evaluate_answer_with_followup(
+        self,
+        question: str,
+        answer: str,
+        resume_content: Optional[str] = None,
+    ) -> Tuple[int, str, Optional[str], Optional[str]]:
+        """
+        评估回答并在同一次调用中给出追问问题
+        
+        Args:
+            question: 问题
+            answer: 回答
+            resume_content: 简历内容（用于验证一致性）
+            
+        Returns:
+            (分数, 反馈, 追问原因, 追问问题)，不需要追问时后两项为 None
+        """
+        chain = self._evaluation_prompt(question, answer, resume_content, with_followup=True) | self.json_llm | StrOutputParser()
+        response = chain.invoke({})
+        return self._parse_evaluation_with_followup(response)
+    
+    async def aevaluate_answer_with_followup(
+        self,
+        question: str,
+        answer: str,
+        resume_content: Optional[str] = None,
+    ) -> Tuple[int, str, Optional[str], Optional[str]]:
+        """异步评估回答并在同一次调用中给出追问问题"""
+        chain = self._evaluation_prompt(question, answer, resume_content, with_followup=True) | self.json_llm | StrOutputParser()
+        response = await chain.ainvoke({})
+        return self._parse_evaluation_with_followup(response)
     
     def generate_followup_question(
         self,
@@ -181,17 +423,45 @@ class Interviewer:
         followup_reason: str,
     ) -> str:
         """生成追问问题"""
+        chain = self._followup_prompt(original_question, answer, followup_reason) | self.llm | StrOutputParser()
+        return chain.invoke({})
+    
+    async def agenerate_followup_question(
+        self,
+        original_question: str,
+        answer: str,
+        followup_reason: str,
+    ) -> str:
+        """异步生成追问问题"""
+        chain = self._followup_prompt(original_question, answer, followup_reason) | self.llm | StrOutputParser()
+        return await chain.ainvoke({})
+    
+    async def astream_followup_question(
+        self,
+        original_question: str,
+        answer: str,
+        followup_reason: str,
+    ) -> AsyncIterator[str]:
+        """流式生成追问问题"""
+        chain = self._followup_prompt(original_question, answer, followup_reason) | self.llm | StrOutputParser()
+        async for token in chain.astream({}):
+            yield token
+    
+    def _followup_prompt(
+        self,
+        original_question: str,
+        answer: str,
+        followup_reason: str,
+    ) -> ChatPromptTemplate:
+        """构建追问提示词"""
         context = f"原问题：{original_question}\n回答：{answer}\n追问原因：{followup_reason}"
         
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官。"
                         "根据面试者的回答和追问原因，生成一个简洁明确的追问问题。"
                         "追问问题要有面试价值，不要问无意义的问题。"),
             ("human", context + "\n\n请生成追问问题："),
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({})
     
     def select_technical_questions(
         self,
@@ -210,15 +480,44 @@ class Interviewer:
         Returns:
             问题列表
         """
-        # 构建检索查询
+        query = self._technical_query(session)
+        
+        # 优先按各类型的配额检索导入时抽取的问题记录，不足时再从文本块中解析补充（抽取功能之前导入、尚未重新导入的题库）
+        quotas = self._type_quotas(question_types, counts)
+        total_count = sum(quotas.values())
+        records = self.question_bank.search_question_records_by_type(query, quotas)
+        questions = [doc.page_content for documents in records.values() for doc in documents]
+        if len(questions) < total_count:
+            documents = self.question_bank.search_questions(query, question_types=question_types, k=total_count * 2)
+            questions = self._merge_questions(questions, self._extract_technical_questions(documents, total_count))
+        return questions[:total_count]
+    
+    async def aselect_technical_questions(
+        self,
+        session: InterviewSession,
+        question_types: List[str],
+        counts: Dict[str, int],
+    ) -> List[str]:
+        """异步选择技术面试题"""
+        query = self._technical_query(session)
+        
+        quotas = self._type_quotas(question_types, counts)
+        total_count = sum(quotas.values())
+        records = await self.question_bank.asearch_question_records_by_type(query, quotas)
+        questions = [doc.page_content for documents in records.values() for doc in documents]
+        if len(questions) < total_count:
+            documents = await self.question_bank.asearch_questions(
+                query, question_types=question_types, k=total_count * 2
+            )
+            questions = self._merge_questions(questions, self._extract_technical_questions(documents, total_count))
+        return questions[:total_count]
+    
+    def _technical_query(self, session: InterviewSession) -> str:
+        """构建技术题检索查询（不含问题类型，题库按类型分别生成查询并过滤）"""
         query_parts = []
         if session.job_requirements:
             query_parts.append(session.job_requirements)
         
-        # 添加问题类型
-        type_str = " ".join(question_types)
-        query_parts.append(type_str)
-        
         # 添加候选人强项/弱项（如果有历史问答）
         if session.project_qa_list:
             avg_score = session.get_average_score()
@@ -227,12 +526,23 @@ class Interviewer:
         
         query = "\n".join(query_parts)
         print(f"检索查询内容: {query}")
-        
-        # 检索问题
-        total_count = sum(counts.values())
-        documents = self.question_bank.search_questions(query, k=total_count * 2)
-        
-        # 简单筛选：提取问题文本
+        return query
+    
+    @staticmethod
+    def _type_quotas(question_types: List[str], counts: Dict[str, int]) -> Dict[str, int]:
+        """各类型的题目数量，按 question_types 的顺序排列（counts 中多出的类型排在最后）"""
+        quotas = {question_type: counts.get(question_type, 0) for question_type in question_types}
+        quotas.update((question_type, count) for question_type, count in counts.items() if question_type not in quotas)
+        return {question_type: count for question_type, count in quotas.items() if count > 0}
+    
+    @staticmethod
+    def _merge_questions(questions: List[str], extra: List[str]) -> List[str]:
+        """在已有问题后追加不重复的问题"""
+        seen = set(questions)
+        return questions + [q for q in extra if q not in seen and not seen.add(q)]
+    
+    def _extract_technical_questions(self, documents: List[Document], total_count: int) -> List[str]:
+        """简单筛选：从检索到的文档中提取问题文本"""
         questions = []
         for doc in documents[:total_count]:
             content = doc.page_content.strip()
@@ -259,21 +569,56 @@ class Interviewer:
         Returns:
             (最终分数, 总结反馈)
         """
-        # 收集所有问答记录
-        all_qa = session.project_qa_list + session.technical_qa_list
-        qa_summary = []
-        for qa in all_qa:
-            qa_summary.append(f"问题：{qa.question}\n回答：{qa.answer}\n得分：{qa.score}")
+        chain = self._conclusion_prompt(session) | self.json_llm | StrOutputParser()
+        response = chain.invoke({})
+        return self.parse_conclusion(response, session)
+    
+    async def aconclude_interview(self, session: InterviewSession) -> Tuple[int, str]:
+        """异步总结面试并给出最终评分"""
+        chain = self._conclusion_prompt(session) | self.json_llm | StrOutputParser()
+        response = await chain.ainvoke({})
+        return self.parse_conclusion(response, session)
+    
+    async def astream_conclusion(self, session: InterviewSession) -> AsyncIterator[str]:
+        """
+        流式生成面试总结的原始输出
+        
+        输出为 JSON 文本，完整接收后需调用 parse_conclusion 解析。
+        """
+        chain = self._conclusion_prompt(session) | self.json_llm | StrOutputParser()
+        async for token in chain.astream({}):
+            yield token
+    
+    def _conclusion_prompt(self, session: InterviewSession) -> ChatPromptTemplate:
+        """
+        构建面试总结提示词
+        
+        使用会话的滚动摘要和分数统计，而不是完整问答记录，提示词大小与面试长度无关。
+        """
+        category_names = {"project": "项目问题", "technical": "技术问题"}
+        stats_lines = []
+        for category, name in category_names.items():
+            stats = session.score_stats.get(category)
+            if stats and stats["count"]:
+                stats_lines.append(
+                    f"{name}：{stats['count']} 题，平均 {stats['total'] / stats['count']:.1f} 分，"
+                    f"最高 {stats['max']} 分，最低 {stats['min']} 分"
+                )
         
         context = f"面试会话总结：\n"
         context += f"项目问题数：{len(session.project_qa_list)}\n"
         context += f"技术问题数：{len(session.technical_qa_list)}\n"
-        context += f"\n详细问答记录：\n" + "\n\n".join(qa_summary)
+        if stats_lines:
+            context += "\n分数统计：\n" + "\n".join(stats_lines) + "\n"
+        
+        omitted = session.score_stats.get("omitted", {}).get("count", 0)
+        context += f"\n问答摘要" + (f"（另有 {omitted} 条表现平稳的问答已省略，分数已计入统计）" if omitted else "") + "：\n"
+        context += session.render_summary()
         
         if session.resume_content:
             context += f"\n\n简历内容：\n{session.resume_content[:1000]}"
         
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官。"
                         "请总结这次面试情况：\n"
                         "1. 概括面试者的整体表现；\n"
@@ -283,37 +628,54 @@ class Interviewer:
                         "请以JSON格式返回：{{\"final_score\": 分数, \"feedback\": \"详细反馈内容\"}}"),
             ("human", context + "\n\n请总结面试并给出最终评分："),
         ])
+    
+    def parse_conclusion(self, response: str, session: InterviewSession) -> Tuple[int, str]:
+        """
+        解析面试总结的模型输出
         
-        chain = prompt | self.llm | StrOutputParser()
-        response = chain.invoke({})
+        Args:
+            response: 模型原始输出
+            session: 面试会话（解析失败时用平均分兜底）
+            
+        Returns:
+            (最终分数, 总结反馈)
+        """
+        result = extract_json_object(response)
+        if result is None:
+            print(f"总结结果中没有找到JSON, 响应: {response}")
+            avg_score = session.get_average_score()
+            return int(avg_score) if avg_score else 70, response
         
-        # 解析JSON
         try:
-            json_match = re.search(r'\{[^}]+\}', response, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                avg_score = session.get_average_score()
-                final_score = int(avg_score) if avg_score else 70
-                result = {"final_score": final_score, "feedback": response}
-            
             final_score = int(result.get("final_score", 70))
-            feedback = result.get("feedback", "面试完成")
-            return final_score, feedback
-            
-        except Exception as e:
-            print(f"解析总结结果失败: {e}, 响应: {response}")
+        except (TypeError, ValueError):
+            print(f"解析总结分数失败, 响应: {response}")
             avg_score = session.get_average_score()
             final_score = int(avg_score) if avg_score else 70
-            return final_score, "面试完成，请继续努力提升技术水平。"
+        
+        return final_score, result.get("feedback") or "面试完成"
     
     def ask(self, question: str, history: Optional[List[Dict]] = None) -> str:
         """
         简单对话接口（保留向后兼容）
         """
-        safe_history = history or []
-        
-        prompt = ChatPromptTemplate.from_messages([
+        chain = self._ask_prompt() | self.llm | StrOutputParser()
+        return chain.invoke({
+            "question": question,
+            "history": history or [],
+        })
+    
+    async def aask(self, question: str, history: Optional[List[Dict]] = None) -> str:
+        """异步简单对话接口"""
+        chain = self._ask_prompt() | self.llm | StrOutputParser()
+        return await chain.ainvoke({
+            "question": question,
+            "history": history or [],
+        })
+    
+    def _ask_prompt(self) -> ChatPromptTemplate:
+        """构建简单对话提示词"""
+        return ChatPromptTemplate.from_messages([
             ("system", "你是一位专业的高级JAVA开发工程师面试官，要求：\n"
                         "- 问题要简洁明确；\n"
                         "- 回答要结构化，突出重点；\n"
@@ -321,10 +683,3 @@ class Interviewer:
             MessagesPlaceholder(variable_name="history"),
             ("human", "{question}"),
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({
-            "question": question,
-            "history": safe_history,
-        })
-
@@ -1,5 +1,8 @@
+import json
+from typing import AsyncIterator, Dict, Tuple
+
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from api.interviewer import Interviewer
 from schemas.chat import (
@@ -16,10 +19,21 @@ from schemas.chat import (
     ImportQuestionsResponse,
     SearchQuestionsRequest,
     SearchQuestionsResponse,
+    SearchQuestionsBatchRequest,
+    SearchQuestionsBatchResponse,
+    QuestionSourcesResponse,
+    DeleteQuestionSourceResponse,
+    ImportJobInfo,
+    ImportJobsResponse,
 )
+from core.embedding_cache import get_embedding_cache
+from core.llm_cache import get_response_cache
+from services.import_jobs import ImportJobManager
 from services.interview_service import interview_service
 from services.question_bank import QuestionBank
 from services.resume_parser import ResumeParser
+import asyncio
+import shutil
 import tempfile
 import os
 
@@ -27,25 +41,42 @@ import os
 router = APIRouter(prefix="/interview", tags=["interview"])
 interviewer = Interviewer()
 question_bank = QuestionBank()
+import_jobs = ImportJobManager(question_bank)
 resume_parser = ResumeParser()
 
 
+def _sse_response(events: AsyncIterator[Tuple[str, Dict]]) -> StreamingResponse:
+    """将 (事件名, 数据) 异步迭代器包装为 text/event-stream 响应"""
+    async def event_stream():
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # 保留原有的简单对话接口（向后兼容）
 @router.post("/ask", response_model=ChatResponse)
-def ask(req: ChatRequest) -> ChatResponse:
+async def ask(req: ChatRequest) -> ChatResponse:
     history_dicts = (
         [m.model_dump() for m in req.history] if req.history is not None else None
     )
-    answer = interviewer.ask(req.question, history=history_dicts)
+    answer = await interviewer.aask(req.question, history=history_dicts)
     return ChatResponse(answer=answer)
 
 
 # ============ 面试流程接口 ============
 
 @router.post("/start", response_model=StartInterviewResponse)
-def start_interview(req: StartInterviewRequest) -> StartInterviewResponse:
+async def start_interview(req: StartInterviewRequest) -> StartInterviewResponse:
     """开始新的面试"""
-    session = interview_service.start_interview(
+    session = await interview_service.astart_interview(
         resume_content=req.resume_content,
         job_requirements=req.job_requirements,
         candidate_name=req.candidate_name,
@@ -65,6 +96,17 @@ def start_interview(req: StartInterviewRequest) -> StartInterviewResponse:
     )
 
 
+@router.post("/start/stream")
+async def stream_start_interview(req: StartInterviewRequest) -> StreamingResponse:
+    """开始新的面试（SSE 流式返回开场白）"""
+    events = interview_service.stream_start_interview(
+        resume_content=req.resume_content,
+        job_requirements=req.job_requirements,
+        candidate_name=req.candidate_name,
+    )
+    return _sse_response(events)
+
+
 @router.post("/upload-resume")
 async def upload_resume(file: UploadFile = File(...)) -> dict:
     """上传简历文件（PDF或文本）"""
@@ -86,10 +128,10 @@ async def upload_resume(file: UploadFile = File(...)) -> dict:
 
 
 @router.post("/{session_id}/opening-response", response_model=AnswerResponse)
-def handle_opening_response(session_id: str) -> AnswerResponse:
+async def handle_opening_response(session_id: str) -> AnswerResponse:
     """处理开场后的响应，进入自我介绍环节"""
     try:
-        result = interview_service.handle_opening_response(session_id)
+        result = await interview_service.ahandle_opening_response(session_id)
         return AnswerResponse(
             question=result["question"],
             stage=result["stage"],
@@ -98,11 +140,21 @@ def handle_opening_response(session_id: str) -> AnswerResponse:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/{session_id}/opening-response/stream")
+async def stream_opening_response(session_id: str) -> StreamingResponse:
+    """处理开场后的响应（SSE 流式返回自我介绍请求）"""
+    try:
+        events = interview_service.stream_opening_response(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _sse_response(events)
+
+
 @router.post("/{session_id}/self-introduction", response_model=AnswerResponse)
-def handle_self_introduction(session_id: str, req: AnswerRequest) -> AnswerResponse:
+async def handle_self_introduction(session_id: str, req: AnswerRequest) -> AnswerResponse:
     """处理自我介绍，进入项目提问环节"""
     try:
-        result = interview_service.handle_self_introduction(
+        result = await interview_service.ahandle_self_introduction(
             session_id,
             req.answer,
         )
@@ -116,10 +168,10 @@ def handle_self_introduction(session_id: str, req: AnswerRequest) -> AnswerRespo
 
 
 @router.post("/{session_id}/project-answer", response_model=AnswerResponse)
-def handle_project_answer(session_id: str, req: AnswerRequest) -> AnswerResponse:
+async def handle_project_answer(session_id: str, req: AnswerRequest) -> AnswerResponse:
     """处理项目问题回答"""
     try:
-        result = interview_service.handle_project_answer(
+        result = await interview_service.ahandle_project_answer(
             session_id,
             req.answer,
         )
@@ -128,14 +180,27 @@ def handle_project_answer(session_id: str, req: AnswerRequest) -> AnswerResponse
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/{session_id}/project-answer/stream")
+async def stream_project_answer(session_id: str, req: AnswerRequest) -> StreamingResponse:
+    """处理项目问题回答（SSE 流式返回下一个问题或追问）"""
+    try:
+        events = interview_service.stream_project_answer(
+            session_id,
+            req.answer,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _sse_response(events)
+
+
 @router.post("/{session_id}/start-technical", response_model=AnswerResponse)
-def start_technical_interview(
+async def start_technical_interview(
     session_id: str,
     req: StartTechnicalInterviewRequest,
 ) -> AnswerResponse:
     """开始技术面试环节"""
     try:
-        result = interview_service.start_technical_interview(
+        result = await interview_service.astart_technical_interview(
             session_id,
             req.question_types,
             req.counts,
@@ -150,10 +215,10 @@ def start_technical_interview(
 
 
 @router.post("/{session_id}/technical-answer", response_model=AnswerResponse)
-def handle_technical_answer(session_id: str, req: AnswerRequest) -> AnswerResponse:
+async def handle_technical_answer(session_id: str, req: AnswerRequest) -> AnswerResponse:
     """处理技术问题回答"""
     try:
-        result = interview_service.handle_technical_answer(
+        result = await interview_service.ahandle_technical_answer(
             session_id,
             req.answer,
         )
@@ -163,15 +228,25 @@ def handle_technical_answer(session_id: str, req: AnswerRequest) -> AnswerRespon
 
 
 @router.post("/{session_id}/conclude", response_model=ConcludeInterviewResponse)
-def conclude_interview(session_id: str) -> ConcludeInterviewResponse:
+async def conclude_interview(session_id: str) -> ConcludeInterviewResponse:
     """总结面试"""
     try:
-        result = interview_service.conclude_interview(session_id)
+        result = await interview_service.aconclude_interview(session_id)
         return ConcludeInterviewResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/{session_id}/conclude/stream")
+async def stream_conclude_interview(session_id: str) -> StreamingResponse:
+    """总结面试（SSE 流式返回总结内容）"""
+    try:
+        events = interview_service.stream_conclude_interview(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _sse_response(events)
+
+
 @router.get("/{session_id}/info", response_model=SessionInfoResponse)
 def get_session_info(session_id: str) -> SessionInfoResponse:
     """获取会话信息"""
@@ -203,27 +278,63 @@ def get_session_info(session_id: str) -> SessionInfoResponse:
 # ============ 问题库管理接口 ============
 
 @router.post("/questions/import", response_model=ImportQuestionsResponse)
-async def import_questions(file: UploadFile = File(...)) -> ImportQuestionsResponse:
-    """导入面试题文件（PDF或文本）"""
+async def import_questions(file: UploadFile = File(...), wait: bool = False) -> ImportQuestionsResponse:
+    """
+    导入面试题文件（PDF或文本）
+    
+    默认提交后台导入任务并立即返回任务ID，通过 /questions/import/jobs/{job_id} 查询进度；
+    wait=true 时等待导入完成后返回结果。
+    """
     try:
-        # 保存临时文件
+        # 保存临时文件（分块复制，不把整个文件读入内存），由导入任务结束后删除
         with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
+            await asyncio.to_thread(shutil.copyfileobj, file.file, tmp_file)
             tmp_path = tmp_file.name
         
-        try:
-            # 导入问题
-            count = question_bank.import_question_file(tmp_path)
+        # 以上传的文件名作为来源，同名文件重新上传时替换旧版本
+        job = import_jobs.submit(tmp_path, source_name=file.filename)
+        if not wait:
             return ImportQuestionsResponse(
                 success=True,
-                count=count,
-                message=f"成功导入 {count} 个问题片段",
+                count=0,
+                message="已提交导入任务",
+                source=job.source,
+                job_id=job.job_id,
+                status=job.status.value,
+            )
+        
+        await job.done.wait()
+        if job.result is None:
+            return ImportQuestionsResponse(
+                success=False,
+                count=0,
+                message=f"导入失败: {job.error or job.status.value}",
+                source=job.source,
+                job_id=job.job_id,
+                status=job.status.value,
+            )
+        
+        result = job.result
+        if result["unchanged"]:
+            message = f"文件未变化，已有 {result['chunks']} 个问题片段、{result['questions']} 个问题"
+        else:
+            message = (
+                f"成功导入 {result['chunks']} 个问题片段"
+                f"（新增 {result['added']}，已存在 {result['skipped']}，移除 {result['removed']}），"
+                f"抽取 {result['questions']} 个问题"
             )
-        finally:
-            # 清理临时文件
-            os.unlink(tmp_path)
-            
+        return ImportQuestionsResponse(
+            success=True,
+            count=result["chunks"],
+            message=message,
+            source=result["source"],
+            added=result["added"],
+            skipped=result["skipped"],
+            removed=result["removed"],
+            questions=result["questions"],
+            job_id=job.job_id,
+            status=job.status.value,
+        )
     except Exception as e:
         return ImportQuestionsResponse(
             success=False,
@@ -232,23 +343,100 @@ async def import_questions(file: UploadFile = File(...)) -> ImportQuestionsRespo
         )
 
 
+@router.get("/questions/import/jobs", response_model=ImportJobsResponse)
+async def list_import_jobs(limit: int = 20) -> ImportJobsResponse:
+    """列出最近的导入任务"""
+    jobs = [job.to_dict() for job in import_jobs.list_jobs(limit)]
+    return ImportJobsResponse(count=len(jobs), jobs=jobs)
+
+
+@router.get("/questions/import/jobs/{job_id}", response_model=ImportJobInfo)
+async def get_import_job(job_id: str) -> ImportJobInfo:
+    """查询导入任务进度"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    return ImportJobInfo(**job.to_dict())
+
+
+@router.post("/questions/import/jobs/{job_id}/cancel", response_model=ImportJobInfo)
+async def cancel_import_job(job_id: str) -> ImportJobInfo:
+    """取消导入任务（已写入的问题片段会被回滚）"""
+    job = import_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"导入任务不存在: {job_id}")
+    # 等待回滚完成（最多 5 秒），让返回的状态尽量是最终状态
+    try:
+        await asyncio.wait_for(job.done.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        pass
+    return ImportJobInfo(**job.to_dict())
+
+
 @router.get("/questions/count")
 def get_question_count() -> dict:
-    """获取问题库中的问题总数"""
+    """获取问题库中的问题片段数和抽取的问题记录数"""
     count = question_bank.get_question_count()
-    return {"count": count}
+    return {"count": count, "questions": question_bank.get_question_record_count()}
+
+
+@router.get("/questions/sources", response_model=QuestionSourcesResponse)
+def list_question_sources() -> QuestionSourcesResponse:
+    """列出已导入的问题文件"""
+    sources = question_bank.list_sources()
+    return QuestionSourcesResponse(count=len(sources), sources=sources)
+
+
+@router.delete("/questions/sources/{source_name}", response_model=DeleteQuestionSourceResponse)
+def delete_question_source(source_name: str) -> DeleteQuestionSourceResponse:
+    """删除问题文件及其问题片段"""
+    removed = question_bank.delete_source(source_name)
+    if removed is None:
+        raise HTTPException(status_code=404, detail=f"来源不存在: {source_name}")
+    return DeleteQuestionSourceResponse(success=True, source=source_name, removed=removed)
 
 
 @router.post("/questions/search", response_model=SearchQuestionsResponse)
-def search_questions(req: SearchQuestionsRequest) -> SearchQuestionsResponse:
+async def search_questions(req: SearchQuestionsRequest) -> SearchQuestionsResponse:
     """搜索问题"""
-    results = question_bank.search_questions(
+    results = await question_bank.asearch_questions(
         query=req.query,
         job_requirements=req.job_requirements,
         question_types=req.question_types,
         k=req.k,
+        mode=req.mode,
     )
     return SearchQuestionsResponse(
         count=len(results),
         questions=[{"content": doc.page_content, "metadata": doc.metadata} for doc in results],
     )
+
+
+@router.post("/questions/search/batch", response_model=SearchQuestionsBatchResponse)
+async def search_questions_batch(req: SearchQuestionsBatchRequest) -> SearchQuestionsBatchResponse:
+    """批量搜索问题：所有查询的向量在一次 embedding 请求中生成，检索合并执行"""
+    results = await question_bank.asearch_questions_batch([query.model_dump() for query in req.queries])
+    return SearchQuestionsBatchResponse(
+        count=len(results),
+        results=[
+            SearchQuestionsResponse(
+                count=len(documents),
+                questions=[{"content": doc.page_content, "metadata": doc.metadata} for doc in documents],
+            )
+            for documents in results
+        ],
+    )
+
+
+# ============ 缓存统计接口 ============
+
+@router.get("/cache/stats")
+def get_cache_stats() -> dict:
+    """获取各类缓存的命中统计"""
+    llm_cache = get_response_cache()
+    embedding_cache = get_embedding_cache()
+    return {
+        "llm": llm_cache.stats() if llm_cache else {"enabled": False},
+        "embedding": embedding_cache.stats() if embedding_cache else {"enabled": False},
+        "retrieval": question_bank.retrieval_cache.stats(),
+    }
@@ -0,0 +1 @@
+"""性能基准与压测脚本（离线运行，不依赖真实的 LLM / Embedding 服务）。"""
@@ -0,0 +1,94 @@
+"""
+批量检索基准：对比逐条调用 asearch_questions、并发调用（asyncio.gather）与 asearch_questions_batch 完成一组查询的耗时
+
+使用 bench_hybrid_search 的合成题库和查询方式（技术名词 + 职位要求），本地 Embedding 并模拟 DashScope 的网络延迟：
+逐条和并发调用每条查询一次请求，批量检索把所有查询合并为一次批量 embedding（每请求 10 条、最多 8 个请求并发）。
+分别在 Chroma 和内存映射向量矩阵两种检索后端上运行，一致率为批量结果与逐条结果完全相同的查询比例。
+
+用法：
+    python -m benchmarks.bench_batch_search --chunks 5000 --batch-size 32 --rounds 10 --embed-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.bench_hybrid_search import JOB_REQUIREMENTS, TERMS, build_question_file, tmp_dir
+from benchmarks.fakes import LatencyEmbeddings
+from services.question_bank import QuestionBank
+
+BACKENDS = ("chroma", "matrix")
+
+
+async def sequential(bank: QuestionBank, requests: list) -> list:
+    """改造前：逐条调用"""
+    return [await bank.asearch_questions(**request) for request in requests]
+
+
+async def concurrent(bank: QuestionBank, requests: list) -> list:
+    return await asyncio.gather(*(bank.asearch_questions(**request) for request in requests))
+
+
+async def batch(bank: QuestionBank, requests: list) -> list:
+    return await bank.asearch_questions_batch(requests)
+
+
+async def main(chunks: int, batch_size: int, rounds: int, k: int, embed_latency: float) -> None:
+    path = os.path.join(tmp_dir, "questions.txt")
+    build_question_file(path, chunks)
+    bank = QuestionBank()
+    bank.text_splitter._chunk_size = 600
+    bank.text_splitter._chunk_overlap = 0
+    result = bank.import_question_file(path)
+
+    rng = random.Random(1)
+    workloads = [
+        [
+            {
+                "query": f"考察候选人对 {rng.choice(TERMS)} 的理解",
+                "job_requirements": rng.choice(JOB_REQUIREMENTS),
+                "k": k,
+            }
+            for _ in range(batch_size)
+        ]
+        for _ in range(rounds)
+    ]
+    print(f"文本块数: {result['chunks']}  每组查询数: {batch_size}  组数: {rounds}  k={k}  模拟 embedding 延迟: {embed_latency}s")
+    print(f"{'后端':>6} | {'方式':>10} | {'每组 p50(ms)':>12} | {'每组 p99(ms)':>12} | {'每条(ms)':>8} | {'一致率':>6}")
+    for backend in BACKENDS:
+        os.environ["VECTOR_SEARCH_BACKEND"] = backend
+        bank = QuestionBank()
+        bank.embeddings = LatencyEmbeddings(bank.embeddings, embed_latency)
+        await bank.asearch_questions_batch(workloads[0][:2])  # 预热（矩阵后端首次使用时从 Chroma 补齐向量）
+
+        baseline = []
+        for name, run in (("sequential", sequential), ("concurrent", concurrent), ("batch", batch)):
+            latencies = []
+            outputs = []
+            for requests in workloads:
+                start = time.perf_counter()
+                outputs.append(await run(bank, requests))
+                latencies.append(time.perf_counter() - start)
+            ids = [[doc.id for doc in documents] for output in outputs for documents in output]
+            if not baseline:
+                baseline = ids
+            agreement = sum(a == b for a, b in zip(ids, baseline)) / len(baseline)
+            latencies.sort()
+            print(
+                f"{backend:>8} | {name:>12} | {statistics.median(latencies) * 1000:>14.1f} | "
+                f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:>14.1f} | "
+                f"{statistics.median(latencies) * 1000 / batch_size:>10.2f} | {agreement:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐条、并发与批量检索的耗时对比")
+    parser.add_argument("--chunks", type=int, default=5000, help="题库文本块数")
+    parser.add_argument("--batch-size", type=int, default=32, help="每组查询数")
+    parser.add_argument("--rounds", type=int, default=10, help="组数")
+    parser.add_argument("--k", type=int, default=10, help="每条查询的返回结果数")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="每次 embedding 请求的模拟延迟（秒）")
+    args = parser.parse_args()
+    asyncio.run(main(args.chunks, args.batch_size, args.rounds, args.k, args.embed_latency))
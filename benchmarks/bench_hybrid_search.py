@@ -0,0 +1,95 @@
+"""
+混合检索基准：对比 vector / lexical / hybrid 三种检索方式的延迟和精确技术名词的召回
+
+合成题库中每个文本块包含一个技术名词和若干通用描述；查询为"技术名词 + 职位要求"的拼接
+（与面试流程中的查询方式一致）。recall@k 为前 k 个结果中包含该技术名词的比例。
+使用本地 Embedding（EMBEDDING_BACKEND=local），不访问网络。
+
+用法：
+    python -m benchmarks.bench_hybrid_search --chunks 5000 --queries 200 --k 10
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks.fakes import isolate_storage
+
+tmp_dir = isolate_storage()
+os.environ["EMBEDDING_BACKEND"] = "local"
+# 查询会重复，关闭检索缓存以测量实际的检索开销
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+from services.question_bank import SEARCH_MODES, QuestionBank  # noqa: E402
+
+TERMS = [
+    "ConcurrentHashMap", "CopyOnWriteArrayList", "ReentrantLock", "AQS", "ThreadLocal", "CompletableFuture",
+    "G1", "ZGC", "CMS", "Shenandoah", "Metaspace", "SafePoint", "JIT", "volatile", "synchronized",
+    "MVCC", "Gap Lock", "Binlog", "Redo Log", "B+Tree", "RDB", "AOF", "Redlock", "Pipeline", "Sentinel",
+    "ISR", "Rebalance", "Exactly-Once", "Raft", "Paxos", "gRPC", "Netty", "epoll", "mmap", "Zero-Copy",
+    "BeanPostProcessor", "AOP", "Hystrix", "Sentinel", "Nacos",
+]
+
+FILLERS = [
+    "请结合实际项目经验说明你的理解。", "面试官会追问具体的实现细节和适用场景。", "回答时注意说明优缺点以及替代方案。",
+    "可以从原理、源码和线上问题排查三个角度展开。", "请举例说明在高并发场景下如何使用。",
+    "说明在分布式系统中遇到的典型问题以及解决方法。", "比较不同版本之间的差异和演进原因。",
+    "结合性能指标说明优化前后的效果。", "这是后端开发岗位的高频面试题。", "考察候选人对底层机制的掌握程度。",
+]
+
+JOB_REQUIREMENTS = [
+    "熟悉 Java 后端开发，掌握 Spring Boot、MySQL、Redis，有高并发分布式系统经验，具备良好的沟通能力",
+    "负责交易系统核心模块的设计与开发，熟悉微服务架构、消息队列，有性能调优经验者优先",
+    "3 年以上服务端开发经验，熟悉 JVM、多线程编程，了解常见的分布式一致性方案",
+]
+
+
+def build_question_file(path: str, chunks: int, seed: int = 0) -> None:
+    """每段一个技术名词加若干通用描述，约 400 字，段落之间空行分隔"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(chunks):
+            term = TERMS[i % len(TERMS)]
+            filler = "".join(rng.choice(FILLERS) for _ in range(18))
+            f.write(f"第{i}题：请解释 {term} 的实现原理。{filler}\n\n")
+
+
+def main(chunks: int, queries: int, k: int) -> None:
+    path = os.path.join(tmp_dir, "questions.txt")
+    build_question_file(path, chunks)
+    bank = QuestionBank()
+    # 每段单独成块，保证每个文本块只包含一个技术名词
+    bank.text_splitter._chunk_size = 600
+    bank.text_splitter._chunk_overlap = 0
+    result = bank.import_question_file(path)
+
+    rng = random.Random(1)
+    workload = [(rng.choice(TERMS), rng.choice(JOB_REQUIREMENTS)) for _ in range(queries)]
+    print(f"文本块数: {result['chunks']}  查询数: {queries}  k={k}")
+    print(f"{'检索方式':>8} | {'recall@k':>8} | {'p50(ms)':>8} | {'p99(ms)':>8}")
+    for mode in SEARCH_MODES:
+        bank.search_questions(workload[0][0], k=k, mode=mode)  # 预热（首次关键词检索会检查索引）
+        latencies = []
+        hits = 0
+        for term, job_requirements in workload:
+            start = time.perf_counter()
+            documents = bank.search_questions(
+                f"考察候选人对 {term} 的理解", job_requirements=job_requirements, k=k, mode=mode
+            )
+            latencies.append(time.perf_counter() - start)
+            hits += sum(f" {term} " in doc.page_content for doc in documents)
+        latencies.sort()
+        print(
+            f"{mode:>12} | {hits / (queries * k):>8.3f} | {statistics.median(latencies) * 1000:>8.2f} | "
+            f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="向量 / 关键词 / 混合检索的延迟与召回对比")
+    parser.add_argument("--chunks", type=int, default=5000, help="题库文本块数")
+    parser.add_argument("--queries", type=int, default=200, help="查询数")
+    parser.add_argument("--k", type=int, default=10, help="返回结果数")
+    args = parser.parse_args()
+    main(args.chunks, args.queries, args.k)
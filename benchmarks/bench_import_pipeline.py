@@ -0,0 +1,121 @@
+"""
+题库导入基准：对比一次性导入（整份加载 → 全部拆分 → 全部 embedding → 写入）与流式导入管线的吞吐和峰值内存
+
+生成多页 PDF，使用本地 Embedding 并模拟 DashScope 的网络延迟，每种方式在独立子进程中运行以分别统计峰值 RSS。
+
+用法：
+    python -m benchmarks.bench_import_pipeline --pages 2000 --embed-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.fakes import LatencyEmbeddings, isolate_storage
+
+tmp_dir = isolate_storage()
+os.environ["EMBEDDING_BACKEND"] = "local"
+
+MODES = ("load-all", "streaming")
+
+WORDS = (
+    "hashmap resize threshold load factor concurrent segment lock jvm garbage collection "
+    "index btree transaction isolation redis persistence kafka offset replication spring bean"
+).split()
+
+
+def build_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0):
+    """生成每页 lines_per_page 行英文文本的 PDF（手写最小 PDF 结构，不依赖额外的库）"""
+    import random
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Question {page}-{i}: " + " ".join(rng.choice(WORDS) for _ in range(12)) for i in range(lines_per_page)]
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def run_mode(mode: str, path: str, embed_latency: float) -> dict:
+    """在当前进程中按指定方式导入，返回吞吐和峰值 RSS"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from services.question_bank import QuestionBank
+
+    bank = QuestionBank()
+    bank.embeddings = LatencyEmbeddings(bank.embeddings, embed_latency)
+    start = time.perf_counter()
+    if mode == "load-all":
+        # 改造前的实现：整份加载和拆分后一次性 embedding，再写入
+        pages = PyPDFLoader(path).load()
+        chunks = bank.text_splitter.split_documents(pages)
+        embeddings = bank.embeddings.embed_documents([doc.page_content for doc in chunks])
+        for i in range(0, len(chunks), 1000):
+            bank._upsert_documents(chunks[i:i + 1000], embeddings[i:i + 1000])
+        page_count, chunk_count = len(pages), len(chunks)
+    else:
+        result = asyncio.run(bank.aimport_question_file(path))
+        page_count, chunk_count = result["pages"], result["chunks"]
+    seconds = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "pages": page_count,
+        "chunks": chunk_count,
+        "seconds": seconds,
+        "pages_per_second": page_count / seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(pages: int, embed_latency: float):
+    path = os.path.join(tmp_dir, "questions.pdf")
+    build_pdf(path, pages)
+    print(f"PDF: {pages} 页, {os.path.getsize(path) / 1024 / 1024:.1f} MB  模拟 embedding 延迟: {embed_latency}s/轮")
+    print(f"{'方式':>10} | {'页数':>6} | {'文本块':>6} | {'耗时(s)':>8} | {'页/秒':>8} | {'峰值RSS(MB)':>11}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_import_pipeline", "--worker", mode, path,
+             "--embed-latency", str(embed_latency)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:>12} | {stats['pages']:>8} | {stats['chunks']:>9} | {stats['seconds']:>10.1f} | "
+            f"{stats['pages_per_second']:>10.1f} | {stats['peak_rss_mb']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一次性导入与流式导入的吞吐 / 峰值内存对比")
+    parser.add_argument("--pages", type=int, default=2000, help="生成的 PDF 页数")
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="每轮并发 embedding 请求的模拟延迟（秒）")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_mode(args.worker[0], args.worker[1], args.embed_latency)))
+    else:
+        main(args.pages, args.embed_latency)
@@ -0,0 +1,96 @@
+"""
+离线检索压测：使用本地哈希 Embedding（EMBEDDING_BACKEND=local），不访问网络
+
+生成合成题库文本文件，经 QuestionBank.import_question_file 导入，
+然后测量导入吞吐、embedding 吞吐以及不同并发下 asearch_questions 的 QPS 和延迟。
+
+用法：
+    python -m benchmarks.bench_local_retrieval --chunks 5000 --queries 500 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.fakes import isolate_storage
+
+tmp_dir = isolate_storage()
+os.environ["EMBEDDING_BACKEND"] = "local"
+# 查询会重复，关闭检索缓存以测量实际的检索开销
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+from services.question_bank import QuestionBank  # noqa: E402
+
+TOPICS = [
+    "HashMap 扩容", "ConcurrentHashMap 分段锁", "JVM 垃圾回收", "G1 收集器", "类加载双亲委派",
+    "MySQL 索引", "事务隔离级别", "Redis 持久化", "缓存穿透与雪崩", "分布式锁",
+    "Kafka 消息可靠性", "Spring AOP", "线程池参数", "volatile 可见性", "分库分表",
+]
+
+
+def build_question_file(path: str, chunks: int, seed: int = 0):
+    """生成合成题库：每段约 800 字，段落之间空行分隔，导入时每段拆成一个文本块"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(chunks):
+            topic = rng.choice(TOPICS)
+            body = "".join(
+                f"{rng.choice(TOPICS)}相关的问题：请说明{topic}的原理、适用场景和常见误区。"
+                for _ in range(20)
+            )
+            f.write(f"第{i}题 {topic}：{body[:780]}\n\n")
+
+
+async def search_load(bank: QuestionBank, queries: int, concurrency: int, k: int):
+    """以给定并发执行 queries 次检索，返回 (QPS, p50 ms, p99 ms)"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await bank.asearch_questions(f"{TOPICS[i % len(TOPICS)]} 的原理", k=k)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(queries)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (
+        queries / elapsed,
+        statistics.median(latencies) * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    )
+
+
+def main(chunks: int, queries: int, levels: list, k: int):
+    path = os.path.join(tmp_dir, "questions.txt")
+    build_question_file(path, chunks)
+    bank = QuestionBank()
+
+    texts = [doc.page_content for doc in bank._load_and_split(path)]
+    start = time.perf_counter()
+    bank.embeddings.embed_documents(texts)
+    embed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    imported = bank.import_question_file(path)["chunks"]
+    import_seconds = time.perf_counter() - start
+
+    print(f"文本块数: {imported}  embedding: {imported / embed_seconds:.0f} 块/s  导入: {imported / import_seconds:.0f} 块/s")
+    print(f"{'并发数':>6} | {'QPS':>8} | {'p50(ms)':>8} | {'p99(ms)':>8}")
+    for concurrency in levels:
+        qps, p50, p99 = asyncio.run(search_load(bank, queries, concurrency, k))
+        print(f"{concurrency:>9} | {qps:>8.1f} | {p50:>8.2f} | {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 Embedding 的离线检索压测")
+    parser.add_argument("--chunks", type=int, default=5000, help="题库文本块数")
+    parser.add_argument("--queries", type=int, default=500, help="每个并发级别的检索次数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="并发级别")
+    parser.add_argument("--k", type=int, default=10, help="返回结果数")
+    args = parser.parse_args()
+    main(args.chunks, args.queries, args.concurrency, args.k)
@@ -0,0 +1,152 @@
+"""
+向量检索后端基准：对比 Chroma 与内存映射向量矩阵（可选 HNSW）的检索延迟和每个 worker 进程的内存
+
+使用与 bench_vector_storage 相同的合成数据，先在临时目录中写入一份题库（同时写入 Chroma 和向量矩阵），
+再按每种后端同时启动多个 worker 子进程执行相同的查询，统计 p50/p99 延迟、recall@k 和各 worker 的 RSS。
+RSS 分为匿名内存（进程独占）和文件映射内存（内存映射的向量矩阵，多个进程通过页缓存共享同一份物理页）。
+
+用法：
+    python -m benchmarks.bench_matrix_backend --docs 20000 --queries 500 --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_storage import build_dataset
+from benchmarks.fakes import TableEmbeddings, isolate_storage
+
+tmp_dir = isolate_storage()
+# 预热查询与正式查询重复，关闭检索缓存以测量实际的检索开销
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+# (名称, VECTOR_SEARCH_BACKEND, VECTOR_HNSW_MIN_ROWS)
+BACKENDS = [
+    ("chroma", "chroma", 0),
+    ("matrix", "matrix", 0),
+    ("matrix+hnsw", "matrix", 1),
+]
+
+
+def read_rss() -> dict:
+    """当前进程的 RSS（MB），分为匿名内存和文件映射内存"""
+    stats = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                stats[key] = int(value.split()[0]) / 1024
+    return stats
+
+
+def prepare(data_dir: str, doc_vectors: np.ndarray, batch_size: int = 1000):
+    """在 data_dir 中写入题库：矩阵后端导入时 Chroma 和向量矩阵各保存一份"""
+    os.environ["VECTOR_DB_DIR"] = os.path.join(data_dir, "vector_db")
+    os.environ["INTERVIEW_DB_PATH"] = os.path.join(data_dir, "interviews.db")
+    os.environ["VECTOR_SEARCH_BACKEND"] = "matrix"
+
+    from services.question_bank import QuestionBank
+    from langchain_core.documents import Document
+
+    bank = QuestionBank()
+    for offset in range(0, len(doc_vectors), batch_size):
+        ids = range(offset, min(offset + batch_size, len(doc_vectors)))
+        documents = [Document(page_content=f"doc-{i}", metadata={"doc": i}) for i in ids]
+        bank._upsert_documents(documents, [doc_vectors[i].tolist() for i in ids])
+
+
+def run_worker(data_dir: str, backend: str, hnsw_min_rows: int, k: int) -> dict:
+    """在当前进程中逐条执行查询，返回延迟、recall 和 RSS"""
+    os.environ["VECTOR_DB_DIR"] = os.path.join(data_dir, "vector_db")
+    os.environ["INTERVIEW_DB_PATH"] = os.path.join(data_dir, "interviews.db")
+    os.environ["VECTOR_SEARCH_BACKEND"] = backend
+    os.environ["VECTOR_HNSW_MIN_ROWS"] = str(hnsw_min_rows)
+
+    from services.question_bank import QuestionBank
+
+    query_vectors = np.load(os.path.join(data_dir, "queries.npy"))
+    truth = np.load(os.path.join(data_dir, "truth.npy"))
+    bank = QuestionBank()
+    bank.embeddings = TableEmbeddings({f"query-{i}": vector.tolist() for i, vector in enumerate(query_vectors)})
+
+    # 预热：加载索引（Chroma 的 HNSW / 向量矩阵映射 / 构建 HNSW 图）
+    start = time.perf_counter()
+    bank.search_questions("query-0", k=k)
+    warmup_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for i in range(len(query_vectors)):
+        start = time.perf_counter()
+        results = bank.search_questions(f"query-{i}", k=k)
+        latencies.append(time.perf_counter() - start)
+        hits += len({doc.metadata["doc"] for doc in results} & set(truth[i].tolist()))
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "recall": hits / (len(query_vectors) * k),
+        "warmup_s": warmup_seconds,
+        **read_rss(),
+    }
+
+
+def main(docs: int, queries: int, k: int, dimension: int, workers: int):
+    doc_vectors, query_vectors = build_dataset(docs, queries, dimension)
+    truth = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+    np.save(os.path.join(tmp_dir, "queries.npy"), query_vectors)
+    np.save(os.path.join(tmp_dir, "truth.npy"), truth)
+
+    start = time.perf_counter()
+    prepare(tmp_dir, doc_vectors)
+    matrix_mb = docs * dimension * 4 / 1024 / 1024
+    print(f"文档数: {docs}  维度: {dimension}（float32 矩阵 {matrix_mb:.1f} MB）  查询数: {queries}  k={k}  "
+          f"并发 worker: {workers}  写入耗时: {time.perf_counter() - start:.1f}s")
+    print(
+        f"{'后端':>12} | {'p50(ms)':>8} | {'p99(ms)':>8} | {'recall@k':>8} | {'预热(s)':>7} | "
+        f"{'RSS(MB)':>8} | {'匿名(MB)':>8} | {'文件映射(MB)':>12}"
+    )
+    for name, backend, hnsw_min_rows in BACKENDS:
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.bench_matrix_backend", "--worker", tmp_dir, backend,
+                 str(hnsw_min_rows), "--k", str(k)],
+                stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(workers)
+        ]
+        results = []
+        for process in processes:
+            output, _ = process.communicate()
+            if process.returncode:
+                raise RuntimeError(f"worker 退出码 {process.returncode}")
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        def mean(key: str) -> float:
+            return statistics.mean(result[key] for result in results)
+
+        print(
+            f"{name:>14} | {mean('p50_ms'):>8.2f} | {mean('p99_ms'):>8.2f} | {mean('recall'):>8.3f} | "
+            f"{mean('warmup_s'):>9.2f} | {mean('VmRSS'):>9.1f} | {mean('RssAnon'):>10.1f} | {mean('RssFile'):>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma 与内存映射向量矩阵检索后端的延迟 / 内存对比")
+    parser.add_argument("--docs", type=int, default=20000, help="文档数")
+    parser.add_argument("--queries", type=int, default=500, help="每个 worker 的查询数")
+    parser.add_argument("--k", type=int, default=10, help="返回结果数")
+    parser.add_argument("--dimension", type=int, default=1024, help="向量维度")
+    parser.add_argument("--workers", type=int, default=4, help="每种后端同时运行的 worker 进程数")
+    parser.add_argument("--worker", nargs=3, metavar=("DIR", "BACKEND", "HNSW_MIN_ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.worker[0], args.worker[1], int(args.worker[2]), args.k)))
+    else:
+        main(args.docs, args.queries, args.k, args.dimension, args.workers)
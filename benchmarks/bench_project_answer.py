@@ -0,0 +1,85 @@
+"""
+项目回答评估基准：对比 sequential / speculative / combined 三种评估模式的单次回答延迟
+
+模拟模型按 token 流式输出，评估结果中 score / need_followup 先于较长的 feedback 输出，
+可以体现提前决定追问带来的收益。
+
+用法：
+    python -m benchmarks.bench_project_answer --latency 1.0 --token-latency 0.02 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.fakes import LatencyChatModel, isolate_storage
+
+isolate_storage()
+
+from services.interview_service import (  # noqa: E402
+    EVALUATION_MODES,
+    interview_service,
+)
+from services.interview_session import InterviewStage  # noqa: E402
+
+
+def build_model(latency: float, token_latency: float, need_followup: bool) -> LatencyChatModel:
+    """按提示词返回评估结果 / 追问问题的模拟模型"""
+    evaluation = {
+        "score": 80 if need_followup else 60,
+        "need_followup": need_followup,
+        "followup_reason": "需要确认性能优化的具体数据" if need_followup else None,
+        "followup_question": "优化前后的 QPS 和 P99 分别是多少？",
+        "feedback": "思路清晰，分库分表的拆分依据和路由方式说明到位；"
+                    "但缺少量化数据，没有说明扩容时的数据迁移方案，也没有提到跨库查询和分布式事务的处理方式。",
+    }
+    return LatencyChatModel(
+        latency=latency,
+        token_latency=token_latency,
+        routes=[
+            ("请评估面试者的回答", json.dumps(evaluation, ensure_ascii=False)),
+            ("生成一个简洁明确的追问问题", "优化前后的 QPS 和 P99 分别是多少？"),
+        ],
+        responses=["1. 介绍一下订单系统的分库分表方案？\n2. 如何保证数据一致性？"],
+    )
+
+
+async def answer_once(mode: str) -> float:
+    """创建处于项目提问阶段的会话，返回一次回答处理的耗时（秒）"""
+    interview_service.evaluation_mode = mode
+    session = interview_service._create_session("负责订单系统重构，QPS 提升 3 倍。", None, None)
+    session.stage = InterviewStage.PROJECT_QNA
+    session.target_project_questions = 3
+    session.project_questions_pool = ["如何保证数据一致性？"]
+    session.add_message("ai", "介绍一下订单系统的分库分表方案？")
+    
+    started = time.perf_counter()
+    await interview_service.ahandle_project_answer(session.session_id, "按用户ID哈希分成 16 个库。")
+    return time.perf_counter() - started
+
+
+async def main(latency: float, token_latency: float, rounds: int) -> None:
+    print(f"模拟 LLM 首 token 延迟: {latency:.2f}s，每 4 字符 {token_latency:.3f}s，每组 {rounds} 次")
+    print(f"{'模式':>12} | {'需追问(s)':>10} | {'无需追问(s)':>12}")
+    baseline = None
+    for mode in EVALUATION_MODES:
+        row = []
+        for need_followup in (True, False):
+            model = build_model(latency, token_latency, need_followup)
+            interview_service.interviewer.llm = interview_service.interviewer.json_llm = model
+            durations = [await answer_once(mode) for _ in range(rounds)]
+            row.append(statistics.median(durations))
+        if baseline is None:
+            baseline = row
+        saving = baseline[0] - row[0]
+        print(f"{mode:>12} | {row[0]:>10.2f} | {row[1]:>12.2f}   （需追问时节省 {saving:.2f}s/次）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="项目回答评估模式延迟对比")
+    parser.add_argument("--latency", type=float, default=1.0, help="模拟的 LLM 响应延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="模拟的每 4 个字符生成耗时（秒）")
+    parser.add_argument("--rounds", type=int, default=5, help="每种情况的重复次数")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.token_latency, args.rounds))
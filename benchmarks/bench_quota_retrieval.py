@@ -0,0 +1,114 @@
+"""
+按类型配额选题基准：对比单次混合检索（所有类型拼成一条查询，取前 N 个）与按类型配额检索的延迟和配额满足情况
+
+合成题库按章节（## 类型名）组织，每个类型若干道题，导入时抽取为问题记录。使用本地 Embedding（EMBEDDING_BACKEND=local）
+并为查询 embedding 模拟 DashScope 的网络延迟：单次检索为一次请求，配额检索把各类型的查询合并为一次批量请求。
+配额满足率为各类型实际选到的本类型题目数之和占总题数的比例，重复率为选中题目中重复问题的比例。
+前两种方式关闭检索缓存；quota+cache 为启用检索缓存后的配额检索（各轮在几组固定的职位要求和类型配额之间循环，
+与同一岗位的多场面试重复选题一致）。
+
+用法：
+    python -m benchmarks.bench_quota_retrieval --questions-per-type 300 --rounds 50 --embed-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.fakes import LatencyEmbeddings, isolate_storage
+
+tmp_dir = isolate_storage()
+os.environ["EMBEDDING_BACKEND"] = "local"
+# 各轮查询重复，默认关闭检索缓存，quota+cache 单独启用
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+from services.question_bank import QuestionBank  # noqa: E402
+from services.question_types import QUESTION_TYPE_KEYWORDS  # noqa: E402
+from services.retrieval_cache import RetrievalCache  # noqa: E402
+
+TEMPLATES = [
+    "{kw} 的实现原理是什么？", "{kw} 在项目中遇到过哪些问题？", "如何排查与 {kw} 相关的线上故障？",
+    "{kw} 和 {kw2} 有什么区别？", "{kw} 的适用场景有哪些？", "谈谈你对 {kw} 的理解？",
+]
+
+JOB_REQUIREMENTS = "熟悉 Java 后端开发，掌握 Spring Boot、MySQL、Redis，有高并发分布式系统经验"
+
+COUNTS = [
+    {"Java基础": 3, "多线程": 2, "Spring": 3},
+    {"JVM": 2, "数据库": 3, "Redis": 2, "消息队列": 1},
+    {"多线程": 4, "分布式": 2},
+]
+
+
+def build_question_file(path: str, questions_per_type: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for question_type, keywords in QUESTION_TYPE_KEYWORDS.items():
+            f.write(f"## {question_type}\n\n")
+            for i in range(questions_per_type):
+                kw, kw2 = rng.sample(keywords, 2)
+                question = rng.choice(TEMPLATES).format(kw=kw, kw2=kw2)
+                f.write(f"问题{i}：{question}\n答：{kw} 相关的参考答案（{question_type} 第 {i} 题）。\n\n")
+
+
+async def blended(bank: QuestionBank, counts: dict) -> dict:
+    """改造前：所有类型拼进一条查询，取前 sum(counts) 个"""
+    documents = await bank.asearch_question_records(
+        "\n".join(counts), job_requirements=JOB_REQUIREMENTS, k=sum(counts.values())
+    )
+    by_type: dict = {question_type: [] for question_type in counts}
+    for doc in documents:
+        by_type.setdefault(doc.metadata["question_type"], []).append(doc)
+    return by_type
+
+
+async def by_quota(bank: QuestionBank, counts: dict) -> dict:
+    return await bank.asearch_question_records_by_type("", counts, job_requirements=JOB_REQUIREMENTS)
+
+
+async def main(questions_per_type: int, rounds: int, embed_latency: float) -> None:
+    path = os.path.join(tmp_dir, "questions.md")
+    build_question_file(path, questions_per_type)
+    bank = QuestionBank()
+    result = bank.import_question_file(path)
+    bank.embeddings = LatencyEmbeddings(bank.embeddings, embed_latency)
+
+    print(f"问题记录数: {result['questions']}  轮数: {rounds}  模拟 embedding 延迟: {embed_latency}s")
+    print(f"{'方式':>8} | {'配额满足率':>8} | {'重复率':>6} | {'p50(ms)':>8} | {'p99(ms)':>8}")
+    for name, select in (("blended", blended), ("quota", by_quota), ("quota+cache", by_quota)):
+        if name == "quota+cache":
+            bank.retrieval_cache = RetrievalCache()
+        await select(bank, COUNTS[0])  # 预热（配额检索首次使用时加载问题记录快照）
+        latencies = []
+        satisfied = total = duplicates = selected = 0
+        for i in range(rounds):
+            counts = COUNTS[i % len(COUNTS)]
+            start = time.perf_counter()
+            by_type = await select(bank, counts)
+            latencies.append(time.perf_counter() - start)
+            questions = [doc.page_content for documents in by_type.values() for doc in documents]
+            duplicates += len(questions) - len(set(questions))
+            selected += len(questions)
+            for question_type, count in counts.items():
+                total += count
+                satisfied += min(count, sum(
+                    doc.metadata["question_type"] == question_type for doc in by_type.get(question_type, [])
+                ))
+        latencies.sort()
+        print(
+            f"{name:>10} | {satisfied / total:>13.3f} | {duplicates / max(selected, 1):>9.3f} | "
+            f"{statistics.median(latencies) * 1000:>8.2f} | "
+            f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:>8.2f}"
+        )
+    print(f"quota+cache 检索结果缓存命中率: {bank.retrieval_cache.results.stats()['hit_rate']:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="单次混合检索与按类型配额检索的对比")
+    parser.add_argument("--questions-per-type", type=int, default=300, help="每个类型的题目数")
+    parser.add_argument("--rounds", type=int, default=50, help="选题轮数")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="每次 embedding 请求的模拟延迟（秒）")
+    args = parser.parse_args()
+    asyncio.run(main(args.questions_per_type, args.rounds, args.embed_latency))
@@ -0,0 +1,122 @@
+"""
+向量压缩基准：对比不同索引维度、存储精度下 QuestionBank.search_questions 的内存、磁盘和 recall@k
+
+使用合成数据：文档向量围绕若干主题中心分布，各维度方差按下标递减（模拟 text-embedding-v4
+前若干维携带主要信息的特性），查询为随机文档加噪声。recall@k 以 float32 完整向量的精确检索结果为基准。
+
+用法：
+    python -m benchmarks.bench_vector_storage --docs 20000 --queries 200 --k 10
+"""
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import TableEmbeddings, isolate_storage
+
+tmp_dir = isolate_storage()
+
+from services.question_bank import QuestionBank  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+
+# (索引维度, 完整向量精度)，索引维度 0 表示不截断
+CONFIGS = [
+    (0, "float32"),
+    (0, "float16"),
+    (0, "int8"),
+    (256, "float32"),
+    (256, "float16"),
+    (256, "int8"),
+    (128, "int8"),
+]
+
+
+def build_dataset(docs: int, queries: int, dimension: int, seed: int = 0):
+    """生成合成的文档向量和查询向量（均已归一化）"""
+    rng = np.random.default_rng(seed)
+    decay = (1 + np.arange(dimension) / 64) ** -1
+    centers = rng.standard_normal((max(docs // 100, 1), dimension))
+    doc_vectors = centers[rng.integers(len(centers), size=docs)] + 0.8 * rng.standard_normal((docs, dimension))
+    doc_vectors *= decay
+    doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+
+    query_vectors = doc_vectors[rng.integers(docs, size=queries)] + 0.05 * rng.standard_normal((queries, dimension))
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return doc_vectors.astype(np.float32), query_vectors.astype(np.float32)
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+
+def run_config(index_dimension, dtype, doc_vectors, query_vectors, truth, k, batch_size=1000):
+    """在独立目录中导入并检索，返回统计结果"""
+    directory = Path(tmp_dir) / f"vector_db_{index_dimension}_{dtype}"
+    os.environ["VECTOR_DB_DIR"] = str(directory)
+    os.environ["VECTOR_INDEX_DIMENSION"] = str(index_dimension)
+    os.environ["VECTOR_STORAGE_DTYPE"] = dtype
+
+    table = {f"doc-{i}": vector.tolist() for i, vector in enumerate(doc_vectors)}
+    table.update({f"query-{i}": vector.tolist() for i, vector in enumerate(query_vectors)})
+
+    bank = QuestionBank()
+    bank.embeddings = TableEmbeddings(table)
+
+    start = time.perf_counter()
+    for offset in range(0, len(doc_vectors), batch_size):
+        ids = range(offset, min(offset + batch_size, len(doc_vectors)))
+        documents = [Document(page_content=f"doc-{i}", metadata={"doc": i}) for i in ids]
+        bank._upsert_documents(documents, [table[doc.page_content] for doc in documents])
+    import_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for i in range(len(query_vectors)):
+        start = time.perf_counter()
+        results = bank.search_questions(f"query-{i}", k=k)
+        latencies.append(time.perf_counter() - start)
+        hits += len({doc.metadata["doc"] for doc in results} & set(truth[i]))
+
+    full_vectors_bytes = directory_size(bank.full_vectors_directory)
+    index_dimension_used = index_dimension or doc_vectors.shape[1]
+    return {
+        "index_mb": len(doc_vectors) * index_dimension_used * 4 / 1024 / 1024,
+        "full_mb": full_vectors_bytes / 1024 / 1024,
+        "disk_mb": directory_size(directory) / 1024 / 1024,
+        "recall": hits / (len(query_vectors) * k),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "import_s": import_seconds,
+    }
+
+
+def main(docs: int, queries: int, k: int, dimension: int, rescore_factor: int):
+    os.environ["VECTOR_RESCORE_FACTOR"] = str(rescore_factor)
+    doc_vectors, query_vectors = build_dataset(docs, queries, dimension)
+    truth = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+
+    print(f"文档数: {docs}  查询数: {queries}  维度: {dimension}  k={k}  重排序候选: k*{rescore_factor}")
+    print(
+        f"{'索引维度':>8} | {'完整向量精度':>10} | {'索引向量(MB)':>12} | {'完整向量(MB)':>12} | "
+        f"{'磁盘(MB)':>9} | {'recall@k':>8} | {'p50(ms)':>8} | {'导入(s)':>7}"
+    )
+    for index_dimension, dtype in CONFIGS:
+        stats = run_config(index_dimension, dtype, doc_vectors, query_vectors, truth, k)
+        print(
+            f"{index_dimension or dimension:>12} | {dtype:>16} | {stats['index_mb']:>16.1f} | "
+            f"{stats['full_mb']:>16.1f} | {stats['disk_mb']:>11.1f} | {stats['recall']:>8.3f} | "
+            f"{stats['p50_ms']:>8.2f} | {stats['import_s']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="向量压缩的内存 / 磁盘 / recall@k 对比")
+    parser.add_argument("--docs", type=int, default=20000, help="文档数")
+    parser.add_argument("--queries", type=int, default=200, help="查询数")
+    parser.add_argument("--k", type=int, default=10, help="返回结果数")
+    parser.add_argument("--dimension", type=int, default=1024, help="完整向量维度")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="重排序候选倍数")
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.k, args.dimension, args.rescore_factor)
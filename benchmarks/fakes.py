@@ -0,0 +1,144 @@
+"""
+基准测试用的模拟组件：固定延迟的 Chat 模型和隔离的存储目录
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class LatencyChatModel(BaseChatModel):
+    """
+    按固定延迟返回预设回复的 Chat 模型，用于模拟 LLM 网络等待
+    
+    routes 中的 (关键词, 回复) 按顺序匹配系统提示词，命中则返回对应回复，否则轮流返回 responses。
+    latency 为首个 token 前的等待，token_latency 为之后每 chunk_size 个字符的生成耗时。
+    """
+    
+    latency: float = 1.0
+    token_latency: float = 0.0
+    chunk_size: int = 4
+    responses: List[str] = ["好的。"]
+    routes: List[Tuple[str, str]] = []
+    _index: int = 0
+    
+    @property
+    def _llm_type(self) -> str:
+        return "latency-fake"
+    
+    def _next_response(self, messages: List[BaseMessage]) -> str:
+        system_prompt = str(messages[0].content) if messages else ""
+        for keyword, response in self.routes:
+            if keyword in system_prompt:
+                return response
+        
+        response = self.responses[self._index % len(self.responses)]
+        self._index += 1
+        return response
+    
+    def _chunks(self, response: str) -> List[str]:
+        return [response[i:i + self.chunk_size] for i in range(0, len(response), self.chunk_size)]
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response = self._next_response(messages)
+        time.sleep(self.latency + self.token_latency * len(self._chunks(response)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response = self._next_response(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(self._chunks(response)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        response = self._next_response(messages)
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(response):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+class TableEmbeddings(Embeddings):
+    """按文本查表返回预先生成向量的 Embeddings，用于合成数据的检索基准"""
+    
+    def __init__(self, table: Dict[str, List[float]]):
+        self.table = table
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.table[text] for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.table[text]
+
+
+class LatencyEmbeddings(Embeddings):
+    """
+    为 Embeddings 附加模拟的网络延迟：每 batch_size 条文本为一个请求，最多 concurrency 个请求并发，
+    每轮并发请求耗时 latency 秒（与 DashScopeEmbeddings 的分批并发方式一致）
+    """
+    
+    def __init__(self, inner: Embeddings, latency: float, batch_size: int = 10, concurrency: int = 8):
+        self.inner = inner
+        self.latency = latency
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+    
+    def _delay(self, count: int) -> float:
+        requests = -(-count // self.batch_size)
+        return self.latency * -(-requests // self.concurrency)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._delay(len(texts)))
+        return self.inner.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self.inner.embed_query(text)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._delay(len(texts)))
+        return await asyncio.to_thread(self.inner.embed_documents, texts)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self.inner.embed_query(text)
+
+
+def isolate_storage() -> str:
+    """
+    将数据库、向量库指向临时目录，并补齐占位 API Key，避免基准测试污染正式数据
+    
+    必须在导入 api / services 模块之前调用。
+    
+    Returns:
+        临时目录路径
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="ai_interviewer_bench_")
+    os.environ["INTERVIEW_DB_PATH"] = os.path.join(tmp_dir, "interviews.db")
+    os.environ["VECTOR_DB_DIR"] = os.path.join(tmp_dir, "vector_db")
+    os.environ.setdefault("DEEPSEEK_API_KEY", "bench-placeholder")
+    os.environ.setdefault("DASHSCOPE_API_KEY", "bench-placeholder")
+    return tmp_dir
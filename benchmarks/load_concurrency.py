@@ -0,0 +1,85 @@
+"""
+并发压测：对比同步路由（线程池）与异步路由在 LLM 等待期间的并发能力
+
+同步路由每个请求占用一个 Starlette 线程池工作线程（默认 40 个），
+异步路由在等待 LLM 时只挂起协程，单个 worker 可同时持有数百个请求。
+
+用法：
+    python -m benchmarks.load_concurrency --latency 1.0 --concurrency 10 40 100 200
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import LatencyChatModel, isolate_storage
+
+isolate_storage()
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from api.router import router  # noqa: E402
+from schemas.chat import StartInterviewRequest, StartInterviewResponse  # noqa: E402
+from services.interview_service import interview_service  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    """构建压测应用：正式路由（异步）+ 一个等价的同步路由作为对照"""
+    app = FastAPI()
+    app.include_router(router)
+    
+    @app.post("/bench/sync-start", response_model=StartInterviewResponse)
+    def sync_start(req: StartInterviewRequest) -> StartInterviewResponse:
+        session = interview_service.start_interview(
+            resume_content=req.resume_content,
+            job_requirements=req.job_requirements,
+        )
+        return StartInterviewResponse(
+            session_id=session.session_id,
+            opening=session.history[-1]["content"],
+            stage=session.stage.value,
+        )
+    
+    return app
+
+
+async def run_level(client: httpx.AsyncClient, path: str, concurrency: int) -> float:
+    """并发发送 concurrency 个请求，返回总耗时（秒）"""
+    payload = {"resume_content": "五年Java开发经验，负责订单系统重构。"}
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post(path, json=payload) for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise RuntimeError(f"{path} 有 {len(failed)} 个请求失败: {failed[0].text}")
+    return elapsed
+
+
+async def main(latency: float, levels: list) -> None:
+    interview_service.interviewer.llm = LatencyChatModel(
+        latency=latency,
+        responses=["欢迎参加本次面试。"],
+    )
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    
+    print(f"模拟 LLM 延迟: {latency:.2f}s")
+    print(f"{'并发数':>8} | {'同步耗时(s)':>12} | {'同步吞吐(req/s)':>16} | {'异步耗时(s)':>12} | {'异步吞吐(req/s)':>16}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for concurrency in levels:
+            sync_elapsed = await run_level(client, "/bench/sync-start", concurrency)
+            async_elapsed = await run_level(client, "/interview/start", concurrency)
+            print(
+                f"{concurrency:>8} | {sync_elapsed:>12.2f} | {concurrency / sync_elapsed:>16.1f} | "
+                f"{async_elapsed:>12.2f} | {concurrency / async_elapsed:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="同步/异步路由并发压测")
+    parser.add_argument("--latency", type=float, default=1.0, help="模拟的 LLM 响应延迟（秒）")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40, 100, 200], help="并发级别")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.concurrency))
@@ -1,12 +1,20 @@
 import os
-from typing import Optional
+import threading
+from typing import Dict, Optional, Tuple
 
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
 
 DEEPSEEK_API_KEY_ENV = "DEEPSEEK_API_KEY"
 DEEPSEEK_BASE_URL_ENV = "DEEPSEEK_BASE_URL"
 DEEPSEEK_MODEL_ENV = "DEEPSEEK_MODEL"
+LLM_JSON_MODE_ENV = "LLM_JSON_MODE"
+
+# 进程级 LLM 客户端注册表：相同配置的 get_llm 调用返回同一个实例
+_llm_registry: Dict[Tuple, BaseChatModel] = {}
+_llm_registry_lock = threading.Lock()
 
 
 def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
@@ -18,7 +26,8 @@ def get_llm(
     model: Optional[str] = None,
     api_key: Optional[str] = None,
     base_url: Optional[str] = None,
-) -> ChatOpenAI:
+    cache: bool = False,
+) -> BaseChatModel:
     """
     返回配置好的 DeepSeek Chat LLM（OpenAI 兼容）。
 
@@ -26,10 +35,22 @@ def get_llm(
       - DEEPSEEK_API_KEY（必需）
       - DEEPSEEK_BASE_URL（可选，默认 https://api.deepseek.com/v1）
       - DEEPSEEK_MODEL（可选，默认 deepseek-chat）
+
+    cache=True 时挂载持久化响应缓存（见 core.llm_cache.CachedChatModel），相同模型、温度和消息的请求直接返回缓存结果，
+    只适合提示词固定的调用。流式调用未命中时照常逐段输出，结束后写入缓存；命中时一次返回完整结果。
+
+    相同配置的调用返回进程内共享的同一个实例，所有实例复用 core.http_clients 中的长连接池。
+
+    LLM_REPLAY_MODE=record / replay 时返回录制回放模型（见 core.replay），回放模式不需要 API Key。
+    录制和回放模式下都不挂载响应缓存：录制时每个请求都调用真实服务并写入录制文件，
+    回放时每个请求都从录制文件返回并模拟延迟，多次回放的调用序列和耗时一致，回放结果也不会写入响应缓存。
     """
 
+    from core.replay import REPLAY_MODE_REPLAY, get_replay_mode
+
+    replay_mode = get_replay_mode()
     resolved_api_key = api_key or get_env(DEEPSEEK_API_KEY_ENV)
-    if not resolved_api_key:
+    if not resolved_api_key and replay_mode != REPLAY_MODE_REPLAY:
         raise RuntimeError(
             f"缺少 {DEEPSEEK_API_KEY_ENV}，请在环境变量中配置 DeepSeek API Key"
         )
@@ -37,12 +58,85 @@ def get_llm(
     resolved_base_url = base_url or get_env(DEEPSEEK_BASE_URL_ENV, "https://api.deepseek.com/v1")
     resolved_model = model or get_env(DEEPSEEK_MODEL_ENV, "deepseek-chat")
 
+    registry_key = (resolved_model, resolved_api_key, resolved_base_url, cache, replay_mode)
+    with _llm_registry_lock:
+        llm = _llm_registry.get(registry_key)
+        if llm is None:
+            if replay_mode == REPLAY_MODE_REPLAY:
+                llm = _create_replay_llm(resolved_model, replay_mode)
+            else:
+                llm = _create_llm(resolved_model, resolved_api_key, resolved_base_url, cache, replay_mode)
+            _llm_registry[registry_key] = llm
+        return llm
+
+
+def _with_cache(llm: BaseChatModel, cache: bool) -> BaseChatModel:
+    """cache=True 且启用了响应缓存时，用挂载缓存的模型包装"""
+    if cache:
+        from core.llm_cache import CachedChatModel, get_response_cache
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            return CachedChatModel(inner=llm, cache=response_cache)
+    return llm
+
+
+def _create_llm(model: str, api_key: str, base_url: str, cache: bool, replay_mode: str) -> BaseChatModel:
+    from core.http_clients import get_async_http_client, get_http_client
+    from core.replay import REPLAY_MODE_RECORD
+
     # 使用 OpenAI 兼容的 ChatOpenAI 客户端，并指定 base_url 与 api_key
-    return ChatOpenAI(
-        model=resolved_model,
-        api_key=resolved_api_key,
-        base_url=resolved_base_url,
+    llm = ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=0.3,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+    if replay_mode == REPLAY_MODE_RECORD:
+        # 录制模式下不使用响应缓存：缓存命中的请求不会到达录制模型，回放时会缺少这些请求的录制
+        return _create_replay_llm(model, replay_mode, inner=llm)
+    return _with_cache(llm, cache)
+
+
+def _create_replay_llm(model: str, replay_mode: str, inner: Optional[ChatOpenAI] = None) -> BaseChatModel:
+    from core.replay import ReplayChatModel
+
+    # 不挂载响应缓存：缓存命中会跳过录制文件和模拟延迟，回放基准的结果随缓存内容变化
+    return ReplayChatModel(
+        model_name=model,
         temperature=0.3,
+        mode=replay_mode,
+        inner=inner,
     )
 
 
+def with_json_mode(llm: BaseChatModel) -> Runnable:
+    """
+    启用 JSON 输出模式（response_format={"type": "json_object"}），保证模型只输出一个合法的 JSON 对象
+
+    读取环境变量 LLM_JSON_MODE（可选，默认 true），服务端不支持 JSON 模式时设置为 false，原样返回模型。
+    注意 JSON 模式要求提示词中包含 "json" 字样。
+    """
+    if get_env(LLM_JSON_MODE_ENV, "true").lower() in ("false", "0", "no"):
+        return llm
+    return llm.bind(response_format={"type": "json_object"})
+
+
+async def warmup_llm_clients() -> None:
+    """预热已注册 LLM 服务的连接，避免首个面试请求承担 TLS 握手"""
+    from core.http_clients import warmup_connections
+    from core.replay import REPLAY_MODE_REPLAY
+
+    with _llm_registry_lock:
+        # 回放模式不访问网络，无需预热
+        endpoints = {
+            (base_url, api_key)
+            for _, api_key, base_url, _, replay_mode in _llm_registry
+            if replay_mode != REPLAY_MODE_REPLAY
+        }
+
+    await warmup_connections([
+        (f"{base_url.rstrip('/')}/models", {"Authorization": f"Bearer {api_key}"})
+        for base_url, api_key in endpoints
+    ])
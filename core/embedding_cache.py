@@ -0,0 +1,233 @@
+"""
+Embedding 缓存：基于 SQLite 的持久化缓存，向量以 float32 二进制存储
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import get_env
+
+
+EMBEDDING_CACHE_ENABLED_ENV = "EMBEDDING_CACHE_ENABLED"
+EMBEDDING_CACHE_PATH_ENV = "EMBEDDING_CACHE_PATH"
+EMBEDDING_CACHE_MAX_MB_ENV = "EMBEDDING_CACHE_MAX_MB"
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "storage" / "cache" / "embedding_cache.db"
+
+# SQLite 单条语句的参数个数上限较低，批量查询时分组执行
+_QUERY_CHUNK_SIZE = 500
+
+
+class SQLiteEmbeddingCache:
+    """
+    SQLite 持久化的 Embedding 缓存
+    
+    缓存键为 (模型名, 维度, sha256(文本))，向量以 float32 二进制存储（1024 维约 4KB）。
+    总大小超过上限时按最近访问时间淘汰，淘汰到上限的 90% 以减少频繁淘汰。
+    命中只在内存中记录访问时间，下次写入时与新条目在同一个事务中写回，读取不产生写事务。
+    """
+    
+    def __init__(self, database_path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        初始化缓存
+        
+        Args:
+            database_path: SQLite 文件路径
+            max_bytes: 向量数据总大小上限（字节）
+        """
+        self.database_path = database_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # 命中后尚未写入数据库的访问时间：(模型名, 维度, 文本哈希) → 时间戳
+        self._accessed: Dict[Tuple[str, int, str], float] = {}
+        
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+            " model TEXT NOT NULL,"
+            " dimension INTEGER NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (model, dimension, text_hash))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embedding_cache_accessed ON embedding_cache (accessed_at)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache"
+        ).fetchone()[0]
+    
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def get_many(self, model: str, dimension: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        批量查找缓存
+        
+        Args:
+            model: 模型名称
+            dimension: 向量维度
+            texts: 文本列表
+        
+        Returns:
+            与输入顺序一致的向量列表，未命中的位置为 None
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), _QUERY_CHUNK_SIZE):
+                chunk = unique_hashes[i:i + _QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache"
+                    f" WHERE model = ? AND dimension = ? AND text_hash IN ({placeholders})",
+                    (model, dimension, *chunk),
+                ).fetchall()
+                found.update(rows)
+            
+            now = time.time()
+            for text_hash in found:
+                self._accessed[(model, dimension, text_hash)] = now
+            
+            results = [
+                np.frombuffer(found[text_hash], dtype=np.float32).tolist() if text_hash in found else None
+                for text_hash in hashes
+            ]
+            hit_count = sum(result is not None for result in results)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        
+        return results
+    
+    def put_many(self, model: str, dimension: int, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """
+        批量写入缓存
+        
+        Args:
+            model: 模型名称
+            dimension: 向量维度
+            texts: 文本列表
+            vectors: 与文本一一对应的向量
+        """
+        now = time.time()
+        rows = [
+            (model, dimension, self.text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        rows = list({row[2]: row for row in rows}.values())  # 同一批中的重复文本只写一次
+        with self._lock:
+            # 覆盖已有条目时先扣除旧条目的大小
+            for row in rows:
+                previous = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embedding_cache WHERE model = ? AND dimension = ? AND text_hash = ?",
+                    row[:3],
+                ).fetchone()
+                if previous:
+                    self._total_bytes -= previous[0]
+                self._total_bytes += len(row[3])
+            
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, dimension, text_hash, vector, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._flush_accessed()
+            self._evict()
+            self._conn.commit()
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM embedding_cache")
+            self._conn.commit()
+            self._total_bytes = 0
+    
+    def _flush_accessed(self):
+        """写入内存中记录的访问时间（调用方需持有锁）"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE embedding_cache SET accessed_at = ? WHERE model = ? AND dimension = ? AND text_hash = ?",
+                [(accessed_at, *key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+    
+    def _evict(self):
+        """总大小超过上限时，按最近访问时间淘汰到上限的 90%（调用方需持有锁）"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute(
+            "SELECT model, dimension, text_hash, LENGTH(vector) FROM embedding_cache ORDER BY accessed_at ASC"
+        )
+        evicted = []
+        for model, dimension, text_hash, size in cursor:
+            if self._total_bytes <= target:
+                break
+            evicted.append((model, dimension, text_hash))
+            self._total_bytes -= size
+        cursor.close()
+        
+        self._conn.executemany(
+            "DELETE FROM embedding_cache WHERE model = ? AND dimension = ? AND text_hash = ?",
+            evicted,
+        )
+    
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            total_bytes = self._total_bytes
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_embedding_cache: Optional[SQLiteEmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[SQLiteEmbeddingCache]:
+    """
+    获取进程内共享的 Embedding 缓存
+    
+    读取环境变量：
+      - EMBEDDING_CACHE_ENABLED（可选，默认 true，设置为 false 关闭缓存）
+      - EMBEDDING_CACHE_PATH（可选，默认 storage/cache/embedding_cache.db）
+      - EMBEDDING_CACHE_MAX_MB（可选，向量数据总大小上限，默认 512）
+    
+    Returns:
+        缓存实例，未启用时返回 None
+    """
+    global _embedding_cache
+    if get_env(EMBEDDING_CACHE_ENABLED_ENV, "true").lower() in ("false", "0", "no"):
+        return None
+    
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = SQLiteEmbeddingCache(
+                database_path=get_env(EMBEDDING_CACHE_PATH_ENV, str(DEFAULT_CACHE_PATH)),
+                max_bytes=int(float(get_env(EMBEDDING_CACHE_MAX_MB_ENV, "512")) * 1024 * 1024),
+            )
+        return _embedding_cache
@@ -1,16 +1,51 @@
 """
 阿里云 text-embedding-v4 模型集成
 """
+import asyncio
 import os
-from typing import List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
 
 import dashscope
+import httpx
 from langchain_core.embeddings import Embeddings
 
 from core.config import get_env
+from core.embedding_cache import get_embedding_cache
+from core.http_clients import get_async_http_client
+from core.rate_limit import (
+    EMBEDDING_MAX_CONCURRENCY_ENV,
+    DashScopeAPIError,
+    get_dashscope_limits,
+    get_max_retries,
+)
 
 
 DASHSCOPE_API_KEY_ENV = "DASHSCOPE_API_KEY"
+DASHSCOPE_EMBEDDING_DIMENSION_ENV = "DASHSCOPE_EMBEDDING_DIMENSION"
+DASHSCOPE_HTTP_BASE_URL_ENV = "DASHSCOPE_HTTP_BASE_URL"
+EMBEDDING_BACKEND_ENV = "EMBEDDING_BACKEND"
+
+EMBEDDING_BACKEND_DASHSCOPE = "dashscope"
+EMBEDDING_BACKEND_LOCAL = "local"
+EMBEDDING_BACKENDS = (EMBEDDING_BACKEND_DASHSCOPE, EMBEDDING_BACKEND_LOCAL)
+
+# 批量 embedding 的共享线程池（并发数同时受 AIMD 限制器控制）
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(get_env(EMBEDDING_MAX_CONCURRENCY_ENV, "8")),
+                thread_name_prefix="dashscope-embedding",
+            )
+        return _executor
 
 
 class DashScopeEmbeddings(Embeddings):
@@ -21,6 +56,7 @@ class DashScopeEmbeddings(Embeddings):
         model: str = "text-embedding-v4",
         api_key: Optional[str] = None,
         dimension: int = 1024,
+        use_cache: bool = True,
     ):
         """
         初始化 DashScope Embeddings
@@ -29,6 +65,7 @@ class DashScopeEmbeddings(Embeddings):
             model: 模型名称，默认 text-embedding-v4
             api_key: API密钥，如果不提供则从环境变量 DASHSCOPE_API_KEY 读取
             dimension: 向量维度，支持 64, 128, 256, 512, 768, 1024, 1536, 2048，默认 1024
+            use_cache: 是否使用持久化 Embedding 缓存（见 core.embedding_cache）
         """
         self.model = model
         self.api_key = api_key or get_env(DASHSCOPE_API_KEY_ENV)
@@ -41,6 +78,7 @@ class DashScopeEmbeddings(Embeddings):
         dashscope.api_key = self.api_key
         
         self.dimension = dimension
+        self.cache = get_embedding_cache() if use_cache else None
     
     def _embed(self, texts: List[str]) -> List[List[float]]:
         """
@@ -60,9 +98,7 @@ class DashScopeEmbeddings(Embeddings):
             )
             
             if response.status_code != 200:
-                raise Exception(
-                    f"DashScope API 调用失败: {response.status_code}, {response.message}"
-                )
+                raise DashScopeAPIError(response.status_code, response.message)
             
             # 提取embeddings
             # response.output['embeddings'] 是一个列表，每个元素是 {'embedding': [...]}
@@ -74,12 +110,14 @@ class DashScopeEmbeddings(Embeddings):
             else:
                 raise Exception(f"DashScope API 返回格式错误: status_code={response.status_code}, response={response}")
             
+        except DashScopeAPIError:
+            raise
         except Exception as e:
             raise Exception(f"生成embeddings失败: {str(e)}")
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """
-        为文档列表生成embeddings
+        为文档列表生成embeddings（先查缓存，只为未命中的文本调用 API）
         
         Args:
             texts: 文档文本列表
@@ -87,17 +125,81 @@ class DashScopeEmbeddings(Embeddings):
         Returns:
             embeddings列表
         """
+        if self.cache is None:
+            return self._embed_batches(texts)
+        
+        all_embeddings, missing_texts = self._lookup_cache(texts)
+        if missing_texts:
+            missing_embeddings = self._embed_batches(missing_texts)
+            all_embeddings = self._fill_cache(texts, all_embeddings, missing_texts, missing_embeddings)
+        
+        return all_embeddings
+    
+    def _lookup_cache(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[str]]:
+        """查缓存，返回 (按输入顺序的结果, 去重后的未命中文本)"""
+        all_embeddings = self.cache.get_many(self.model, self.dimension, texts)
+        missing_texts = list(dict.fromkeys(
+            text for text, embedding in zip(texts, all_embeddings) if embedding is None
+        ))
+        return all_embeddings, missing_texts
+    
+    def _fill_cache(
+        self,
+        texts: List[str],
+        all_embeddings: List[Optional[List[float]]],
+        missing_texts: List[str],
+        missing_embeddings: List[List[float]],
+    ) -> List[List[float]]:
+        """写入新生成的向量，并补齐结果中未命中的位置"""
+        self.cache.put_many(self.model, self.dimension, missing_texts, missing_embeddings)
+        embedded = dict(zip(missing_texts, missing_embeddings))
+        return [
+            embedding if embedding is not None else embedded[text]
+            for text, embedding in zip(texts, all_embeddings)
+        ]
+    
+    def _embed_batches(self, texts: List[str]) -> List[List[float]]:
+        """
+        分批调用 API 生成embeddings
+        
+        多个批次通过共享线程池并发发送，受令牌桶限流和 AIMD 自适应并发控制，
+        结果按输入顺序拼接。
+        """
         # DashScope API 限制每批最多 10 个文本
         batch_size = 10
-        all_embeddings = []
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
         
-        # 分批处理
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = self._embed(batch)
-            all_embeddings.extend(batch_embeddings)
+        if len(batches) <= 1:
+            results = [self._call_with_limits(self._embed, batch) for batch in batches]
+        else:
+            # map 按提交顺序返回结果
+            results = list(_get_executor().map(lambda batch: self._call_with_limits(self._embed, batch), batches))
         
-        return all_embeddings
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+    
+    def _call_with_limits(self, func: Callable, *args):
+        """在限流和并发控制下调用 API，限流（429）和服务端错误（5xx）按指数退避重试"""
+        bucket, limiter = get_dashscope_limits()
+        max_retries = get_max_retries()
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                bucket.acquire()
+                result = func(*args)
+            except DashScopeAPIError as e:
+                if not e.retryable or attempt == max_retries:
+                    raise
+                limiter.on_throttle()
+                status_code = e.status_code
+                delay = min(0.5 * 2 ** attempt, 8.0)
+            else:
+                limiter.on_success()
+                return result
+            finally:
+                limiter.release()
+            
+            print(f"DashScope 请求失败（{status_code}），{delay:.1f}s 后重试（第 {attempt + 1} 次）")
+            time.sleep(delay)
     
     def embed_query(self, text: str) -> List[float]:
         """
@@ -109,6 +211,18 @@ class DashScopeEmbeddings(Embeddings):
         Returns:
             embedding向量
         """
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, self.dimension, [text])[0]
+            if cached is not None:
+                return cached
+        
+        embedding = self._call_with_limits(self._embed_query, text)
+        if self.cache is not None:
+            self.cache.put_many(self.model, self.dimension, [text], [embedding])
+        return embedding
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """调用 API 为单条查询文本生成embedding"""
         try:
             response = dashscope.TextEmbedding.call(
                 model=self.model,
@@ -117,9 +231,7 @@ class DashScopeEmbeddings(Embeddings):
             )
             
             if response.status_code != 200:
-                raise Exception(
-                    f"DashScope API 调用失败: {response.status_code}, {response.message}"
-                )
+                raise DashScopeAPIError(response.status_code, response.message)
             
             # 提取embedding
             # response.output['embeddings'][0]['embedding'] 是单个向量
@@ -128,6 +240,164 @@ class DashScopeEmbeddings(Embeddings):
             else:
                 raise Exception(f"DashScope API 返回格式错误: status_code={response.status_code}, response={response}")
                 
+        except DashScopeAPIError:
+            raise
         except Exception as e:
             raise Exception(f"生成query embedding失败: {str(e)}")
 
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        异步为文档列表生成embeddings
+        
+        直接调用 DashScope HTTP 接口（复用 core.http_clients 的共享连接池），
+        多个批次并发发送，与同步版本共用缓存、限流和并发控制。
+        """
+        if self.cache is None:
+            return await self._aembed_batches(texts)
+        
+        # 缓存读写需要等待锁，写入时还有事务提交和淘汰，放到线程中执行，不阻塞事件循环
+        all_embeddings, missing_texts = await asyncio.to_thread(self._lookup_cache, texts)
+        if missing_texts:
+            missing_embeddings = await self._aembed_batches(missing_texts)
+            all_embeddings = await asyncio.to_thread(
+                self._fill_cache, texts, all_embeddings, missing_texts, missing_embeddings
+            )
+        
+        return all_embeddings
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """异步为查询文本生成embedding"""
+        if self.cache is not None:
+            cached = (await asyncio.to_thread(self.cache.get_many, self.model, self.dimension, [text]))[0]
+            if cached is not None:
+                return cached
+        
+        embedding = (await self._acall_with_limits(self._aembed, [text]))[0]
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, self.model, self.dimension, [text], [embedding])
+        return embedding
+    
+    async def _aembed_batches(self, texts: List[str]) -> List[List[float]]:
+        """分批并发调用 API，结果按输入顺序拼接"""
+        batch_size = 10
+        results = await asyncio.gather(*[
+            self._acall_with_limits(self._aembed, texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ])
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+    
+    async def _acall_with_limits(self, func: Callable, *args):
+        """异步版本的 _call_with_limits"""
+        bucket, limiter = get_dashscope_limits()
+        max_retries = get_max_retries()
+        for attempt in range(max_retries + 1):
+            await limiter.aacquire()
+            try:
+                await bucket.aacquire()
+                result = await func(*args)
+            except DashScopeAPIError as e:
+                if not e.retryable or attempt == max_retries:
+                    raise
+                limiter.on_throttle()
+                status_code = e.status_code
+                delay = min(0.5 * 2 ** attempt, 8.0)
+            else:
+                limiter.on_success()
+                return result
+            finally:
+                limiter.release()
+            
+            print(f"DashScope 请求失败（{status_code}），{delay:.1f}s 后重试（第 {attempt + 1} 次）")
+            await asyncio.sleep(delay)
+    
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        通过 DashScope HTTP 接口批量生成embeddings
+        
+        Args:
+            texts: 文本列表（最多 10 个）
+            
+        Returns:
+            embeddings列表
+        """
+        base_url = get_env(DASHSCOPE_HTTP_BASE_URL_ENV, "https://dashscope.aliyuncs.com/api/v1")
+        try:
+            response = await get_async_http_client().post(
+                f"{base_url.rstrip('/')}/services/embeddings/text-embedding/text-embedding",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "model": self.model,
+                    "input": {"texts": texts},
+                    "parameters": {"dimension": self.dimension},
+                },
+            )
+        except httpx.HTTPError as e:
+            raise Exception(f"生成embeddings失败: {str(e)}")
+        
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        
+        if response.status_code != 200:
+            raise DashScopeAPIError(response.status_code, body.get("message") or response.text)
+        
+        try:
+            # output.embeddings 中每个元素为 {"text_index": 序号, "embedding": [...]}
+            items = sorted(body["output"]["embeddings"], key=lambda item: item.get("text_index", 0))
+            return [item["embedding"] for item in items]
+        except (KeyError, TypeError):
+            raise Exception(f"DashScope API 返回格式错误: status_code={response.status_code}, response={body}")
+
+
+def get_embedding_backend() -> str:
+    """
+    读取 Embedding 后端（环境变量 EMBEDDING_BACKEND）：
+      - dashscope（默认）：阿里云 DashScope 模型
+      - local：本地字符 n-gram 哈希向量，无需网络和 API Key（见 core.local_embeddings）
+    """
+    backend = get_env(EMBEDDING_BACKEND_ENV, EMBEDDING_BACKEND_DASHSCOPE).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"不支持的 Embedding 后端: {backend}，可选值: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
+
+
+def create_embeddings(model: str = "text-embedding-v4", dimension: Optional[int] = None) -> Embeddings:
+    """
+    创建问题库使用的 Embeddings
+    
+    读取环境变量：
+      - EMBEDDING_BACKEND（可选，默认 dashscope，local 时使用本地哈希向量，忽略模型名和录制回放）
+      - DASHSCOPE_API_KEY（dashscope 后端且非回放模式时必需）
+      - DASHSCOPE_EMBEDDING_DIMENSION（可选，默认 1024）
+      - LLM_REPLAY_MODE（可选，record / replay 时返回录制回放 Embeddings，见 core.replay）
+    
+    Args:
+        model: 模型名称
+        dimension: 向量维度，不提供时读取环境变量
+        
+    Returns:
+        Embeddings 实例
+    """
+    from core.replay import REPLAY_MODE_OFF, REPLAY_MODE_REPLAY, ReplayEmbeddings, get_replay_mode
+    
+    dimension = dimension or int(get_env(DASHSCOPE_EMBEDDING_DIMENSION_ENV, "1024"))
+    if get_embedding_backend() == EMBEDDING_BACKEND_LOCAL:
+        from core.local_embeddings import HashingEmbeddings
+        return HashingEmbeddings(dimension=dimension)
+    
+    replay_mode = get_replay_mode()
+    if replay_mode == REPLAY_MODE_REPLAY:
+        return ReplayEmbeddings(model=model, dimension=dimension)
+    
+    api_key = get_env(DASHSCOPE_API_KEY_ENV)
+    if not api_key:
+        raise ValueError(
+            f"需要配置 {DASHSCOPE_API_KEY_ENV} 环境变量用于embedding"
+        )
+    
+    embeddings = DashScopeEmbeddings(model=model, api_key=api_key, dimension=dimension)
+    if replay_mode == REPLAY_MODE_OFF:
+        return embeddings
+    return ReplayEmbeddings(model=model, dimension=dimension, mode=replay_mode, inner=embeddings)
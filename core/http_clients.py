@@ -0,0 +1,109 @@
+"""
+进程级共享的 HTTP 连接池：所有 LLM / Embedding 客户端复用同一组长连接
+"""
+import asyncio
+import importlib.util
+import threading
+from typing import Iterable, Optional, Tuple
+
+import httpx
+
+from core.config import get_env
+
+
+HTTP_MAX_CONNECTIONS_ENV = "HTTP_MAX_CONNECTIONS"
+HTTP_MAX_KEEPALIVE_ENV = "HTTP_MAX_KEEPALIVE_CONNECTIONS"
+HTTP_KEEPALIVE_EXPIRY_ENV = "HTTP_KEEPALIVE_EXPIRY"
+HTTP_TIMEOUT_ENV = "HTTP_TIMEOUT"
+HTTP2_ENABLED_ENV = "HTTP2_ENABLED"
+HTTP_WARMUP_CONNECTIONS_ENV = "HTTP_WARMUP_CONNECTIONS"
+
+
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def http2_enabled() -> bool:
+    """是否启用 HTTP/2（需要安装可选依赖 h2，且 HTTP2_ENABLED 未关闭）"""
+    if get_env(HTTP2_ENABLED_ENV, "true").lower() in ("false", "0", "no"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_options() -> dict:
+    """
+    连接池配置，读取环境变量：
+      - HTTP_MAX_CONNECTIONS（可选，默认 100）
+      - HTTP_MAX_KEEPALIVE_CONNECTIONS（可选，默认 20）
+      - HTTP_KEEPALIVE_EXPIRY（可选，空闲连接保活秒数，默认 120）
+      - HTTP_TIMEOUT（可选，请求超时秒数，默认 120）
+      - HTTP2_ENABLED（可选，默认 true，安装 h2 后生效）
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(get_env(HTTP_MAX_CONNECTIONS_ENV, "100")),
+            max_keepalive_connections=int(get_env(HTTP_MAX_KEEPALIVE_ENV, "20")),
+            keepalive_expiry=float(get_env(HTTP_KEEPALIVE_EXPIRY_ENV, "120")),
+        ),
+        "timeout": httpx.Timeout(float(get_env(HTTP_TIMEOUT_ENV, "120")), connect=10.0),
+        "http2": http2_enabled(),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    获取共享的异步 HTTP 客户端
+
+    连接绑定在首次使用它的事件循环上，服务进程内只有一个事件循环，因此可以全局共享。
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(**_client_options())
+        return _async_client
+
+
+async def warmup_connections(targets: Iterable[Tuple[str, dict]]) -> None:
+    """
+    预热连接：对每个目标并发发送若干轻量请求，提前完成 DNS、TCP 和 TLS 握手
+
+    Args:
+        targets: (URL, 请求头) 列表，URL 应指向开销很小的接口（如 /models）
+    """
+    client = get_async_http_client()
+    connections = int(get_env(HTTP_WARMUP_CONNECTIONS_ENV, "2"))
+
+    async def ping(url: str, headers: dict):
+        try:
+            await client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"连接预热失败: {url}, {e}")
+
+    await asyncio.gather(*[
+        ping(url, headers)
+        for url, headers in targets
+        for _ in range(connections)
+    ])
+
+
+async def close_http_clients() -> None:
+    """关闭共享客户端（应用退出时调用）"""
+    global _sync_client, _async_client
+    with _lock:
+        sync_client, async_client = _sync_client, _async_client
+        _sync_client = _async_client = None
+
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.aclose()
@@ -0,0 +1,164 @@
+"""
+模型 JSON 输出解析：完整文本的健壮提取，以及流式输出的增量解析
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """
+    从模型输出中提取第一个完整的 JSON 对象
+    
+    逐个尝试从 "{" 位置开始解码，支持嵌套对象、字符串中的花括号以及 ```json 代码块包裹。
+    
+    Args:
+        text: 模型原始输出
+    
+    Returns:
+        解析出的字典，找不到时返回 None
+    """
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def parse_bool(value: Any) -> bool:
+    """
+    解析模型输出的布尔字段
+    
+    模型有时把布尔值写成字符串，"false"、"否" 等按字面含义处理，而不是按非空字符串视为真。
+    
+    Args:
+        value: 字段值（布尔、数字、字符串或 None）
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "y", "1", "是", "需要")
+    return bool(value)
+
+
+class IncrementalJSONParser:
+    """
+    顶层 JSON 对象的增量解析器
+    
+    逐块喂入流式输出的 token，每当顶层对象的某个字段值完整输出时立即返回该字段，
+    不需要等待整个对象结束。例如 {"score": 85, "need_followup": true, "feedback": "..."}
+    在 feedback 还在生成时就已经能拿到 score 和 need_followup。
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # start → key → colon → value_start → value → key ...
+        self._state = "start"
+        self._token_start = 0
+        self._key: Optional[str] = None
+        self._value_kind: Optional[str] = None  # string / container / scalar
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        喂入一段输出
+        
+        Args:
+            chunk: 新输出的文本
+        
+        Returns:
+            本次新完成的 (字段名, 值) 列表
+        """
+        self.text += chunk
+        completed: List[Tuple[str, Any]] = []
+        
+        while self._pos < len(self.text) and not self.done:
+            ch = self.text[self._pos]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._state == "key":
+                        self._key = self._decode(self._token_start, self._pos + 1)
+                        self._state = "colon"
+                    elif self._value_kind == "string":
+                        self._complete(self._pos + 1, completed)
+            
+            elif self._state == "start":
+                if ch == "{":
+                    self._depth = 1
+                    self._state = "key"
+            
+            elif self._state == "key":
+                if ch == '"':
+                    self._in_string = True
+                    self._token_start = self._pos
+                elif ch == "}":
+                    self.done = True
+            
+            elif self._state == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+            
+            elif self._state == "value_start":
+                if not ch.isspace():
+                    self._token_start = self._pos
+                    self._state = "value"
+                    if ch == '"':
+                        self._value_kind = "string"
+                        self._in_string = True
+                    elif ch in "{[":
+                        self._value_kind = "container"
+                        self._depth += 1
+                    else:
+                        self._value_kind = "scalar"
+            
+            elif self._state == "value":
+                if ch == '"':
+                    self._in_string = True
+                elif self._value_kind == "container":
+                    if ch in "{[":
+                        self._depth += 1
+                    elif ch in "}]":
+                        self._depth -= 1
+                        if self._depth == 1:
+                            self._complete(self._pos + 1, completed)
+                elif ch == "," or ch == "}" or ch.isspace():
+                    self._complete(self._pos, completed)
+                    if ch == "}":
+                        self.done = True
+            
+            self._pos += 1
+        
+        return completed
+    
+    def _complete(self, end: int, completed: List[Tuple[str, Any]]):
+        """当前字段值输出完整，解码并记录"""
+        value = self._decode(self._token_start, end)
+        if isinstance(self._key, str) and value is not _INVALID:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+        self._key = None
+        self._value_kind = None
+        self._state = "key"
+    
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self.text[start:end])
+        except ValueError:
+            return _INVALID
+
+
+_INVALID = object()
@@ -0,0 +1,306 @@
+"""
+LLM 响应缓存：基于 SQLite 的持久化缓存，用于提示词固定的模型调用
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, Generation
+
+from core.config import get_env
+
+
+LLM_CACHE_ENABLED_ENV = "LLM_CACHE_ENABLED"
+LLM_CACHE_PATH_ENV = "LLM_CACHE_PATH"
+LLM_CACHE_TTL_ENV = "LLM_CACHE_TTL_SECONDS"
+LLM_CACHE_MAX_ENTRIES_ENV = "LLM_CACHE_MAX_ENTRIES"
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "storage" / "cache" / "llm_cache.db"
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    SQLite 持久化的 LLM 响应缓存
+    
+    缓存键为 sha256(llm_string + prompt)，其中 llm_string 包含模型名、温度等参数，
+    prompt 为渲染后的消息序列，因此只有完全相同的请求才会命中。
+    支持 TTL 过期和按最近访问时间淘汰的条目上限。
+    
+    命中时只在内存中记录访问时间，下次写入时批量更新，查找不产生写事务；
+    异步接口在线程中执行，不阻塞事件循环。
+    """
+    
+    def __init__(
+        self,
+        database_path: str,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_entries: int = 10000,
+    ):
+        """
+        初始化缓存
+        
+        Args:
+            database_path: SQLite 文件路径
+            ttl_seconds: 条目有效期（秒），None 表示永不过期
+            max_entries: 最大条目数，超出后淘汰最久未访问的条目
+        """
+        self.database_path = database_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # 命中后尚未写入数据库的访问时间：键 → 时间戳
+        self._accessed: Dict[str, float] = {}
+        
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " generations TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+    
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """查找缓存，未命中或已过期时返回 None"""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            generations, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            
+            self._accessed[key] = now
+            self.hits += 1
+        
+        return [ChatGeneration(message=AIMessage(content=text)) for text in json.loads(generations)]
+    
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """写入缓存，只保存生成文本"""
+        key = self._key(prompt, llm_string)
+        generations = json.dumps([generation.text for generation in return_val], ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, generations, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, generations, now, now),
+            )
+            self._flush_accessed()
+            self._evict()
+            self._conn.commit()
+    
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # 其他线程写入时需要等待锁和提交，放到线程中执行
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+    
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+    
+    def clear(self, **kwargs) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+    
+    def _flush_accessed(self):
+        """写入内存中记录的访问时间（调用方需持有锁）"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+    
+    def _evict(self):
+        """删除过期条目，并在超出上限时淘汰最久未访问的条目（调用方需持有锁）"""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+    
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    挂载响应缓存的 Chat 模型
+    
+    非流式调用走 LangChain 的缓存流程（cache 字段）。LangChain 的流式调用不检查缓存，这里的流式实现先查缓存：
+    命中时直接返回缓存的完整内容；未命中时逐段转发内层模型的流式输出，完整结束后再写入缓存
+    （中途出错或客户端断开时不写入）。缓存键与非流式调用相同，两种调用方式共用缓存条目。
+    """
+    
+    inner: BaseChatModel
+    
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.inner._llm_type}"
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+    
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        # 与内层模型单独挂载缓存时的键一致
+        return self.inner._get_llm_string(stop=stop, **kwargs)
+    
+    def _cache_key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict) -> tuple:
+        """与 LangChain 非流式缓存相同的 (prompt, llm_string)"""
+        messages = [message.model_copy(update={"id": None}) if message.id is not None else message for message in messages]
+        return dumps(messages), self._get_llm_string(stop=stop, **kwargs)
+    
+    def _inner_streams(self, async_api: bool) -> bool:
+        """内层模型是否实现了流式输出（未实现时一次返回完整结果）"""
+        inner_type = type(self.inner)
+        if inner_type._stream is not BaseChatModel._stream:
+            return True
+        return async_api and inner_type._astream is not BaseChatModel._astream
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.inner._generate(messages, stop=stop, **kwargs)
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self.inner._agenerate(messages, stop=stop, **kwargs)
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt, llm_string = self._cache_key(messages, stop, kwargs)
+        cached = self.cache.lookup(prompt, llm_string)
+        if cached:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=cached[0].text))
+            return
+        
+        parts = []
+        if self._inner_streams(async_api=False):
+            chunks = self.inner._stream(messages, stop=stop, **kwargs)
+        else:
+            text = self.inner._generate(messages, stop=stop, **kwargs).generations[0].text
+            chunks = [ChatGenerationChunk(message=AIMessageChunk(content=text))]
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+        self.cache.update(prompt, llm_string, [ChatGeneration(message=AIMessage(content="".join(parts)))])
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        prompt, llm_string = self._cache_key(messages, stop, kwargs)
+        cached = await self.cache.alookup(prompt, llm_string)
+        if cached:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=cached[0].text))
+            return
+        
+        parts = []
+        if not self._inner_streams(async_api=True):
+            result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+            parts.append(result.generations[0].text)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=parts[0]))
+        else:
+            async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+                parts.append(chunk.text)
+                yield chunk
+        await self.cache.aupdate(prompt, llm_string, [ChatGeneration(message=AIMessage(content="".join(parts)))])
+
+
+_response_cache: Optional[SQLiteLLMCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[SQLiteLLMCache]:
+    """
+    获取进程内共享的 LLM 响应缓存
+    
+    读取环境变量：
+      - LLM_CACHE_ENABLED（可选，默认 true，设置为 false 关闭缓存）
+      - LLM_CACHE_PATH（可选，默认 storage/cache/llm_cache.db）
+      - LLM_CACHE_TTL_SECONDS（可选，默认 7 天，0 表示永不过期）
+      - LLM_CACHE_MAX_ENTRIES（可选，默认 10000）
+    
+    Returns:
+        缓存实例，未启用时返回 None
+    """
+    global _response_cache
+    if get_env(LLM_CACHE_ENABLED_ENV, "true").lower() in ("false", "0", "no"):
+        return None
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            ttl_seconds = float(get_env(LLM_CACHE_TTL_ENV, str(7 * 24 * 3600)))
+            _response_cache = SQLiteLLMCache(
+                database_path=get_env(LLM_CACHE_PATH_ENV, str(DEFAULT_CACHE_PATH)),
+                ttl_seconds=ttl_seconds or None,
+                max_entries=int(get_env(LLM_CACHE_MAX_ENTRIES_ENV, "10000")),
+            )
+        return _response_cache
@@ -0,0 +1,85 @@
+"""
+本地 Embedding：字符 n-gram 哈希向量，无需网络和 API Key，用于离线开发和检索压测
+"""
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# 滚动哈希的乘数（FNV 素数）和最终混合常数（黄金分割）；哈希初值取 n，不同阶的 n-gram 互不干扰
+_HASH_PRIME = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# 每批向量化处理的文本数，限制 (文本数 × 维度) 中间矩阵的大小
+_BATCH_SIZE = 256
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    字符 n-gram 哈希 Embeddings
+    
+    中文没有空格分词，直接取字符 1~3-gram，经确定性哈希映射到 dimension 个桶中并带 ±1 符号
+    （降低哈希冲突带来的偏差），词频取对数后做 L2 归一化。整批文本拼接后用 NumPy 一次性计算，
+    单线程每秒可处理数千个 1000 字的文本块。
+    
+    相似度只反映字面重叠，不具备语义理解能力，仅用于离线环境和压测。
+    """
+    
+    def __init__(self, dimension: int = 1024, ngram_range: Tuple[int, int] = (1, 3)):
+        """
+        Args:
+            dimension: 向量维度
+            ngram_range: 字符 n-gram 的最小、最大阶数
+        """
+        self.model = "local-hashing"
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return np.vstack([
+            self._encode(texts[i:i + _BATCH_SIZE]) for i in range(0, len(texts), _BATCH_SIZE)
+        ]).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        # 单条查询耗时在毫秒以内，直接计算；批量的 aembed_documents 沿用基类实现，在线程池中执行
+        return self.embed_query(text)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """将一批文本编码为 (len(texts), dimension) 的归一化矩阵"""
+        texts = [" ".join(text.lower().split()) for text in texts]
+        lengths = np.array([len(text) for text in texts])
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        doc_ids = np.repeat(np.arange(len(texts)), lengths)
+        
+        counts = np.zeros(len(texts) * self.dimension)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                break
+            
+            # 多项式滚动哈希（uint64 溢出即取模），只保留不跨文本边界的 n-gram
+            hashes = np.full(count, np.uint64(n))
+            for j in range(n):
+                hashes = hashes * _HASH_PRIME + codes[j:j + count]
+            valid = doc_ids[:count] == doc_ids[n - 1:]
+            hashes = hashes[valid] * _HASH_MIX
+            
+            buckets = ((hashes >> np.uint64(32)) % np.uint64(self.dimension)).astype(np.int64)
+            signs = np.where(hashes & np.uint64(1 << 31), 1.0, -1.0)
+            counts += np.bincount(
+                doc_ids[:count][valid] * self.dimension + buckets,
+                weights=signs,
+                minlength=len(counts),
+            )
+        
+        vectors = counts.reshape(len(texts), self.dimension)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
@@ -0,0 +1,163 @@
+"""
+外部 API 调用的限流与自适应并发控制
+"""
+import asyncio
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from core.config import get_env
+
+
+EMBEDDING_MAX_CONCURRENCY_ENV = "EMBEDDING_MAX_CONCURRENCY"
+EMBEDDING_RATE_LIMIT_ENV = "EMBEDDING_RATE_LIMIT"
+EMBEDDING_MAX_RETRIES_ENV = "EMBEDDING_MAX_RETRIES"
+
+
+class DashScopeAPIError(Exception):
+    """DashScope API 返回非 200 状态码"""
+    
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"DashScope API 调用失败: {status_code}, {message}")
+        self.status_code = status_code
+    
+    @property
+    def retryable(self) -> bool:
+        """限流（429）和服务端错误（5xx）可以重试"""
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class TokenBucket:
+    """
+    令牌桶限流器：平均速率 rate 次/秒，允许 capacity 次的突发
+    
+    采用预约方式：令牌不足时先扣减（余额可为负），调用方按返回的等待时间休眠，
+    因此同步和异步调用可以共用同一个桶。
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def acquire(self):
+        """获取一个令牌（阻塞）"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def aacquire(self):
+        """异步获取一个令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    加性增、乘性减（AIMD）的自适应并发限制
+    
+    每次成功请求并发上限增加 1/上限（约每轮增加 1），遇到限流或服务端错误时减半，
+    同一秒内的多次失败只减一次，避免一批并发请求同时失败时上限被压到最低。
+    同步线程和协程可以共用同一个限制器。
+    """
+    
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(min(initial, max_limit))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    def acquire(self):
+        """占用一个并发名额（阻塞）"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+    
+    async def aacquire(self):
+        """异步占用一个并发名额"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+    
+    def release(self):
+        """释放并发名额"""
+        with self._cond:
+            self.in_flight -= 1
+            self._notify()
+    
+    def on_success(self):
+        """请求成功：加性增"""
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._notify()
+    
+    def on_throttle(self):
+        """遇到限流或服务端错误：乘性减"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= 1.0:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+    
+    def _notify(self):
+        """唤醒等待者（调用方需持有锁）"""
+        self._cond.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        self._async_waiters.clear()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_dashscope_limits: Optional[Tuple[TokenBucket, AIMDLimiter]] = None
+_dashscope_limits_lock = threading.Lock()
+
+
+def get_dashscope_limits() -> Tuple[TokenBucket, AIMDLimiter]:
+    """
+    获取进程内共享的 DashScope 限流器和并发限制器（同一 API Key 的配额在所有调用间共享）
+    
+    读取环境变量：
+      - EMBEDDING_RATE_LIMIT（可选，每秒请求数上限，默认 20）
+      - EMBEDDING_MAX_CONCURRENCY（可选，最大并发请求数，默认 8）
+    """
+    global _dashscope_limits
+    with _dashscope_limits_lock:
+        if _dashscope_limits is None:
+            max_concurrency = int(get_env(EMBEDDING_MAX_CONCURRENCY_ENV, "8"))
+            _dashscope_limits = (
+                TokenBucket(rate=float(get_env(EMBEDDING_RATE_LIMIT_ENV, "20"))),
+                AIMDLimiter(initial=max_concurrency, max_limit=max_concurrency),
+            )
+        return _dashscope_limits
+
+
+def get_max_retries() -> int:
+    """可重试错误的最大重试次数（环境变量 EMBEDDING_MAX_RETRIES，默认 3）"""
+    return int(get_env(EMBEDDING_MAX_RETRIES_ENV, "3"))
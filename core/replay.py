@@ -0,0 +1,293 @@
+"""
+LLM / Embedding 录制回放：离线、可复现地运行面试流程和基准测试
+
+录制模式下正常调用真实服务，并把响应按请求哈希写入录制文件（cassette）；
+回放模式下直接从录制文件返回响应，不访问网络，可按配置模拟服务延迟。
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from core.config import get_env
+
+
+REPLAY_MODE_ENV = "LLM_REPLAY_MODE"
+REPLAY_CASSETTE_DIR_ENV = "REPLAY_CASSETTE_DIR"
+REPLAY_LATENCY_ENV = "REPLAY_LATENCY_SECONDS"
+REPLAY_TOKEN_LATENCY_ENV = "REPLAY_TOKEN_LATENCY_SECONDS"
+
+REPLAY_MODE_OFF = "off"
+REPLAY_MODE_RECORD = "record"
+REPLAY_MODE_REPLAY = "replay"
+REPLAY_MODES = (REPLAY_MODE_OFF, REPLAY_MODE_RECORD, REPLAY_MODE_REPLAY)
+
+DEFAULT_CASSETTE_DIR = Path(__file__).parent.parent / "storage" / "cassettes"
+
+# 回放流式输出时每个 chunk 的字符数
+REPLAY_CHUNK_SIZE = 4
+
+
+class CassetteMissError(KeyError):
+    """回放模式下找不到对应请求的录制"""
+
+
+def get_replay_mode() -> str:
+    """
+    读取录制回放模式（环境变量 LLM_REPLAY_MODE）：
+      - off（默认）：直接调用真实服务
+      - record：调用真实服务并录制响应
+      - replay：只从录制文件返回响应，不访问网络
+    """
+    mode = get_env(REPLAY_MODE_ENV, REPLAY_MODE_OFF).lower()
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"不支持的录制回放模式: {mode}，可选值: {', '.join(REPLAY_MODES)}")
+    return mode
+
+
+def request_key(payload: Any) -> str:
+    """请求哈希：对规范化的 JSON 序列化结果取 sha256"""
+    return hashlib.sha256(
+        json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class Cassette:
+    """
+    录制文件：每行一条 {"key": 请求哈希, "response": 响应} 的 JSONL 文件
+    
+    录制时追加写入，同一请求重复录制以最后一条为准。
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Any] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["response"]
+    
+    def get(self, key: str) -> Any:
+        """读取录制，找不到时抛出 CassetteMissError"""
+        try:
+            return self._entries[key]
+        except KeyError:
+            raise CassetteMissError(
+                f"录制文件 {self.path} 中没有请求 {key[:12]} 的响应，请先以 record 模式运行一次"
+            ) from None
+    
+    def put(self, key: str, response: Any):
+        """追加一条录制"""
+        with self._lock:
+            self._entries[key] = response
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "response": response}, ensure_ascii=False) + "\n")
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(name: str) -> Cassette:
+    """获取进程内共享的录制文件（目录由 REPLAY_CASSETTE_DIR 指定，默认 storage/cassettes）"""
+    path = Path(get_env(REPLAY_CASSETTE_DIR_ENV, str(DEFAULT_CASSETTE_DIR))) / f"{name}.jsonl"
+    with _cassettes_lock:
+        cassette = _cassettes.get(str(path))
+        if cassette is None:
+            cassette = Cassette(path)
+            _cassettes[str(path)] = cassette
+        return cassette
+
+
+def _replay_latency() -> float:
+    return float(get_env(REPLAY_LATENCY_ENV, "0"))
+
+
+def _replay_token_latency() -> float:
+    return float(get_env(REPLAY_TOKEN_LATENCY_ENV, "0"))
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    录制回放 Chat 模型
+    
+    请求哈希由模型名、温度、调用参数（如 response_format）和消息序列组成。
+    回放时首个 token 前等待 REPLAY_LATENCY_SECONDS，流式输出每个 chunk 等待 REPLAY_TOKEN_LATENCY_SECONDS。
+    """
+    
+    model_name: str
+    temperature: Optional[float] = None
+    mode: str = REPLAY_MODE_REPLAY
+    inner: Optional[BaseChatModel] = None  # 录制模式下的真实模型
+    
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+    
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict) -> str:
+        return request_key({
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "stop": stop,
+            "kwargs": kwargs,
+            "messages": [{"type": message.type, "content": message.content} for message in messages],
+        })
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        cassette = get_cassette("llm")
+        if self.mode == REPLAY_MODE_RECORD:
+            result = self.inner._generate(messages, stop=stop, **kwargs)
+            cassette.put(key, result.generations[0].text)
+            return result
+        
+        content = cassette.get(key)
+        time.sleep(_replay_latency() + _replay_token_latency() * len(_chunks(content)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        cassette = get_cassette("llm")
+        if self.mode == REPLAY_MODE_RECORD:
+            result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+            cassette.put(key, result.generations[0].text)
+            return result
+        
+        content = cassette.get(key)
+        await asyncio.sleep(_replay_latency() + _replay_token_latency() * len(_chunks(content)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, kwargs)
+        cassette = get_cassette("llm")
+        if self.mode == REPLAY_MODE_RECORD:
+            parts = []
+            for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+                parts.append(chunk.text)
+                yield chunk
+            cassette.put(key, "".join(parts))
+            return
+        
+        content = cassette.get(key)
+        time.sleep(_replay_latency())
+        for part in _chunks(content):
+            time.sleep(_replay_token_latency())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=part))
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, kwargs)
+        cassette = get_cassette("llm")
+        if self.mode == REPLAY_MODE_RECORD:
+            parts = []
+            async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+                parts.append(chunk.text)
+                yield chunk
+            cassette.put(key, "".join(parts))
+            return
+        
+        content = cassette.get(key)
+        await asyncio.sleep(_replay_latency())
+        for part in _chunks(content):
+            await asyncio.sleep(_replay_token_latency())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=part))
+
+
+class ReplayEmbeddings(Embeddings):
+    """
+    录制回放 Embeddings
+    
+    按单条文本录制（请求哈希由模型名、维度和文本组成），与调用时的分批方式无关。
+    回放时每次调用等待 REPLAY_LATENCY_SECONDS。
+    """
+    
+    def __init__(self, model: str, dimension: int, mode: str = REPLAY_MODE_REPLAY, inner: Optional[Embeddings] = None):
+        """
+        Args:
+            model: 模型名称
+            dimension: 向量维度
+            mode: record 或 replay
+            inner: 录制模式下的真实 Embeddings
+        """
+        if mode == REPLAY_MODE_RECORD and inner is None:
+            raise ValueError("录制模式需要传入真实的 Embeddings")
+        self.model = model
+        self.dimension = dimension
+        self.mode = mode
+        self.inner = inner
+        self.cassette = get_cassette("embeddings")
+    
+    def _key(self, text: str) -> str:
+        return request_key({"model": self.model, "dimension": self.dimension, "text": text})
+    
+    def _record(self, texts: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+        for text, embedding in zip(texts, embeddings):
+            self.cassette.put(self._key(text), embedding)
+        return embeddings
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.mode == REPLAY_MODE_RECORD:
+            return self._record(texts, self.inner.embed_documents(texts))
+        time.sleep(_replay_latency())
+        return [self.cassette.get(self._key(text)) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        if self.mode == REPLAY_MODE_RECORD:
+            return self._record([text], [self.inner.embed_query(text)])[0]
+        time.sleep(_replay_latency())
+        return self.cassette.get(self._key(text))
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.mode == REPLAY_MODE_RECORD:
+            return self._record(texts, await self.inner.aembed_documents(texts))
+        await asyncio.sleep(_replay_latency())
+        return [self.cassette.get(self._key(text)) for text in texts]
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.mode == REPLAY_MODE_RECORD:
+            return self._record([text], [await self.inner.aembed_query(text)])[0]
+        await asyncio.sleep(_replay_latency())
+        return self.cassette.get(self._key(text))
+
+
+def _chunks(content: str) -> List[str]:
+    return [content[i:i + REPLAY_CHUNK_SIZE] for i in range(0, len(content), REPLAY_CHUNK_SIZE)] or [""]
@@ -1,13 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.router import router as interview_router
+from core.config import get_env, warmup_llm_clients
+from core.http_clients import close_http_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时预热 LLM 连接，退出时关闭共享连接池"""
+    if get_env("LLM_WARMUP_ENABLED", "true").lower() not in ("false", "0", "no"):
+        await warmup_llm_clients()
+    yield
+    await close_http_clients()
 
 
 app = FastAPI(
     title="AI Interviewer",
     description="基于 LangChain 和 DeepSeek 的智能面试助手",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # 添加 CORS 支持（用于前端调用）
@@ -84,13 +84,66 @@ class ImportQuestionsResponse(BaseModel):
     success: bool = Field(..., description="是否成功")
     count: int = Field(..., description="导入的问题数量")
     message: str = Field(..., description="提示信息")
+    source: Optional[str] = Field(default=None, description="来源名称")
+    added: int = Field(default=0, description="新增的问题片段数")
+    skipped: int = Field(default=0, description="已存在而跳过的问题片段数")
+    removed: int = Field(default=0, description="旧版本中被移除的问题片段数")
+    questions: int = Field(default=0, description="抽取的问题记录数")
+    job_id: Optional[str] = Field(default=None, description="后台导入任务ID")
+    status: Optional[str] = Field(default=None, description="导入任务状态")
+
+
+class ImportJobInfo(BaseModel):
+    job_id: str = Field(..., description="任务ID")
+    source: str = Field(..., description="来源名称")
+    status: str = Field(..., description="任务状态：pending / running / completed / failed / cancelled")
+    pages: int = Field(..., description="已读取的页数")
+    total_pages: Optional[int] = Field(default=None, description="总页数")
+    chunks: int = Field(..., description="已拆分的问题片段数")
+    chunks_embedded: int = Field(..., description="已生成 embedding 的问题片段数")
+    chunks_written: int = Field(..., description="已写入向量库的问题片段数")
+    questions: int = Field(default=0, description="已抽取的问题记录数")
+    progress: Optional[float] = Field(default=None, description="进度（0-1）")
+    elapsed_seconds: Optional[float] = Field(default=None, description="已用时间（秒）")
+    eta_seconds: Optional[float] = Field(default=None, description="预计剩余时间（秒）")
+    result: Optional[Dict] = Field(default=None, description="导入结果（完成后）")
+    error: Optional[str] = Field(default=None, description="错误信息（失败时）")
+    created_at: str = Field(..., description="提交时间")
+
+
+class ImportJobsResponse(BaseModel):
+    count: int = Field(..., description="任务数量")
+    jobs: List[ImportJobInfo] = Field(..., description="任务列表（新的在前）")
+
+
+class QuestionSourceInfo(BaseModel):
+    name: str = Field(..., description="来源名称")
+    file_hash: str = Field(..., description="文件内容的 sha256")
+    chunk_count: int = Field(..., description="问题片段数")
+    question_count: int = Field(default=0, description="抽取的问题记录数")
+    created_at: Optional[str] = Field(default=None, description="首次导入时间")
+    updated_at: Optional[str] = Field(default=None, description="最近导入时间")
+
+
+class QuestionSourcesResponse(BaseModel):
+    count: int = Field(..., description="来源数量")
+    sources: List[QuestionSourceInfo] = Field(..., description="来源列表")
+
+
+class DeleteQuestionSourceResponse(BaseModel):
+    success: bool = Field(..., description="是否成功")
+    source: str = Field(..., description="来源名称")
+    removed: int = Field(..., description="移除的问题片段数")
 
 
 class SearchQuestionsRequest(BaseModel):
     query: str = Field(..., description="搜索查询文本")
     job_requirements: Optional[str] = Field(default=None, description="职位要求")
-    question_types: Optional[List[str]] = Field(default=None, description="问题类型列表")
+    question_types: Optional[List[str]] = Field(default=None, description="问题类型列表，按导入时标注的问题类型过滤")
     k: int = Field(default=10, description="返回的问题数量")
+    mode: Optional[Literal["vector", "lexical", "hybrid"]] = Field(
+        default=None, description="检索方式：vector 向量 / lexical BM25 关键词 / hybrid 两者融合，默认读取 QUESTION_SEARCH_MODE"
+    )
 
 
 class SearchQuestionsResponse(BaseModel):
@@ -98,3 +151,14 @@ class SearchQuestionsResponse(BaseModel):
     questions: List[Dict] = Field(..., description="问题列表")
 
 
+class SearchQuestionsBatchRequest(BaseModel):
+    queries: List[SearchQuestionsRequest] = Field(
+        ..., min_length=1, max_length=100, description="检索请求列表（最多 100 条），查询向量在一次批量请求中生成"
+    )
+
+
+class SearchQuestionsBatchResponse(BaseModel):
+    count: int = Field(..., description="检索请求数量")
+    results: List[SearchQuestionsResponse] = Field(..., description="与请求一一对应的检索结果")
+
+
@@ -1,14 +1,25 @@
 """
 数据库模型和连接管理
 """
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Set
 
 from sqlalchemy import create_engine, Column, String, Integer, Text, DateTime, Float, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 
+from core.config import get_env
+
+
+INTERVIEW_DB_PATH_ENV = "INTERVIEW_DB_PATH"
+
+# 按数据库文件缓存引擎（连接池），避免每次读写都重新创建
+_engines: Dict[str, object] = {}
+_initialized_paths: Set[str] = set()
+_engine_lock = threading.Lock()
+
 
 Base = declarative_base()
 
@@ -32,21 +43,47 @@ class InterviewRecord(Base):
     final_score = Column(Integer, nullable=True)
     final_feedback = Column(Text, nullable=True)
     current_question_followup_count = Column(Integer, default=0) # 当前问题追问次数
+    summary = Column(JSON, default=list)  # 滚动摘要
+    score_stats = Column(JSON, default=dict)  # 分数统计
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class QuestionSource(Base):
+    """问题库导入来源（文件）登记"""
+    __tablename__ = "question_sources"
+    
+    collection = Column(String, primary_key=True)  # 向量库集合名称
+    name = Column(String, primary_key=True)  # 来源名称（上传的文件名）
+    file_hash = Column(String, nullable=False)  # 文件内容的 sha256
+    chunk_ids = Column(JSON, default=list)  # 该来源的文本块ID（文本内容的 sha256）
+    chunk_count = Column(Integer, default=0)
+    question_ids = Column(JSON, nullable=True)  # 该来源抽取的问题记录ID（问题文本的 sha256），抽取功能之前导入的来源为空
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 
 def get_db_engine():
-    """获取数据库引擎"""
-    db_path = Path(__file__).parent.parent / "storage" / "database" / "interviews.db"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    engine = create_engine(f"sqlite:///{db_path}", echo=False)
+    """获取数据库引擎（可通过 INTERVIEW_DB_PATH 环境变量指定数据库文件）"""
+    default_path = Path(__file__).parent.parent / "storage" / "database" / "interviews.db"
+    db_path = Path(get_env(INTERVIEW_DB_PATH_ENV, str(default_path)))
+    db_url = f"sqlite:///{db_path}"
+    with _engine_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            engine = create_engine(db_url, echo=False)
+            _engines[db_url] = engine
     return engine
 
 
 def init_db():
-    """初始化数据库表（如果不存在则创建，如果缺少列则添加）"""
+    """初始化数据库表（如果不存在则创建，如果缺少列则添加），每个数据库文件只执行一次"""
     engine = get_db_engine()
+    db_url = str(engine.url)
+    if db_url in _initialized_paths:
+        return
+    
     Base.metadata.create_all(engine)
     
     # 检查并添加可能缺失的列（用于数据库迁移）
@@ -79,9 +116,33 @@ def init_db():
                     "ALTER TABLE interview_records ADD COLUMN technical_questions_pool TEXT DEFAULT '[]'"
                 ))
                 conn.commit()
+        
+        # 如果缺少 summary / score_stats 列，则添加
+        if 'summary' not in columns:
+            with engine.connect() as conn:
+                conn.execute(text(
+                    "ALTER TABLE interview_records ADD COLUMN summary TEXT DEFAULT '[]'"
+                ))
+                conn.commit()
+        
+        if 'score_stats' not in columns:
+            with engine.connect() as conn:
+                conn.execute(text(
+                    "ALTER TABLE interview_records ADD COLUMN score_stats TEXT DEFAULT '{}'"
+                ))
+                conn.commit()
+        
+        # 如果 question_sources 缺少 question_ids 列，则添加（为空表示需要重新导入以抽取问题）
+        source_columns = {col['name'] for col in inspector.get_columns('question_sources')}
+        if 'question_ids' not in source_columns:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE question_sources ADD COLUMN question_ids TEXT"))
+                conn.commit()
     except Exception as e:
         # 如果表不存在，create_all 会创建它，这里的错误可以忽略
         pass
+    
+    _initialized_paths.add(db_url)
 
 
 def get_db_session():
@@ -0,0 +1,201 @@
+"""
+题库后台导入任务：上传后立即返回任务ID，由工作协程池执行导入并提供进度查询和取消
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+from core.config import get_env
+from services.question_bank import QuestionBank
+
+
+QUESTION_IMPORT_WORKERS_ENV = "QUESTION_IMPORT_WORKERS"
+
+# 内存中保留的最近任务数
+MAX_JOB_HISTORY = 100
+
+
+class ImportJobStatus(Enum):
+    """导入任务状态"""
+    PENDING = "pending"  # 排队中
+    RUNNING = "running"  # 导入中
+    COMPLETED = "completed"  # 已完成
+    FAILED = "failed"  # 失败
+    CANCELLED = "cancelled"  # 已取消
+
+
+FINISHED_STATUSES = (ImportJobStatus.COMPLETED, ImportJobStatus.FAILED, ImportJobStatus.CANCELLED)
+
+
+@dataclass
+class ImportJob:
+    """导入任务"""
+    job_id: str
+    source: str
+    file_path: str
+    cleanup: bool = True  # 结束后删除文件（上传的临时文件）
+    status: ImportJobStatus = ImportJobStatus.PENDING
+    total_pages: Optional[int] = None
+    progress: Dict = field(default_factory=dict)  # QuestionBank.aimport_question_file 实时更新的进度
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[float] = None  # time.monotonic()
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    
+    def to_dict(self) -> Dict:
+        """任务状态和进度；ETA 按已处理页数占总页数的比例线性估算"""
+        pages = self.progress.get("pages", 0)
+        elapsed = None
+        fraction = None
+        eta_seconds = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        if self.status == ImportJobStatus.COMPLETED:
+            fraction = 1.0
+            eta_seconds = 0.0
+        elif self.total_pages:
+            # 读取阶段领先写入阶段至多几个批次，完成前不报告 100%
+            fraction = min(pages / self.total_pages, 0.99)
+            if self.status == ImportJobStatus.RUNNING and fraction > 0:
+                eta_seconds = elapsed * (1 - fraction) / fraction
+        
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "status": self.status.value,
+            "pages": pages,
+            "total_pages": self.total_pages,
+            "chunks": len(self.progress.get("chunk_ids", [])),
+            "chunks_embedded": self.progress.get("embedded", 0),
+            "chunks_written": self.progress.get("written", 0),
+            "questions": len(self.progress.get("question_ids", [])),
+            "progress": fraction,
+            "elapsed_seconds": elapsed,
+            "eta_seconds": eta_seconds,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class ImportJobManager:
+    """
+    导入任务管理器
+    
+    任务放入队列后由 QUESTION_IMPORT_WORKERS 个工作协程（默认 2）依次执行，工作协程在首次提交时
+    于当前事件循环中启动。任务状态只保存在进程内存中，多 worker 部署时需要把同一任务的查询路由到同一进程。
+    """
+    
+    def __init__(self, question_bank: QuestionBank, workers: Optional[int] = None):
+        """
+        Args:
+            question_bank: 问题库
+            workers: 并发执行的任务数，不提供时读取环境变量
+        """
+        self.question_bank = question_bank
+        self.workers = workers or max(1, int(get_env(QUESTION_IMPORT_WORKERS_ENV, "2")))
+        self.jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+    
+    def submit(self, file_path: str, source_name: str, cleanup: bool = True) -> ImportJob:
+        """
+        提交导入任务（需在事件循环中调用）
+        
+        Args:
+            file_path: 文件路径
+            source_name: 来源名称
+            cleanup: 任务结束后是否删除文件
+        
+        Returns:
+            排队中的任务
+        """
+        self._ensure_workers()
+        job = ImportJob(job_id=str(uuid.uuid4()), source=source_name, file_path=file_path, cleanup=cleanup)
+        self.jobs[job.job_id] = job
+        self._trim_history()
+        self._queue.put_nowait(job)
+        return job
+    
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self.jobs.get(job_id)
+    
+    def list_jobs(self, limit: int = 20) -> List[ImportJob]:
+        """最近提交的任务（新的在前）"""
+        return list(reversed(self.jobs.values()))[:limit]
+    
+    def cancel(self, job_id: str) -> Optional[ImportJob]:
+        """
+        取消任务：排队中的任务直接标记为已取消，导入中的任务中断并回滚本次写入的文本块
+        
+        Returns:
+            任务，不存在时返回 None
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            self._finish(job, ImportJobStatus.CANCELLED)
+        return job
+    
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+    
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != ImportJobStatus.PENDING:
+                continue  # 排队时已被取消
+            job.task = asyncio.create_task(self._run(job))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                if not job.task.cancelled():
+                    raise  # 工作协程本身被取消
+    
+    async def _run(self, job: ImportJob):
+        job.status = ImportJobStatus.RUNNING
+        job.started_at = time.monotonic()
+        try:
+            job.total_pages = await asyncio.to_thread(self.question_bank.count_pages, job.file_path)
+            job.result = await self.question_bank.aimport_question_file(
+                job.file_path, source_name=job.source, progress=job.progress
+            )
+            self._finish(job, ImportJobStatus.COMPLETED)
+        except asyncio.CancelledError:
+            self._finish(job, ImportJobStatus.CANCELLED)
+            raise
+        except Exception as e:
+            print(f"导入任务 {job.job_id}（{job.source}）失败: {e}")
+            job.error = str(e)
+            self._finish(job, ImportJobStatus.FAILED)
+    
+    def _finish(self, job: ImportJob, status: ImportJobStatus):
+        job.status = status
+        job.finished_at = time.monotonic() if job.started_at is not None else None
+        if job.cleanup and os.path.exists(job.file_path):
+            os.unlink(job.file_path)
+        job.done.set()
+    
+    def _trim_history(self):
+        """只保留最近的任务，仍在排队或执行的任务不清理"""
+        while len(self.jobs) > MAX_JOB_HISTORY:
+            oldest = next((job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATUSES), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest]
@@ -1,9 +1,14 @@
 """
 面试流程服务：管理完整的面试流程
 """
+import asyncio
 import uuid
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional, List, Dict, Tuple, Union
 
+from core.config import get_env
+from core.json_stream import parse_bool
 from services.interview_session import (
     InterviewSession,
     InterviewStage,
@@ -15,15 +20,52 @@ from api.interviewer import Interviewer
 from services.resume_parser import ResumeParser
 
 
+# 问题生成失败时使用的默认项目问题
+DEFAULT_PROJECT_QUESTIONS = [
+    "请介绍一下你简历中最有挑战性的项目？",
+    "在这个项目中你遇到的最大技术难点是什么？",
+    "你是如何解决这个问题的？"
+]
+
+# 项目回答的评估模式：
+#   sequential  - 先评估，需要追问时再生成追问问题（两次串行调用）
+#   speculative - 评估与追问草稿并发生成，追问规则不通过时丢弃草稿
+#   combined    - 单次调用同时返回评估结果和追问问题
+EVALUATION_MODE_ENV = "PROJECT_EVALUATION_MODE"
+EVALUATION_MODE_SEQUENTIAL = "sequential"
+EVALUATION_MODE_SPECULATIVE = "speculative"
+EVALUATION_MODE_COMBINED = "combined"
+EVALUATION_MODES = (EVALUATION_MODE_SEQUENTIAL, EVALUATION_MODE_SPECULATIVE, EVALUATION_MODE_COMBINED)
+
+# 投机生成追问草稿时尚不知道评估给出的追问原因，使用通用原因
+SPECULATIVE_FOLLOWUP_REASON = "回答中的技术细节、实现深度或取舍依据需要进一步确认"
+
+# 最多保留的预生成任务数（超出时丢弃最早的，防止未进入自我介绍的会话无限累积）
+MAX_PENDING_PROJECT_QUESTIONS = 1000
+
+
 class InterviewService:
-    """面试流程服务"""
+    """
+    面试流程服务
+    
+    每个流程提供同步（handle_*）、异步（ahandle_*）和流式（stream_*）三种入口，
+    三者共享同一套状态转换逻辑（_finish_* / _record_* 等），只在调用模型和保存会话的方式上不同。
+    """
     
     def __init__(self):
         self.interviewer = Interviewer()
         self.resume_parser = ResumeParser()
+        # 会话创建时即在后台生成项目问题池，自我介绍环节直接取用
+        self._pending_project_questions: "OrderedDict[str, Union[Future, asyncio.Future]]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="interview-service")
+        self.evaluation_mode = get_env(EVALUATION_MODE_ENV, EVALUATION_MODE_SEQUENTIAL)
+        if self.evaluation_mode not in EVALUATION_MODES:
+            raise ValueError(f"不支持的评估模式: {self.evaluation_mode}，可选值: {', '.join(EVALUATION_MODES)}")
         # 初始化数据库
         init_db()
     
+    # ============ 开场 ============
+    
     def start_interview(
         self,
         resume_content: str,
@@ -37,10 +79,78 @@ class InterviewService:
             resume_content: 简历内容（文本）
             job_requirements: 职位要求
             candidate_name: 候选人姓名
-            
+        
         Returns:
             面试会话
         """
+        session = self._create_session(resume_content, job_requirements, candidate_name)
+        
+        # 生成开场白
+        opening = self.interviewer.generate_opening(resume_content, job_requirements)
+        self._finish_opening(session, opening)
+        
+        # 保存到数据库
+        self._save_session(session)
+        
+        return session
+    
+    async def astart_interview(
+        self,
+        resume_content: str,
+        job_requirements: Optional[str] = None,
+        candidate_name: Optional[str] = None,
+    ) -> InterviewSession:
+        """异步开始新的面试"""
+        session = self._create_session(resume_content, job_requirements, candidate_name)
+        
+        opening = await self.interviewer.agenerate_opening(resume_content, job_requirements)
+        self._finish_opening(session, opening)
+        
+        await self._asave_session(session)
+        
+        return session
+    
+    def stream_start_interview(
+        self,
+        resume_content: str,
+        job_requirements: Optional[str] = None,
+        candidate_name: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        开始新的面试（流式输出开场白）
+        
+        Returns:
+            (事件名, 数据) 的异步迭代器：session → token... → done
+        """
+        session = self._create_session(resume_content, job_requirements, candidate_name)
+        return self._stream_start_interview(session)
+    
+    async def _stream_start_interview(self, session: InterviewSession) -> AsyncIterator[Tuple[str, Dict]]:
+        yield "session", {"session_id": session.session_id}
+        
+        tokens = []
+        async for token in self.interviewer.astream_opening(
+            session.resume_content,
+            session.job_requirements,
+        ):
+            tokens.append(token)
+            yield "token", {"content": token}
+        
+        self._finish_opening(session, "".join(tokens))
+        await self._asave_session(session)
+        yield "done", {
+            "session_id": session.session_id,
+            "opening": "".join(tokens),
+            "stage": session.stage.value,
+        }
+    
+    def _create_session(
+        self,
+        resume_content: str,
+        job_requirements: Optional[str],
+        candidate_name: Optional[str],
+    ) -> InterviewSession:
+        """创建面试会话"""
         session_id = str(uuid.uuid4())
         session = session_manager.create_session(
             session_id=session_id,
@@ -48,16 +158,13 @@ class InterviewService:
             job_requirements=job_requirements,
         )
         session.candidate_name = candidate_name
-        
-        # 生成开场白
-        opening = self.interviewer.generate_opening(resume_content, job_requirements)
+        self._prefetch_project_questions(session)
+        return session
+    
+    def _finish_opening(self, session: InterviewSession, opening: str):
+        """记录开场白，进入开场阶段"""
         session.add_message("system", opening)
         session.stage = InterviewStage.OPENING
-        
-        # 保存到数据库
-        self._save_session(session)
-        
-        return session
     
     def handle_opening_response(self, session_id: str) -> Dict:
         """
@@ -66,26 +173,69 @@ class InterviewService:
         Returns:
             包含问题和下一步动作的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
+        session = self._get_opening_session(session_id)
+        
+        # 生成自我介绍请求
+        question = self.interviewer.ask_self_introduction()
+        result = self._finish_opening_response(session, question)
+        
+        self._save_session(session)
+        
+        return result
+    
+    async def ahandle_opening_response(self, session_id: str) -> Dict:
+        """异步处理开场后的响应，进入自我介绍环节"""
+        session = self._get_opening_session(session_id)
+        
+        question = await self.interviewer.aask_self_introduction()
+        result = self._finish_opening_response(session, question)
+        
+        await self._asave_session(session)
+        
+        return result
+    
+    def stream_opening_response(self, session_id: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        处理开场后的响应（流式输出自我介绍请求）
+        
+        Returns:
+            (事件名, 数据) 的异步迭代器：token... → done
+        """
+        session = self._get_opening_session(session_id)
+        return self._stream_opening_response(session)
+    
+    async def _stream_opening_response(self, session: InterviewSession) -> AsyncIterator[Tuple[str, Dict]]:
+        tokens = []
+        async for token in self.interviewer.astream_self_introduction():
+            tokens.append(token)
+            yield "token", {"content": token}
+        
+        result = self._finish_opening_response(session, "".join(tokens))
+        await self._asave_session(session)
+        yield "done", result
+    
+    def _get_opening_session(self, session_id: str) -> InterviewSession:
+        """获取处于开场阶段的会话"""
+        session = self._get_existing_session(session_id)
         
         if session.stage != InterviewStage.OPENING:
             raise ValueError(f"当前阶段不是开场阶段: {session.stage}")
         
-        # 生成自我介绍请求
-        question = self.interviewer.ask_self_introduction()
+        return session
+    
+    def _finish_opening_response(self, session: InterviewSession, question: str) -> Dict:
+        """记录自我介绍请求，进入自我介绍阶段"""
         session.add_message("ai", question)
         session.stage = InterviewStage.SELF_INTRO
         
-        self._save_session(session)
-        
         return {
             "question": question,
             "stage": session.stage.value,
-            "session_id": session_id,
+            "session_id": session.session_id,
         }
     
+    # ============ 自我介绍 ============
+    
     def handle_self_introduction(
         self,
         session_id: str,
@@ -97,9 +247,50 @@ class InterviewService:
         Returns:
             包含第一个项目问题和下一步动作的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
+        session = self._begin_project_stage(session_id, answer)
+        
+        # 一次性生成所有项目问题（如果问题池为空），优先使用开场时预生成的结果
+        if not session.project_questions_pool:
+            questions = self._take_prefetched_project_questions(session)
+            if questions is None:
+                questions = self.interviewer.generate_project_questions(
+                    session,
+                    question_count=session.target_project_questions
+                )
+            self._fill_project_questions_pool(session, questions)
+        
+        result = self._ask_first_project_question(session)
+        
+        self._save_session(session)
+        
+        return result
+    
+    async def ahandle_self_introduction(
+        self,
+        session_id: str,
+        answer: str,
+    ) -> Dict:
+        """异步处理自我介绍，进入项目提问环节"""
+        session = self._begin_project_stage(session_id, answer)
+        
+        if not session.project_questions_pool:
+            questions = await self._atake_prefetched_project_questions(session)
+            if questions is None:
+                questions = await self.interviewer.agenerate_project_questions(
+                    session,
+                    question_count=session.target_project_questions
+                )
+            self._fill_project_questions_pool(session, questions)
+        
+        result = self._ask_first_project_question(session)
+        
+        await self._asave_session(session)
+        
+        return result
+    
+    def _begin_project_stage(self, session_id: str, answer: str) -> InterviewSession:
+        """记录自我介绍，进入项目提问环节并确定目标问题数"""
+        session = self._get_existing_session(session_id)
         
         # 记录自我介绍
         session.add_message("human", answer)
@@ -107,48 +298,129 @@ class InterviewService:
         # 进入项目提问环节
         session.stage = InterviewStage.PROJECT_QNA
         
-        # 根据简历决定目标问题数
+        session.target_project_questions = self._target_project_questions(session)
+        
+        return session
+    
+    def _target_project_questions(self, session: InterviewSession) -> int:
+        """根据简历决定目标问题数"""
         if session.resume_content:
             if len(session.resume_content) < 500:
-                session.target_project_questions = 3
+                return 3
             elif len(session.resume_content) < 1500:
-                session.target_project_questions = 5
+                return 5
             else:
-                session.target_project_questions = 10
+                return 10
+        return session.target_project_questions
+    
+    def _prefetch_project_questions(self, session: InterviewSession):
+        """
+        在后台提前生成项目问题池
         
-        # 一次性生成所有项目问题（如果问题池为空）
-        if not session.project_questions_pool:
-            questions = self.interviewer.generate_project_questions(
-                session, 
-                question_count=session.target_project_questions
+        问题池只依赖简历和职位要求，开场时即可生成，从而把这次模型调用移出自我介绍环节的关键路径。
+        有运行中的事件循环时创建异步任务，否则提交到线程池。
+        """
+        question_count = self._target_project_questions(session)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        if loop is not None:
+            pending = loop.create_task(
+                self.interviewer.agenerate_project_questions(session, question_count=question_count)
             )
-            if questions:
-                session.project_questions_pool = questions
-            else:
-                # 如果生成失败，使用默认问题
-                session.project_questions_pool = [
-                    "请介绍一下你简历中最有挑战性的项目？",
-                    "在这个项目中你遇到的最大技术难点是什么？",
-                    "你是如何解决这个问题的？"
-                ]
+            pending.add_done_callback(self._log_prefetch_failure)
+        else:
+            pending = self._executor.submit(
+                self.interviewer.generate_project_questions,
+                session,
+                question_count,
+            )
+        
+        self._pending_project_questions[session.session_id] = pending
+        while len(self._pending_project_questions) > MAX_PENDING_PROJECT_QUESTIONS:
+            _, stale = self._pending_project_questions.popitem(last=False)
+            stale.cancel()
+    
+    @staticmethod
+    def _log_prefetch_failure(task: asyncio.Task):
+        """
+        读取预生成任务的异常
         
-        # 从问题池中取出第一个问题
+        会话没有进入自我介绍环节或任务被挤出时没有人等待结果，不读取异常会在任务回收时报
+        "Task exception was never retrieved"。
+        """
+        if not task.cancelled() and task.exception() is not None:
+            print(f"预生成项目问题失败: {task.exception()}")
+    
+    def _take_prefetched_project_questions(self, session: InterviewSession) -> Optional[List[str]]:
+        """
+        取出预生成的项目问题（同步）
+        
+        Returns:
+            问题列表；没有预生成任务或生成失败时返回 None
+        """
+        pending = self._pending_project_questions.pop(session.session_id, None)
+        if pending is None or pending.cancelled():
+            return None
+        
+        # 事件循环中的任务无法在同步代码里等待，只取已完成的结果
+        if isinstance(pending, asyncio.Future) and not pending.done():
+            pending.get_loop().call_soon_threadsafe(pending.cancel)
+            return None
+        
+        try:
+            return pending.result()
+        except Exception as e:
+            print(f"预生成项目问题失败，重新生成: {e}")
+            return None
+    
+    async def _atake_prefetched_project_questions(self, session: InterviewSession) -> Optional[List[str]]:
+        """
+        取出预生成的项目问题（异步）
+        
+        Returns:
+            问题列表；没有预生成任务或生成失败时返回 None
+        """
+        pending = self._pending_project_questions.pop(session.session_id, None)
+        if pending is None or pending.cancelled():
+            return None
+        
+        try:
+            if isinstance(pending, asyncio.Future):
+                return await pending
+            return await asyncio.wrap_future(pending)
+        except Exception as e:
+            print(f"预生成项目问题失败，重新生成: {e}")
+            return None
+    
+    def _fill_project_questions_pool(self, session: InterviewSession, questions: List[str]):
+        """填充项目问题池"""
+        if questions:
+            session.project_questions_pool = questions
+        else:
+            # 如果生成失败，使用默认问题
+            session.project_questions_pool = list(DEFAULT_PROJECT_QUESTIONS)
+    
+    def _ask_first_project_question(self, session: InterviewSession) -> Dict:
+        """从问题池中取出第一个问题"""
         if session.project_questions_pool:
             question = session.project_questions_pool.pop(0)
             session.add_message("ai", question)
         else:
             # 如果问题池为空，使用默认问题
-            question = "请介绍一下你简历中最有挑战性的项目？"
+            question = DEFAULT_PROJECT_QUESTIONS[0]
             session.add_message("ai", question)
         
-        self._save_session(session)
-        
         return {
             "question": question,
             "stage": session.stage.value,
             "target_questions": session.target_project_questions,
         }
     
+    # ============ 项目提问 ============
+    
     def handle_project_answer(
         self,
         session_id: str,
@@ -160,31 +432,354 @@ class InterviewService:
         Returns:
             包含评分、反馈、下一个问题或阶段转换的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
+        session, current_question = self._prepare_project_answer(session_id, answer)
         
-        # 获取当前问题（最后一个AI消息）
-        current_question = None
-        for msg in reversed(session.history):
-            if msg.get("role") == "ai":
-                current_question = msg.get("content")
-                break
+        # 评估回答（按评估模式决定是否同时生成追问）
+        score, feedback, followup_question = self._evaluate_project_answer(session, current_question, answer)
         
-        if not current_question:
-            current_question = "项目相关问题"
+        result = self._record_project_evaluation(session, current_question, answer, score, feedback)
         
-        # 记录回答
-        session.add_message("human", answer)
+        if followup_question:
+            result = self._apply_followup(session, result, followup_question)
+        else:
+            result = self._advance_project_question(session, result)
+        
+        self._save_session(session)
+        return result
+    
+    async def ahandle_project_answer(
+        self,
+        session_id: str,
+        answer: str,
+    ) -> Dict:
+        """异步处理项目问题回答"""
+        session, current_question = self._prepare_project_answer(session_id, answer)
+        
+        score, feedback, followup_question = await self._aevaluate_project_answer(session, current_question, answer)
+        
+        result = self._record_project_evaluation(session, current_question, answer, score, feedback)
+        
+        if followup_question:
+            result = self._apply_followup(session, result, followup_question)
+        else:
+            result = self._advance_project_question(session, result)
+        
+        await self._asave_session(session)
+        return result
+    
+    def stream_project_answer(
+        self,
+        session_id: str,
+        answer: str,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        处理项目问题回答（流式输出下一个问题或追问）
+        
+        Returns:
+            (事件名, 数据) 的异步迭代器：evaluation → token... → done
+        """
+        session, current_question = self._prepare_project_answer(session_id, answer)
+        return self._stream_project_answer(session, current_question, answer)
+    
+    async def _stream_project_answer(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        followup_task = None
+        followup_tokens: asyncio.Queue = asyncio.Queue()
+        if self.evaluation_mode == EVALUATION_MODE_SEQUENTIAL:
+            # 串行模式：评估结果中追问判断一输出就开始在后台流式生成追问，与反馈文本的生成重叠
+            def start_followup(followup_reason: str) -> asyncio.Task:
+                return asyncio.create_task(self._produce_tokens(
+                    self.interviewer.astream_followup_question(current_question, answer, followup_reason),
+                    followup_tokens,
+                ))
+            
+            score, feedback, _, followup_task = await self._astream_project_evaluation(
+                session,
+                current_question,
+                answer,
+                start_followup,
+            )
+            followup_question = None
+        else:
+            # 并发/合并模式：追问问题已随评估一起生成
+            score, feedback, followup_question = await self._aevaluate_project_answer(
+                session,
+                current_question,
+                answer,
+            )
+        
+        try:
+            result = self._record_project_evaluation(session, current_question, answer, score, feedback)
+            yield "evaluation", {
+                "score": score,
+                "feedback": feedback,
+                "qa_record": result["qa_record"],
+            }
+            
+            if followup_question:
+                yield "token", {"content": followup_question}
+                result = self._apply_followup(session, result, followup_question)
+            elif followup_task is not None:
+                tokens = []
+                while (token := await followup_tokens.get()) is not None:
+                    tokens.append(token)
+                    yield "token", {"content": token}
+                try:
+                    await followup_task
+                except Exception as e:
+                    # 评估已经成功，追问生成失败时保留已输出的内容，什么都没输出时进入下一个问题
+                    print(f"流式生成追问失败: {e}")
+                followup_question = "".join(tokens).strip()
+                if followup_question:
+                    result = self._apply_followup(session, result, followup_question)
+                else:
+                    # 模型没有输出追问内容时不追问，按没有追问处理
+                    print("流式生成的追问为空，进入下一个问题")
+            
+            if not followup_question:
+                result = self._advance_project_question(session, result)
+                if result.get("next_question"):
+                    # 问题池中的问题无需生成，整段作为一个 token 推送
+                    yield "token", {"content": result["next_question"]}
+        finally:
+            if followup_task is not None:
+                followup_task.cancel()
+        
+        await self._asave_session(session)
+        yield "done", result
+    
+    @staticmethod
+    async def _produce_tokens(tokens: AsyncIterator[str], queue: asyncio.Queue):
+        """把 token 流写入队列，结束（包括出错）时写入 None"""
+        try:
+            async for token in tokens:
+                queue.put_nowait(token)
+        finally:
+            queue.put_nowait(None)
+    
+    def _evaluate_project_answer(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+    ) -> Tuple[int, str, Optional[str]]:
+        """
+        评估项目回答，并按追问规则决定追问问题
+        
+        Returns:
+            (分数, 反馈, 追问问题)，不需要追问时追问问题为 None
+        """
+        if self.evaluation_mode == EVALUATION_MODE_COMBINED:
+            score, feedback, followup_reason, followup_question = self.interviewer.evaluate_answer_with_followup(
+                current_question,
+                answer,
+                session.resume_content,
+            )
+            if not self._should_followup(session, score, followup_reason):
+                return score, feedback, None
+            if not followup_question:
+                # 模型给出了追问原因但没有给出问题，补一次生成
+                followup_question = self.interviewer.generate_followup_question(
+                    current_question,
+                    answer,
+                    followup_reason,
+                )
+            return score, feedback, followup_question
+        
+        draft = None
+        if self.evaluation_mode == EVALUATION_MODE_SPECULATIVE and self._can_followup(session):
+            # 线程池中的草稿一旦开始执行就无法取消：判断为不追问时 cancel() 只能丢弃还在排队的草稿，
+            # 已经开始的草稿仍会完成这次模型调用（同步接口下投机模式的额外开销），异步接口中的草稿可以随时取消
+            draft = self._executor.submit(
+                self.interviewer.generate_followup_question,
+                current_question,
+                answer,
+                SPECULATIVE_FOLLOWUP_REASON,
+            )
         
-        # 评估回答
         score, feedback, followup_reason = self.interviewer.evaluate_answer(
             current_question,
             answer,
             session.resume_content,
         )
         
-        # 保存问答记录
+        if not self._should_followup(session, score, followup_reason):
+            if draft is not None:
+                draft.cancel()
+            return score, feedback, None
+        
+        if draft is not None:
+            try:
+                return score, feedback, draft.result()
+            except Exception as e:
+                # 评估已经成功，草稿失败时按评估给出的追问原因重新生成
+                print(f"追问草稿生成失败，重新生成: {e}")
+        
+        # 生成追问
+        followup_question = self.interviewer.generate_followup_question(
+            current_question,
+            answer,
+            followup_reason,
+        )
+        return score, feedback, followup_question
+    
+    async def _aevaluate_project_answer(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+    ) -> Tuple[int, str, Optional[str]]:
+        """异步评估项目回答，并按追问规则决定追问问题"""
+        if self.evaluation_mode == EVALUATION_MODE_COMBINED:
+            score, feedback, followup_reason, followup_question = await self.interviewer.aevaluate_answer_with_followup(
+                current_question,
+                answer,
+                session.resume_content,
+            )
+            if not self._should_followup(session, score, followup_reason):
+                return score, feedback, None
+            if not followup_question:
+                followup_question = await self.interviewer.agenerate_followup_question(
+                    current_question,
+                    answer,
+                    followup_reason,
+                )
+            return score, feedback, followup_question
+        
+        draft = None
+        if self.evaluation_mode == EVALUATION_MODE_SPECULATIVE and self._can_followup(session):
+            draft = asyncio.create_task(self.interviewer.agenerate_followup_question(
+                current_question,
+                answer,
+                SPECULATIVE_FOLLOWUP_REASON,
+            ))
+        
+        def start_followup(followup_reason: str) -> asyncio.Task:
+            return asyncio.create_task(self.interviewer.agenerate_followup_question(
+                current_question,
+                answer,
+                followup_reason,
+            ))
+        
+        try:
+            score, feedback, followup_reason, followup_task = await self._astream_project_evaluation(
+                session,
+                current_question,
+                answer,
+                start_followup,
+                draft,
+            )
+        except BaseException:
+            if draft is not None:
+                draft.cancel()
+            raise
+        
+        if followup_task is None:
+            return score, feedback, None
+        
+        try:
+            return score, feedback, await followup_task
+        except Exception as e:
+            # 评估已经成功，提前启动的追问（或草稿）失败时按评估给出的追问原因串行重新生成
+            print(f"生成追问失败，重新生成: {e}")
+        followup_question = await self.interviewer.agenerate_followup_question(
+            current_question,
+            answer,
+            followup_reason,
+        )
+        return score, feedback, followup_question
+    
+    async def _astream_project_evaluation(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+        start_followup: Callable[[str], asyncio.Task],
+        draft: Optional[asyncio.Task] = None,
+    ) -> Tuple[int, str, Optional[str], Optional[asyncio.Task]]:
+        """
+        流式评估项目回答，提前决定是否追问
+        
+        score、need_followup、followup_reason 一输出就按追问规则判断，需要追问时立即调用
+        start_followup(追问原因) 启动追问生成，不必等待反馈文本生成完毕。
+        传入 draft（并发模式下预先生成的追问草稿）时直接复用草稿，判断为不追问时立即取消草稿。
+        
+        Returns:
+            (分数, 反馈, 追问原因, 追问任务)，不需要追问时追问任务为 None
+        """
+        fields: Dict = {}
+        followup_task = None
+        decided = False
+        try:
+            async for key, value in self.interviewer.astream_evaluation(
+                current_question,
+                answer,
+                session.resume_content,
+            ):
+                if key == "result":
+                    fields = value
+                    break
+                
+                fields[key] = value
+                if decided or "score" not in fields or "need_followup" not in fields:
+                    continue
+                need_followup = parse_bool(fields["need_followup"])
+                if need_followup and "followup_reason" not in fields:
+                    continue
+                
+                decided = True
+                followup_reason = fields.get("followup_reason") if need_followup else None
+                try:
+                    score = int(fields["score"])
+                except (TypeError, ValueError):
+                    continue
+                if self._should_followup(session, score, followup_reason):
+                    followup_task = draft or start_followup(followup_reason)
+                elif draft is not None:
+                    draft.cancel()
+                    draft = None
+        except BaseException:
+            for task in (followup_task, draft):
+                if task is not None:
+                    task.cancel()
+            raise
+        
+        score, feedback, followup_reason = fields["score"], fields["feedback"], fields["followup_reason"]
+        should_followup = self._should_followup(session, score, followup_reason)
+        if followup_task is not None and not should_followup:
+            # 完整结果与流式判断不一致（如分数字段无法解析），以完整结果为准
+            followup_task.cancel()
+            followup_task = None
+        elif followup_task is None and should_followup:
+            followup_task = draft or start_followup(followup_reason)
+        if followup_task is None and draft is not None:
+            draft.cancel()
+        
+        return score, feedback, followup_reason, followup_task
+    
+    def _prepare_project_answer(self, session_id: str, answer: str) -> Tuple[InterviewSession, str]:
+        """获取会话和当前项目问题，并记录回答"""
+        session = self._get_existing_session(session_id)
+        current_question = self._current_question(session) or "项目相关问题"
+        
+        # 记录回答
+        session.add_message("human", answer)
+        
+        return session, current_question
+    
+    def _record_project_evaluation(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+        score: int,
+        feedback: str,
+    ) -> Dict:
+        """保存项目问答记录，返回基础结果字典"""
         qa = QuestionAnswer(
             question=current_question,
             answer=answer,
@@ -193,38 +788,37 @@ class InterviewService:
         )
         session.add_project_qa(qa)
         
-        result = {
-            "score": score,
-            "feedback": feedback,
-            "qa_record": {
-                "question": current_question,
-                "answer": answer,
-                "score": score,
-                "feedback": feedback,
-            },
-            "stage": session.stage.value,  # 确保始终包含 stage 字段
-        }
-        
-        # 判断是否需要追问（如果回答有漏洞、逻辑不清，或需要深入时追问）
-        # 只有高分（>=70）且有追问理由时才追问，低分不给追问机会
-        need_followup = followup_reason is not None and score >= 70 and session.current_question_followup_count < 3
-        
-        if need_followup:
-            # 生成追问
-            followup_question = self.interviewer.generate_followup_question(
-                current_question,
-                answer,
-                followup_reason,
-            )
-            session.current_question_followup_count += 1
-            session.add_message("ai", followup_question)
-            result["next_question"] = followup_question
-            result["is_followup"] = True
-            result["current_question_followup_count"] = session.current_question_followup_count
-            result["stage"] = session.stage.value  # 确保包含 stage
-            self._save_session(session)
-            return result
+        return self._qa_result(session, qa)
+    
+    def _should_followup(
+        self,
+        session: InterviewSession,
+        score: int,
+        followup_reason: Optional[str],
+    ) -> bool:
+        """
+        判断是否需要追问（如果回答有漏洞、逻辑不清，或需要深入时追问）
         
+        只有高分（>=70）且有追问理由时才追问，低分不给追问机会
+        """
+        return followup_reason is not None and score >= 70 and self._can_followup(session)
+    
+    def _can_followup(self, session: InterviewSession) -> bool:
+        """当前问题的追问次数是否还未达到上限（与评分无关，可在评估前判断）"""
+        return session.current_question_followup_count < 3
+    
+    def _apply_followup(self, session: InterviewSession, result: Dict, followup_question: str) -> Dict:
+        """记录追问问题"""
+        session.current_question_followup_count += 1
+        session.add_message("ai", followup_question)
+        result["next_question"] = followup_question
+        result["is_followup"] = True
+        result["current_question_followup_count"] = session.current_question_followup_count
+        result["stage"] = session.stage.value  # 确保包含 stage
+        return result
+    
+    def _advance_project_question(self, session: InterviewSession, result: Dict) -> Dict:
+        """进入下一个项目问题，或在问题问完后进入技术面试环节"""
         # 判断是否完成了项目提问
         if session.project_questions_count >= session.target_project_questions:
             # 进入技术面试环节
@@ -232,7 +826,6 @@ class InterviewService:
             session.current_question_followup_count = 0
             result["stage"] = session.stage.value
             result["message"] = "项目提问环节结束，进入技术面试环节"
-            self._save_session(session)
             return result
         
         # 从问题池中取出下一个问题（不再重新生成）
@@ -248,9 +841,10 @@ class InterviewService:
             result["message"] = "项目提问环节结束，进入技术面试环节"
         
         session.current_question_followup_count = 0
-        self._save_session(session)
         return result
     
+    # ============ 技术面试 ============
+    
     def start_technical_interview(
         self,
         session_id: str,
@@ -264,16 +858,11 @@ class InterviewService:
             session_id: 会话ID
             question_types: 问题类型列表
             counts: 各类型题目数量
-            
+        
         Returns:
             包含第一个技术问题和阶段信息的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
-        
-        if session.stage != InterviewStage.TECHNICAL_QNA:
-            raise ValueError(f"当前阶段不是技术面试阶段: {session.stage}")
+        session = self._get_technical_session(session_id)
         
         # 选择技术问题
         questions = self.interviewer.select_technical_questions(
@@ -281,7 +870,43 @@ class InterviewService:
             question_types,
             counts,
         )
+        result = self._ask_first_technical_question(session, questions)
         
+        self._save_session(session)
+        
+        return result
+    
+    async def astart_technical_interview(
+        self,
+        session_id: str,
+        question_types: List[str],
+        counts: Dict[str, int],
+    ) -> Dict:
+        """异步开始技术面试环节"""
+        session = self._get_technical_session(session_id)
+        
+        questions = await self.interviewer.aselect_technical_questions(
+            session,
+            question_types,
+            counts,
+        )
+        result = self._ask_first_technical_question(session, questions)
+        
+        await self._asave_session(session)
+        
+        return result
+    
+    def _get_technical_session(self, session_id: str) -> InterviewSession:
+        """获取处于技术面试阶段的会话"""
+        session = self._get_existing_session(session_id)
+        
+        if session.stage != InterviewStage.TECHNICAL_QNA:
+            raise ValueError(f"当前阶段不是技术面试阶段: {session.stage}")
+        
+        return session
+    
+    def _ask_first_technical_question(self, session: InterviewSession, questions: List[str]) -> Dict:
+        """提出第一个技术问题，保存剩余问题"""
         if not questions:
             # 如果没有问题，使用默认提示
             question = "请介绍一下Java中HashMap的实现原理？"
@@ -291,8 +916,6 @@ class InterviewService:
         session.add_message("ai", question)
         session.technical_questions_pool = questions[1:]  # 保存剩余问题
         
-        self._save_session(session)
-        
         return {
             "question": question,
             "remaining_questions": len(questions) - 1,
@@ -310,22 +933,7 @@ class InterviewService:
         Returns:
             包含评分、反馈、下一个问题的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
-        
-        # 获取当前问题
-        current_question = None
-        for msg in reversed(session.history):
-            if msg.get("role") == "ai":
-                current_question = msg.get("content")
-                break
-        
-        if not current_question:
-            current_question = "技术问题"
-        
-        # 记录回答
-        session.add_message("human", answer)
+        session, current_question = self._prepare_technical_answer(session_id, answer)
         
         # 评估回答
         score, feedback, _ = self.interviewer.evaluate_answer(
@@ -333,8 +941,48 @@ class InterviewService:
             answer,
             session.resume_content,
         )
+        result = self._record_technical_evaluation(session, current_question, answer, score, feedback)
         
-        # 保存问答记录
+        self._save_session(session)
+        return result
+    
+    async def ahandle_technical_answer(
+        self,
+        session_id: str,
+        answer: str,
+    ) -> Dict:
+        """异步处理技术问题回答"""
+        session, current_question = self._prepare_technical_answer(session_id, answer)
+        
+        score, feedback, _ = await self.interviewer.aevaluate_answer(
+            current_question,
+            answer,
+            session.resume_content,
+        )
+        result = self._record_technical_evaluation(session, current_question, answer, score, feedback)
+        
+        await self._asave_session(session)
+        return result
+    
+    def _prepare_technical_answer(self, session_id: str, answer: str) -> Tuple[InterviewSession, str]:
+        """获取会话和当前技术问题，并记录回答"""
+        session = self._get_existing_session(session_id)
+        current_question = self._current_question(session) or "技术问题"
+        
+        # 记录回答
+        session.add_message("human", answer)
+        
+        return session, current_question
+    
+    def _record_technical_evaluation(
+        self,
+        session: InterviewSession,
+        current_question: str,
+        answer: str,
+        score: int,
+        feedback: str,
+    ) -> Dict:
+        """保存技术问答记录，并取出下一个问题"""
         qa = QuestionAnswer(
             question=current_question,
             answer=answer,
@@ -343,17 +991,7 @@ class InterviewService:
         )
         session.add_technical_qa(qa)
         
-        result = {
-            "score": score,
-            "feedback": feedback,
-            "qa_record": {
-                "question": current_question,
-                "answer": answer,
-                "score": score,
-                "feedback": feedback,
-            },
-            "stage": session.stage.value,  # 确保始终包含 stage 字段
-        }
+        result = self._qa_result(session, qa)
         
         # 获取下一个问题
         questions_pool = session.technical_questions_pool
@@ -371,9 +1009,10 @@ class InterviewService:
             result["stage"] = session.stage.value
             result["message"] = "所有技术问题已回答，面试结束"
         
-        self._save_session(session)
         return result
     
+    # ============ 总结 ============
+    
     def conclude_interview(self, session_id: str) -> Dict:
         """
         总结面试
@@ -381,19 +1020,54 @@ class InterviewService:
         Returns:
             包含最终评分和反馈的字典
         """
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise ValueError(f"会话不存在: {session_id}")
+        session = self._get_existing_session(session_id)
         
         # 生成总结
         final_score, feedback = self.interviewer.conclude_interview(session)
+        result = self._finish_conclusion(session, final_score, feedback)
+        
+        self._save_session(session)
+        
+        return result
+    
+    async def aconclude_interview(self, session_id: str) -> Dict:
+        """异步总结面试"""
+        session = self._get_existing_session(session_id)
+        
+        final_score, feedback = await self.interviewer.aconclude_interview(session)
+        result = self._finish_conclusion(session, final_score, feedback)
+        
+        await self._asave_session(session)
+        
+        return result
+    
+    def stream_conclude_interview(self, session_id: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        总结面试（流式输出模型生成的总结）
         
+        Returns:
+            (事件名, 数据) 的异步迭代器：token... → done
+        """
+        session = self._get_existing_session(session_id)
+        return self._stream_conclude_interview(session)
+    
+    async def _stream_conclude_interview(self, session: InterviewSession) -> AsyncIterator[Tuple[str, Dict]]:
+        tokens = []
+        async for token in self.interviewer.astream_conclusion(session):
+            tokens.append(token)
+            yield "token", {"content": token}
+        
+        final_score, feedback = self.interviewer.parse_conclusion("".join(tokens), session)
+        result = self._finish_conclusion(session, final_score, feedback)
+        await self._asave_session(session)
+        yield "done", result
+    
+    def _finish_conclusion(self, session: InterviewSession, final_score: int, feedback: str) -> Dict:
+        """记录最终评分并结束面试"""
         session.final_score = final_score
         session.final_feedback = feedback
         session.stage = InterviewStage.CONCLUDED
         
-        self._save_session(session)
-        
         return {
             "final_score": final_score,
             "final_feedback": feedback,
@@ -401,6 +1075,40 @@ class InterviewService:
             "stage": session.stage.value,
         }
     
+    # ============ 通用 ============
+    
+    def _get_existing_session(self, session_id: str) -> InterviewSession:
+        """获取会话，不存在时抛出 ValueError"""
+        session = session_manager.get_session(session_id)
+        if not session:
+            raise ValueError(f"会话不存在: {session_id}")
+        return session
+    
+    def _current_question(self, session: InterviewSession) -> Optional[str]:
+        """获取当前问题（最后一个AI消息）"""
+        for msg in reversed(session.history):
+            if msg.get("role") == "ai":
+                return msg.get("content")
+        return None
+    
+    def _qa_result(self, session: InterviewSession, qa: QuestionAnswer) -> Dict:
+        """构建问答评估的基础结果字典"""
+        return {
+            "score": qa.score,
+            "feedback": qa.feedback,
+            "qa_record": {
+                "question": qa.question,
+                "answer": qa.answer,
+                "score": qa.score,
+                "feedback": qa.feedback,
+            },
+            "stage": session.stage.value,  # 确保始终包含 stage 字段
+        }
+    
+    async def _asave_session(self, session: InterviewSession):
+        """在线程中保存会话，避免 SQLite 写入阻塞事件循环"""
+        await asyncio.to_thread(self._save_session, session)
+    
     def get_session(self, session_id: str) -> Optional[InterviewSession]:
         """获取会话"""
         return session_manager.get_session(session_id)
@@ -448,6 +1156,8 @@ class InterviewService:
                 record.final_score = session.final_score
                 record.final_feedback = session.final_feedback
                 record.current_question_followup_count = session.current_question_followup_count
+                record.summary = list(session.summary)
+                record.score_stats = dict(session.score_stats)
                 record.updated_at = session.updated_at
             else:
                 # 创建
@@ -485,6 +1195,8 @@ class InterviewService:
                     final_score=session.final_score,
                     final_feedback=session.final_feedback,
                     current_question_followup_count=session.current_question_followup_count,
+                    summary=list(session.summary),
+                    score_stats=dict(session.score_stats),
                     created_at=session.created_at,
                     updated_at=session.updated_at,
                 )
@@ -10,6 +10,12 @@ if TYPE_CHECKING:
     from services.database import InterviewRecord
 
 
+# 滚动摘要的总长度上限（字符），保证面试总结的提示词大小与面试长度无关
+SUMMARY_MAX_CHARS = 2000
+SUMMARY_QUESTION_CHARS = 80
+SUMMARY_FEEDBACK_CHARS = 100
+
+
 class InterviewStage(Enum):
     """面试阶段枚举"""
     RESUM_SUBMITTED = "resume_submitted"  # 简历已提交
@@ -48,6 +54,8 @@ class InterviewSession:
     final_score: Optional[int] = None
     final_feedback: Optional[str] = None
     current_question_followup_count: int = 0 # 当前问题追问次数
+    summary: List[Dict] = field(default_factory=list)  # 滚动摘要（每条对应一个已评分问答的压缩记录）
+    score_stats: Dict[str, Dict] = field(default_factory=dict)  # 各环节分数统计（数量、总分、最高、最低）
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
@@ -60,13 +68,69 @@ class InterviewSession:
         """添加项目问答"""
         self.project_qa_list.append(qa)
         self.project_questions_count += 1
+        self.update_summary("project", qa)
         self.updated_at = datetime.now()
     
     def add_technical_qa(self, qa: QuestionAnswer):
         """添加技术问答"""
         self.technical_qa_list.append(qa)
+        self.update_summary("technical", qa)
         self.updated_at = datetime.now()
     
+    def update_summary(self, category: str, qa: QuestionAnswer):
+        """
+        用一条已评分的问答增量更新滚动摘要和分数统计
+        
+        摘要超出 SUMMARY_MAX_CHARS 时，优先淘汰分数最接近当前平均分的条目（最早的优先），
+        保留表现突出和明显薄弱的回答；被淘汰条目的分数仍计入 score_stats。
+        
+        Args:
+            category: 环节（"project" 或 "technical"）
+            qa: 问答记录
+        """
+        if qa.score is not None:
+            stats = self.score_stats.setdefault(category, {"count": 0, "total": 0, "min": None, "max": None})
+            stats["count"] += 1
+            stats["total"] += qa.score
+            stats["min"] = qa.score if stats["min"] is None else min(stats["min"], qa.score)
+            stats["max"] = qa.score if stats["max"] is None else max(stats["max"], qa.score)
+        
+        self.summary.append({
+            "category": category,
+            "question": qa.question[:SUMMARY_QUESTION_CHARS],
+            "score": qa.score,
+            "feedback": (qa.feedback or "")[:SUMMARY_FEEDBACK_CHARS],
+        })
+        
+        scored = [stats for key, stats in self.score_stats.items() if key != "omitted"]
+        total_count = sum(stats["count"] for stats in scored)
+        average = sum(stats["total"] for stats in scored) / total_count if total_count else None
+        while len(self.summary) > 1 and len(self.render_summary()) > SUMMARY_MAX_CHARS:
+            evict_index = min(
+                range(len(self.summary) - 1),  # 最新一条始终保留
+                key=lambda i: abs((self.summary[i]["score"] or 0) - (average or 0)),
+            )
+            self.summary.pop(evict_index)
+            self.score_stats.setdefault("omitted", {"count": 0})["count"] += 1
+    
+    def rebuild_summary(self):
+        """根据完整问答记录重建摘要和分数统计（用于旧数据或分数被重新评定后）"""
+        self.summary = []
+        self.score_stats = {}
+        for qa in self.project_qa_list:
+            self.update_summary("project", qa)
+        for qa in self.technical_qa_list:
+            self.update_summary("technical", qa)
+    
+    def render_summary(self) -> str:
+        """将滚动摘要渲染为提示词文本"""
+        category_names = {"project": "项目", "technical": "技术"}
+        return "\n".join(
+            f"[{category_names.get(entry['category'], entry['category'])}] "
+            f"问：{entry['question']} | 得分：{entry['score']} | 评价：{entry['feedback']}"
+            for entry in self.summary
+        )
+    
     def get_average_score(self) -> Optional[float]:
         """计算平均分"""
         all_scores = [
@@ -209,6 +273,8 @@ class SessionManager:
             final_score=record.final_score,
             final_feedback=record.final_feedback,
             current_question_followup_count=getattr(record, 'current_question_followup_count', 0),
+            summary=getattr(record, 'summary', None) or [],
+            score_stats=getattr(record, 'score_stats', None) or {},
             created_at=record.created_at or datetime.now(),
             updated_at=record.updated_at or datetime.now(),
         )
@@ -225,6 +291,10 @@ class SessionManager:
         else:
             session.technical_questions_pool = []
         
+        # 旧记录没有滚动摘要，根据问答记录重建
+        if not session.summary and (project_qa_list or technical_qa_list):
+            session.rebuild_summary()
+        
         return session
     
     def update_session(self, session: InterviewSession):
@@ -0,0 +1,186 @@
+"""
+题库关键词索引：中文按字二元组、英文按整词切分，基于 SQLite FTS5 倒排索引的 BM25 检索
+"""
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 英文 / 数字词（保留 c++、java.util、c# 等技术名词中的符号）或连续的汉字
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9_.+#-]*|[\u4e00-\u9fff]+")
+# FTS5 分词时视为词内字符的符号，保证上面切出的词原样入索引
+_FTS_TOKENIZER = "unicode61 tokenchars '.+#-_'"
+# 单次查询最多使用的不同词数，限制长查询的检索开销
+MAX_QUERY_TERMS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分文本：汉字取相邻二元组（单个汉字保留为一元），英文、数字按整词小写
+    
+    例如 "ConcurrentHashMap的扩容" → ["concurrenthashmap", "的扩", "扩容"]
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        word = match.group()
+        if "\u4e00" <= word[0] <= "\u9fff":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.rstrip(".-"))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[str]:
+    """
+    倒数排名融合（RRF）：每个结果的得分为其在各排名列表中 1 / (k + 名次) 之和
+    
+    Args:
+        rankings: 多个按相关度排序的ID列表
+        k: 平滑常数，越大排名靠后的结果权重越接近靠前的结果
+    
+    Returns:
+        融合后按得分降序排列的ID列表
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])
+
+
+class LexicalIndex:
+    """
+    BM25 关键词索引
+    
+    文本切分后以空格连接写入 FTS5 虚拟表，由 SQLite 维护倒排表并计算 BM25（k1=1.2, b=0.75）；
+    文本块ID、问题类型与 FTS5 rowid 的对应关系保存在普通表中，用于按ID删除和按类型过滤。
+    """
+    
+    def __init__(self, database_path: str):
+        """
+        Args:
+            database_path: SQLite 文件路径
+        """
+        self.database_path = database_path
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_map "
+            "(row INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, question_type TEXT)"
+        )
+        # 旧版本的索引没有问题类型列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunk_map)")}
+        if "question_type" not in columns:
+            self._conn.execute("ALTER TABLE chunk_map ADD COLUMN question_type TEXT")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(tokens, tokenize=\"{_FTS_TOKENIZER}\")"
+        )
+        # 词表视图：每个词出现在多少个文本块中
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunk_vocab USING fts5vocab(chunk_fts, 'row')")
+        self._conn.commit()
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_map").fetchone()[0]
+    
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str], question_types: Optional[Sequence[str]] = None):
+        """写入文本块（已存在的ID跳过，内容哈希ID相同即内容相同）"""
+        question_types = question_types or [None] * len(chunk_ids)
+        rows = [
+            (chunk_id, " ".join(tokenize(text)), question_type)
+            for chunk_id, text, question_type in zip(chunk_ids, texts, question_types)
+        ]
+        with self._lock:
+            for chunk_id, tokens, question_type in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO chunk_map (chunk_id, question_type) VALUES (?, ?)", (chunk_id, question_type)
+                )
+                if cursor.rowcount:
+                    self._conn.execute("INSERT INTO chunk_fts (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, tokens))
+            self._conn.commit()
+    
+    def delete(self, chunk_ids: Sequence[str]):
+        """删除文本块"""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._conn.execute("SELECT row FROM chunk_map WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM chunk_fts WHERE rowid = ?", row)
+                    self._conn.execute("DELETE FROM chunk_map WHERE row = ?", row)
+            self._conn.commit()
+    
+    def set_question_types(self, chunk_ids: Sequence[str], question_types: Sequence[str]):
+        """更新文本块的问题类型"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunk_map SET question_type = ? WHERE chunk_id = ?", list(zip(question_types, chunk_ids))
+            )
+            self._conn.commit()
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+    
+    def search(self, query: str, k: int = 10, question_types: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """
+        BM25 检索：查询中任一词命中即为候选
+        
+        Args:
+            query: 查询文本
+            k: 返回数量
+            question_types: 只返回这些问题类型的文本块，不提供时不限类型
+        
+        Returns:
+            (文本块ID, BM25 得分) 列表，得分越高越相关
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        with self._lock:
+            # 出现在一半以上文本块中的词 IDF 为 0（FTS5 的 BM25 实现），对排序没有贡献却要扫描很长的倒排表，直接去掉
+            total = self._conn.execute("SELECT COUNT(*) FROM chunk_map").fetchone()[0]
+            placeholders = ",".join("?" * len(terms))
+            frequent = {
+                term for term, in self._conn.execute(
+                    f"SELECT term FROM chunk_vocab WHERE term IN ({placeholders}) AND doc > ?", (*terms, total / 2)
+                )
+            }
+            terms = [term for term in terms if term not in frequent]
+            if not terms:
+                return []
+            match = " OR ".join(f'"{term}"' for term in terms)
+            type_filter = ""
+            params: List = [match]
+            if question_types:
+                type_filter = f" AND m.question_type IN ({','.join('?' * len(question_types))})"
+                params.extend(question_types)
+            rows = self._conn.execute(
+                "SELECT m.chunk_id, bm25(chunk_fts) AS rank FROM chunk_fts"
+                " JOIN chunk_map m ON m.row = chunk_fts.rowid"
+                f" WHERE chunk_fts MATCH ?{type_filter} ORDER BY rank LIMIT ?",
+                (*params, k),
+            ).fetchall()
+        # FTS5 的 bm25() 返回负值，越小越相关
+        return [(chunk_id, -rank) for chunk_id, rank in rows]
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_fts")
+            self._conn.execute("DELETE FROM chunk_map")
+            self._conn.execute("DELETE FROM index_meta")
+            self._conn.commit()
@@ -0,0 +1,247 @@
+"""
+进程内向量检索：在内存映射的归一化向量矩阵上用矩阵-向量乘积求 top-k，数据量大时可选 HNSW 图索引（需安装 hnswlib）
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.vector_matrix import VectorMatrix, normalize
+
+try:
+    import hnswlib
+except ImportError:  # 可选依赖，未安装时始终精确检索
+    hnswlib = None
+
+
+# 非 float32 矩阵按块转换为 float32 后计算，限制临时内存（8192 行 × 1024 维约 32MB）
+_SCORE_BLOCK_ROWS = 8192
+# HNSW 参数：图的出度、建图和检索时的候选列表长度
+_HNSW_M = 16
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 64
+
+# 进程内共享的检索索引：同一个向量矩阵只构建一份 HNSW 图
+_shared_indexes: Dict[Tuple[int, int], "MatrixIndex"] = {}
+_shared_lock = threading.Lock()
+
+
+class MatrixIndex:
+    """
+    基于 VectorMatrix 的向量检索
+    
+    矩阵中保存归一化向量，查询向量归一化后与矩阵做一次矩阵-向量乘积即得到全部余弦相似度，
+    再用 argpartition 取 top-k。矩阵是只读内存映射，多个 worker 进程通过页缓存共享同一份数据。
+    
+    存活行数达到 hnsw_min_rows 且安装了 hnswlib 时，改用 HNSW 图索引做近似检索：图在首次检索时
+    于进程内存中构建，之后新增的行增量加入、删除的行标记删除；已有行被原地覆盖或矩阵被 compact 后
+（矩阵的 epoch 变化）整个图重新构建。按标签过滤的检索始终在过滤后的行中精确计算。
+    """
+    
+    def __init__(self, matrix: VectorMatrix, hnsw_min_rows: int = 0):
+        """
+        Args:
+            matrix: 向量矩阵（向量需已归一化）
+            hnsw_min_rows: 启用 HNSW 的最少存活行数，0 表示不启用
+        """
+        self.matrix = matrix
+        self.hnsw_min_rows = hnsw_min_rows
+        self._hnsw = None
+        self._hnsw_rows = 0  # 已加入图索引的行数
+        self._hnsw_version = -1
+        self._hnsw_epoch = -1
+        self._hnsw_deleted: set = set()
+        self._hnsw_lock = threading.Lock()
+    
+    @property
+    def uses_hnsw(self) -> bool:
+        return self._hnsw is not None
+    
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        labels: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        检索与查询向量最相似的 k 个向量
+        
+        Args:
+            query: 查询向量（维度与矩阵一致）
+            k: 返回数量
+            labels: 只在标签属于其中的行中检索，不提供时检索全部
+        
+        Returns:
+            (ID, 余弦相似度) 列表，按相似度降序
+        """
+        codes, scales, live, row_ids, version, epoch = self.matrix.snapshot()
+        query = normalize(np.asarray(query, dtype=np.float32))
+        if labels is not None:
+            rows = np.flatnonzero(self._label_mask(labels, live))
+            scores = self._scores(codes, scales, query, rows)
+        else:
+            if self._hnsw_enabled(live):
+                return self._search_hnsw(codes, scales, live, row_ids, version, epoch, query[None, :], k)[0]
+            rows = None
+            scores = self._scores(codes, scales, query)
+            scores[~live] = -np.inf
+        
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if rows is not None:
+            return [(row_ids[rows[i]], float(scores[i])) for i in top]
+        return [(row_ids[i], float(scores[i])) for i in top]
+    
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        labels: Optional[Sequence[Optional[Sequence[str]]]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        批量检索：矩阵按行分块与全部查询向量做矩阵-矩阵乘积，每块为每个查询保留前 k 个候选，最后合并
+        
+        矩阵只需扫描一遍，临时内存为 块行数 × 查询数。启用 HNSW 时，不带标签过滤的查询在一次调用中批量检索。
+        
+        Args:
+            queries: 查询向量矩阵 (n, 维度)
+            k: 每个查询的返回数量
+            labels: 每个查询允许的标签，None 表示检索全部
+        
+        Returns:
+            与 queries 一一对应的 (ID, 余弦相似度) 列表
+        """
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        codes, scales, live, row_ids, version, epoch = self.matrix.snapshot()
+        queries = normalize(np.asarray(queries, dtype=np.float32))
+        labels = list(labels) if labels is not None else [None] * len(queries)
+        results: List[Optional[List[Tuple[str, float]]]] = [None] * len(queries)
+        
+        if self._hnsw_enabled(live):
+            unfiltered = [i for i, query_labels in enumerate(labels) if query_labels is None]
+            if unfiltered:
+                hits = self._search_hnsw(codes, scales, live, row_ids, version, epoch, queries[unfiltered], k)
+                for i, query_hits in zip(unfiltered, hits):
+                    results[i] = query_hits
+        
+        exact = [i for i, result in enumerate(results) if result is None]
+        if exact and len(live):
+            # 带标签过滤的查询：标签不符以及已删除的行不参与排序（相同的标签组合只计算一次掩码）
+            masks: Dict[int, np.ndarray] = {}
+            label_masks: Dict[Tuple[str, ...], np.ndarray] = {}
+            for j, i in enumerate(exact):
+                if labels[i] is not None:
+                    key = tuple(sorted(labels[i]))
+                    if key not in label_masks:
+                        label_masks[key] = self._label_mask(key, live)
+                    masks[j] = label_masks[key]
+            
+            candidate_rows, candidate_scores = [], []
+            for start in range(0, len(live), _SCORE_BLOCK_ROWS):
+                end = min(start + _SCORE_BLOCK_ROWS, len(live))
+                block = (np.asarray(codes[start:end], dtype=np.float32) @ queries[exact].T) * scales[start:end, None]
+                block[~live[start:end]] = -np.inf
+                for j, mask in masks.items():
+                    block[~mask[start:end], j] = -np.inf
+                top = min(k, end - start)
+                rows = np.argpartition(-block, top - 1, axis=0)[:top]
+                candidate_rows.append(rows + start)
+                candidate_scores.append(np.take_along_axis(block, rows, axis=0))
+            candidate_rows = np.concatenate(candidate_rows)
+            candidate_scores = np.concatenate(candidate_scores)
+            
+            for j, i in enumerate(exact):
+                scores = candidate_scores[:, j]
+                order = [n for n in np.argsort(-scores, kind="stable")[:k] if np.isfinite(scores[n])]
+                results[i] = [(row_ids[candidate_rows[n, j]], float(scores[n])) for n in order]
+        return [result or [] for result in results]
+    
+    def _label_mask(self, labels: Sequence[str], live: np.ndarray) -> np.ndarray:
+        """与快照行数对齐的标签掩码（快照之后写入的行不在本次检索范围内）"""
+        mask = self.matrix.label_mask(labels)[:len(live)]
+        if len(mask) < len(live):
+            mask = np.concatenate([mask, np.zeros(len(live) - len(mask), dtype=bool)])
+        return mask & live
+    
+    def _hnsw_enabled(self, live: np.ndarray) -> bool:
+        return bool(self.hnsw_min_rows) and hnswlib is not None and int(live.sum()) >= self.hnsw_min_rows
+    
+    @staticmethod
+    def _scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """计算查询向量与指定行（默认全部行）的内积"""
+        if rows is not None:
+            return (codes[rows].astype(np.float32) @ query) * scales[rows]
+        if codes.dtype == np.float32:
+            # float32 矩阵直接在内存映射上计算，不产生副本
+            return np.asarray(codes @ query)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_BLOCK_ROWS):
+            end = start + _SCORE_BLOCK_ROWS
+            scores[start:end] = (codes[start:end].astype(np.float32) @ query) * scales[start:end]
+        return scores
+    
+    def _search_hnsw(
+        self,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        live: np.ndarray,
+        row_ids: List[Optional[str]],
+        version: int,
+        epoch: int,
+        queries: np.ndarray,
+        k: int,
+    ) -> List[List[Tuple[str, float]]]:
+        """在 HNSW 图索引中检索，queries 为 (n, 维度) 的查询向量矩阵"""
+        with self._hnsw_lock:
+            if self._hnsw_version != version:
+                self._sync_hnsw(codes, scales, live, epoch)
+                self._hnsw_version = version
+            k = min(k, len(live) - len(self._hnsw_deleted))
+            if k <= 0:
+                return [[] for _ in range(len(queries))]
+            self._hnsw.set_ef(max(_HNSW_EF_SEARCH, k))
+            labels, distances = self._hnsw.knn_query(queries, k=k)
+        # 内积空间的距离为 1 - 内积
+        return [
+            [(row_ids[label], float(1 - distance)) for label, distance in zip(query_labels, query_distances)]
+            for query_labels, query_distances in zip(labels, distances)
+        ]
+    
+    def _sync_hnsw(self, codes: np.ndarray, scales: np.ndarray, live: np.ndarray, epoch: int):
+        """把新增的行加入图索引，已删除的行标记删除（调用方需持有锁）"""
+        rows = len(live)
+        if epoch != self._hnsw_epoch:
+            # 已有行的向量被覆盖或矩阵被 compact 重写（行号已变化），图中的向量和标签不再可信
+            self._hnsw, self._hnsw_rows, self._hnsw_deleted = None, 0, set()
+            self._hnsw_epoch = epoch
+        if self._hnsw is None:
+            print(f"构建 HNSW 索引: {rows} 行")
+            self._hnsw = hnswlib.Index(space="ip", dim=codes.shape[1])
+            self._hnsw.init_index(max_elements=max(rows, 1024), ef_construction=_HNSW_EF_CONSTRUCTION, M=_HNSW_M)
+        if rows > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(rows, self._hnsw.get_max_elements() * 2))
+        for start in range(self._hnsw_rows, rows, _SCORE_BLOCK_ROWS):
+            end = min(start + _SCORE_BLOCK_ROWS, rows)
+            vectors = codes[start:end].astype(np.float32) * scales[start:end, None]
+            self._hnsw.add_items(vectors, np.arange(start, end))
+        self._hnsw_rows = rows
+        
+        for row in np.flatnonzero(~live):
+            if row not in self._hnsw_deleted:
+                self._hnsw.mark_deleted(int(row))
+                self._hnsw_deleted.add(int(row))
+
+
+def get_matrix_index(matrix: VectorMatrix, hnsw_min_rows: int = 0) -> MatrixIndex:
+    """获取向量矩阵的检索索引，同一进程内相同矩阵和参数只创建一次"""
+    key = (id(matrix), hnsw_min_rows)
+    with _shared_lock:
+        index = _shared_indexes.get(key)
+        if index is None:
+            index = MatrixIndex(matrix, hnsw_min_rows)
+            _shared_indexes[key] = index
+        return index
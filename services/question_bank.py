@@ -1,17 +1,70 @@
 """
-问题库管理服务：导入、拆分、embedding、存储到向量数据库
+问题库管理服务：导入、拆分、embedding、存储到向量数据库；导入时同时抽取独立的问题记录
 """
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
+import numpy as np
 from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from pypdf import PdfReader
 
 from core.config import get_env
-from core.embeddings import DashScopeEmbeddings
+from core.embeddings import EMBEDDING_BACKEND_DASHSCOPE, create_embeddings, get_embedding_backend
+from services.database import QuestionSource, get_db_session, init_db
+from services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from services.matrix_index import MatrixIndex, get_matrix_index
+from services.question_extractor import QuestionExtractor
+from services.question_snapshot import QuestionSnapshot, get_question_snapshot
+from services.question_types import OTHER_QUESTION_TYPE, classify_chunk, resolve_question_types
+from services.retrieval_cache import RetrievalCache, get_retrieval_cache, get_write_generation
+from services.vector_matrix import VECTOR_DTYPES, VectorMatrix, normalize, open_vector_matrix, truncate
+
+
+VECTOR_DB_DIR_ENV = "VECTOR_DB_DIR"
+VECTOR_INDEX_DIMENSION_ENV = "VECTOR_INDEX_DIMENSION"
+VECTOR_STORAGE_DTYPE_ENV = "VECTOR_STORAGE_DTYPE"
+VECTOR_RESCORE_FACTOR_ENV = "VECTOR_RESCORE_FACTOR"
+VECTOR_SEARCH_BACKEND_ENV = "VECTOR_SEARCH_BACKEND"
+VECTOR_HNSW_MIN_ROWS_ENV = "VECTOR_HNSW_MIN_ROWS"
+QUESTION_SEARCH_MODE_ENV = "QUESTION_SEARCH_MODE"
+QUESTION_IMPORT_BATCH_SIZE_ENV = "QUESTION_IMPORT_BATCH_SIZE"
+QUESTION_IMPORT_QUEUE_SIZE_ENV = "QUESTION_IMPORT_QUEUE_SIZE"
+
+# 向量检索后端：Chroma 集合 / 进程内的内存映射向量矩阵
+VECTOR_BACKEND_CHROMA = "chroma"
+VECTOR_BACKEND_MATRIX = "matrix"
+VECTOR_BACKENDS = (VECTOR_BACKEND_CHROMA, VECTOR_BACKEND_MATRIX)
+
+# 检索方式：向量相似度 / BM25 关键词 / 两者按倒数排名融合
+SEARCH_MODE_VECTOR = "vector"
+SEARCH_MODE_LEXICAL = "lexical"
+SEARCH_MODE_HYBRID = "hybrid"
+SEARCH_MODES = (SEARCH_MODE_VECTOR, SEARCH_MODE_LEXICAL, SEARCH_MODE_HYBRID)
+
+# 混合检索时每一路召回的候选数为 max(k * 该倍数, 20)
+_HYBRID_CANDIDATE_FACTOR = 4
+# 按类型配额选题时每个类型取 max(配额 × 该倍数, 10) 个候选
+_QUOTA_CANDIDATE_FACTOR = 3
+# MMR 选题时相关度的权重，其余为与已选题目差异度的权重
+_MMR_LAMBDA = 0.7
+
+# 按ID读取、删除向量库时每批的ID数
+_ID_BATCH_SIZE = 500
+# 文本文件流式读取时每段的字符数
+_TEXT_PAGE_CHARS = 20000
+# 计算文件哈希时每次读取的字节数
+_HASH_BLOCK_SIZE = 1 << 20
+# 关键词索引中记录"已有文本块均已标注问题类型"的键
+_QUESTION_TYPES_TAGGED_KEY = "question_types_tagged"
 
 
 class QuestionBank:
@@ -23,32 +76,91 @@ class QuestionBank:
         
         Args:
             collection_name: Chroma集合名称
-        """
-        # 使用阿里云 DashScope text-embedding-v4 模型
-        # 需要配置 DASHSCOPE_API_KEY 环境变量
-        embedding_api_key = get_env("DASHSCOPE_API_KEY")
-        embedding_dimension = int(get_env("DASHSCOPE_EMBEDDING_DIMENSION", "1024"))
         
-        if not embedding_api_key:
-            raise ValueError(
-                "需要配置 DASHSCOPE_API_KEY 环境变量用于embedding"
-            )
+        向量压缩（可选）：
+          - VECTOR_INDEX_DIMENSION：Chroma 索引只保存前 N 维（重新归一化），默认 0 表示不截断
+          - VECTOR_STORAGE_DTYPE：完整向量另存一份用于重排序的精度（float32 / float16 / int8），默认 float32
+          - VECTOR_RESCORE_FACTOR：索引召回 k * N 个候选，再用完整向量重排序，默认 4
+        两者都未设置时不启用压缩，行为与原来一致。
         
-        self.embeddings = DashScopeEmbeddings(
-            model="text-embedding-v4",
-            api_key=embedding_api_key,
-            dimension=embedding_dimension,
-        )
+        向量检索后端（VECTOR_SEARCH_BACKEND）：
+          - chroma（默认）：在 Chroma 集合中检索
+          - matrix：完整向量按 VECTOR_STORAGE_DTYPE 写入内存映射矩阵，在进程内用矩阵-向量乘积检索，
+            Chroma 只用于按ID读取文本和元数据；存活行数达到 VECTOR_HNSW_MIN_ROWS（默认 200000）
+            且安装了 hnswlib 时改用 HNSW 图索引
+        """
+        # 默认使用阿里云 DashScope text-embedding-v4 模型
+        # 需要配置 DASHSCOPE_API_KEY 环境变量（回放模式和 EMBEDDING_BACKEND=local 除外）
+        self.embeddings = create_embeddings(model="text-embedding-v4")
         
-        # Chroma向量数据库
-        persist_directory = str(Path(__file__).parent.parent / "storage" / "vector_db")
+        # Chroma向量数据库（可通过 VECTOR_DB_DIR 环境变量指定目录）
+        default_directory = Path(__file__).parent.parent / "storage" / "vector_db"
+        persist_directory = get_env(VECTOR_DB_DIR_ENV, str(default_directory))
         os.makedirs(persist_directory, exist_ok=True)
         
+        self.index_dimension = int(get_env(VECTOR_INDEX_DIMENSION_ENV, "0"))
+        self.storage_dtype = get_env(VECTOR_STORAGE_DTYPE_ENV, "float32").lower()
+        if self.storage_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"不支持的向量存储精度: {self.storage_dtype}，可选值: {', '.join(VECTOR_DTYPES)}")
+        self.rescore_factor = max(1, int(get_env(VECTOR_RESCORE_FACTOR_ENV, "4")))
+        self.compressed = self.index_dimension > 0 or self.storage_dtype != "float32"
+        self.vector_backend = get_env(VECTOR_SEARCH_BACKEND_ENV, VECTOR_BACKEND_CHROMA).lower()
+        if self.vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"不支持的向量检索后端: {self.vector_backend}，可选值: {', '.join(VECTOR_BACKENDS)}")
+        self.hnsw_min_rows = int(get_env(VECTOR_HNSW_MIN_ROWS_ENV, "200000"))
+        # 启用压缩（重排序）或矩阵检索后端时，完整向量另存一份到向量矩阵
+        self._uses_vector_matrix = self.compressed or self.vector_backend == VECTOR_BACKEND_MATRIX
+        
+        # 不同后端的向量空间、截断后的向量与完整向量维度都不相同，不能写入同一个集合
+        backend = get_embedding_backend()
+        if backend != EMBEDDING_BACKEND_DASHSCOPE:
+            collection_name = f"{collection_name}_{backend}"
+        if self.index_dimension > 0:
+            collection_name = f"{collection_name}_d{self.index_dimension}"
+        self.collection_name = collection_name
+        self.full_vectors_directory = Path(persist_directory) / "full_vectors" / collection_name
+        self._vector_matrix: Optional[VectorMatrix] = None
+        self._vector_matrix_lock = threading.Lock()
+        self._vector_matrix_ready = False
+        self._vector_matrix_ready_lock = threading.Lock()
+        self._import_lock = threading.Lock()
+        
+        # BM25 关键词索引，与 Chroma 集合一一对应，导入和删除时同步维护
+        self.lexical_index = LexicalIndex(str(Path(persist_directory) / "lexical" / f"{collection_name}.db"))
+        self._lexical_ready = False
+        self._question_types_ready = False
+        self._lexical_lock = threading.Lock()
+        self.search_mode = self._check_search_mode(get_env(QUESTION_SEARCH_MODE_ENV, SEARCH_MODE_VECTOR))
+        
+        # 流式导入：每批文本块数（默认 80，即 8 个并发的 DashScope 请求 × 每请求 10 条）和阶段间队列长度
+        self.import_batch_size = max(1, int(get_env(QUESTION_IMPORT_BATCH_SIZE_ENV, "80")))
+        self.import_queue_size = max(1, int(get_env(QUESTION_IMPORT_QUEUE_SIZE_ENV, "2")))
+        
         self.vectorstore = Chroma(
             collection_name=collection_name,
             embedding_function=self.embeddings,
             persist_directory=persist_directory,
         )
+        # 问题记录：导入时抽取的单个问题（文档为问题文本，答案、类型、来源在元数据中），技术题选题直接检索
+        self.question_store = Chroma(
+            collection_name=f"{collection_name}_questions",
+            embedding_function=self.embeddings,
+            persist_directory=persist_directory,
+        )
+        collection_key = f"{Path(persist_directory).resolve()}:{collection_name}"
+        # 写入代数保存在向量库目录下，任一 worker 进程的导入写入或删除都会使下面的快照和缓存失效
+        self.write_generation_path = str(Path(persist_directory) / "write_generation.db")
+        # 按类型配额选题使用的问题记录内存快照，同一进程内访问同一集合的实例共用，写入和删除时增量更新
+        self._question_snapshot: QuestionSnapshot = get_question_snapshot(
+            collection_key,
+            self.question_store._collection,
+            get_write_generation(self.write_generation_path, f"{collection_name}_questions"),
+        )
+        
+        # 查询向量、检索结果和计数缓存，同一进程内访问同一集合的实例共用
+        self.retrieval_cache: RetrievalCache = get_retrieval_cache(
+            collection_key, get_write_generation(self.write_generation_path, collection_name)
+        )
         
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -57,36 +169,638 @@ class QuestionBank:
             separators=["\n\n", "\n", "。", "，", " ", ""],
         )
     
-    def import_question_file(self, file_path: str) -> int:
+    def import_question_file(self, file_path: str, source_name: Optional[str] = None) -> Dict:
         """
         导入问题文件（PDF或文本）
         
+        按页流式处理（读取 → 拆分 → embedding → 写入），内存占用与文件大小无关。
+        文本块以内容哈希作为ID，已存在的文本块不会重复 embedding 和写入；
+        同名来源重新导入时替换为新版本，旧版本中不再出现的文本块会被移除。
+        同时抽取问题记录（问题、答案、类型）写入问题记录集合，问题文本与文本块在同一批 embedding 请求中生成向量。
+        
+        Args:
+            file_path: 文件路径
+            source_name: 来源名称（如上传的文件名），默认取文件名
+        
+        Returns:
+            导入结果，包含 source、chunks（该来源的文本块数）、added、skipped、removed、questions、
+            questions_added、unchanged、pages、seconds
+        """
+        state = self._begin_import(file_path, source_name)
+        if state["unchanged"]:
+            return self._import_result(state)
+        
+        # 添加到向量数据库（新版本的 Chroma 会自动持久化，无需手动调用 persist()）
+        for chunks, questions in self._iter_new_batches(state, file_path):
+            embeddings = self.embeddings.embed_documents([doc.page_content for doc in chunks + questions])
+            state["embedded"] += len(chunks)
+            self._upsert_documents(chunks, embeddings[:len(chunks)])
+            self._upsert_questions(questions, embeddings[len(chunks):])
+            state["written"] += len(chunks)
+        
+        return self._finish_import(state)
+    
+    async def aimport_question_file(
+        self,
+        file_path: str,
+        source_name: Optional[str] = None,
+        progress: Optional[Dict] = None,
+    ) -> Dict:
+        """
+        异步导入问题文件（PDF或文本）
+        
+        读取拆分、embedding、写入三个阶段之间用有界队列连接并行执行：embedding 当前批次时，
+        上一批次在写入向量库、下一批次在解析，队列满时上游等待，内存占用保持平稳。
+        文件解析和向量库读写在线程池中执行，不阻塞事件循环。
+        导入任务被取消时，本次新写入的文本块和问题记录会被删除。
+        
         Args:
             file_path: 文件路径
+            source_name: 来源名称，默认取文件名
+            progress: 可选，导入过程中实时更新的进度字典（pages、chunk_ids、embedded、written 等）
+        
+        Returns:
+            导入结果，同 import_question_file
+        """
+        state = await asyncio.to_thread(self._begin_import, file_path, source_name)
+        if progress is not None:
+            progress.update(state)
+            state = progress
+        if state["unchanged"]:
+            return self._import_result(state)
+        
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.import_queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.import_queue_size)
+        
+        async def read():
+            batches = self._iter_new_batches(state, file_path)
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                await embed_queue.put(batch)
+            await embed_queue.put(None)
+        
+        async def embed():
+            while (batch := await embed_queue.get()) is not None:
+                chunks, questions = batch
+                embeddings = await self.embeddings.aembed_documents([doc.page_content for doc in chunks + questions])
+                state["embedded"] += len(chunks)
+                await write_queue.put((chunks, questions, embeddings))
+            await write_queue.put(None)
+        
+        def upsert_batch(chunks: List[Document], questions: List[Document], embeddings: List[List[float]]):
+            self._upsert_documents(chunks, embeddings[:len(chunks)])
+            self._upsert_questions(questions, embeddings[len(chunks):])
+        
+        async def write():
+            while (item := await write_queue.get()) is not None:
+                chunks, questions, _ = item
+                # 先登记再写入：写入中途失败时，回滚也会删除已写入的部分
+                state["written_ids"].extend(self._chunk_id(doc.page_content) for doc in chunks)
+                state["written_question_ids"].extend(doc.id for doc in questions)
+                upsert = asyncio.ensure_future(asyncio.to_thread(upsert_batch, *item))
+                try:
+                    await asyncio.shield(upsert)
+                finally:
+                    # 被取消时等待已开始的写入完成，保证回滚能删除这一批
+                    if not upsert.done():
+                        await asyncio.wait([upsert])
+                    if not upsert.cancelled() and upsert.exception() is None:
+                        state["written"] += len(chunks)
+        
+        tasks = [asyncio.create_task(stage()) for stage in (read, embed, write)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            # 任一阶段失败时取消其余阶段，避免上游阻塞在已满的队列上
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # 失败时保留已写入的文本块（重试时会跳过），取消时回滚
+            if isinstance(e, asyncio.CancelledError):
+                await asyncio.to_thread(self._delete_chunks, set(state["written_ids"]), state["source"])
+                await asyncio.to_thread(self._delete_questions, set(state["written_question_ids"]), state["source"])
+            raise
+        
+        return await asyncio.to_thread(self._finish_import, state)
+    
+    def _begin_import(self, file_path: str, source_name: Optional[str]) -> Dict:
+        """校验文件格式、计算文件哈希；文件与已登记的版本一致且文本块都在时标记为未变化"""
+        self._check_format(file_path)
+        source_name = source_name or Path(file_path).name
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while block := f.read(_HASH_BLOCK_SIZE):
+                file_hash.update(block)
+        
+        state = {
+            "source": source_name,
+            "file_hash": file_hash.hexdigest(),
+            "chunk_ids": [],
+            "added": 0,
+            "pages": 0,
+            "embedded": 0,
+            "written": 0,
+            "written_ids": [],
+            "question_ids": [],
+            "questions_added": 0,
+            "written_question_ids": [],
+            "removed": 0,
+            "unchanged": False,
+            "started_at": time.perf_counter(),
+        }
+        # 问题抽取功能之前导入的来源（question_ids 为空）即使文件未变化也重新处理一遍，补充问题记录
+        source = self._get_source(source_name)
+        if (
+            source
+            and source.file_hash == state["file_hash"]
+            and source.question_ids is not None
+            and self._existing_ids(source.chunk_ids) == set(source.chunk_ids)
+            and self._existing_ids(source.question_ids, self.question_store) == set(source.question_ids)
+        ):
+            state.update(chunk_ids=list(source.chunk_ids), question_ids=list(source.question_ids), unchanged=True)
+        return state
+    
+    def _iter_new_batches(self, state: Dict, file_path: str) -> Iterator[Tuple[List[Document], List[Document]]]:
+        """
+        按页读取、拆分并抽取问题，每凑满一批就过滤掉向量库中已存在的部分，产出需要 embedding 的
+        (新文本块, 新问题记录)
+        
+        同一文件内重复的文本块、问题只保留第一个。文本块按文件顺序标注问题类型（metadata["question_type"]），
+        章节标题的类型延续到后续文本块。
+        """
+        seen: Set[str] = set()
+        pending: List[Document] = []
+        pending_questions: List[Document] = []
+        section_type: Optional[str] = None
+        extractor = QuestionExtractor()
+        
+        def flush() -> Tuple[List[Document], List[Document]]:
+            existing = self._existing_ids([self._chunk_id(doc.page_content) for doc in pending])
+            new_documents = [doc for doc in pending if self._chunk_id(doc.page_content) not in existing]
+            existing = self._existing_ids([doc.id for doc in pending_questions], self.question_store)
+            new_questions = [doc for doc in pending_questions if doc.id not in existing]
+            state["added"] += len(new_documents)
+            state["questions_added"] += len(new_questions)
+            pending.clear()
+            pending_questions.clear()
+            return new_documents, new_questions
+        
+        def add_questions(records: List[Dict]):
+            for record in records:
+                question_id = self._chunk_id(record["question"])
+                if question_id in seen:
+                    continue
+                seen.add(question_id)
+                state["question_ids"].append(question_id)
+                pending_questions.append(Document(
+                    id=question_id,
+                    page_content=record["question"],
+                    metadata={
+                        "source": state["source"],
+                        "question_type": record["question_type"],
+                        "answer": record["answer"],
+                    },
+                ))
+        
+        for page in self._iter_pages(file_path):
+            state["pages"] += 1
+            add_questions(extractor.feed(page.page_content))
+            for chunk in self.text_splitter.split_documents([page]):
+                question_type, section_type = classify_chunk(chunk.page_content, section_type)
+                chunk_id = self._chunk_id(chunk.page_content)
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                chunk.metadata["source"] = state["source"]
+                chunk.metadata["question_type"] = question_type
+                state["chunk_ids"].append(chunk_id)
+                pending.append(chunk)
             
+            if len(pending) + len(pending_questions) >= self.import_batch_size:
+                new_documents, new_questions = flush()
+                if new_documents or new_questions:
+                    yield new_documents, new_questions
+        
+        add_questions(extractor.flush())
+        if pending or pending_questions:
+            new_documents, new_questions = flush()
+            if new_documents or new_questions:
+                yield new_documents, new_questions
+    
+    def _finish_import(self, state: Dict) -> Dict:
+        """移除旧版本中不再出现的文本块和问题记录，更新来源登记"""
+        with self._import_lock:
+            source = self._get_source(state["source"])
+            stale = set(source.chunk_ids) - set(state["chunk_ids"]) if source else set()
+            state["removed"] = self._delete_chunks(stale, state["source"])
+            stale_questions = set(source.question_ids or []) - set(state["question_ids"]) if source else set()
+            self._delete_questions(stale_questions, state["source"])
+            self._save_source(state["source"], state["file_hash"], state["chunk_ids"], state["question_ids"])
+        
+        result = self._import_result(state)
+        print(
+            f"导入 {result['source']}: {result['pages']} 页, {result['chunks']} 个文本块"
+            f"（新增 {result['added']}）, {result['questions']} 个问题（新增 {result['questions_added']}）,"
+            f" 耗时 {result['seconds']:.1f}s,"
+            f" {result['pages'] / max(result['seconds'], 1e-6):.1f} 页/秒"
+        )
+        return result
+    
+    @staticmethod
+    def _import_result(state: Dict) -> Dict:
+        return {
+            "source": state["source"],
+            "chunks": len(state["chunk_ids"]),
+            "added": state["added"],
+            "skipped": len(state["chunk_ids"]) - state["added"],
+            "removed": state["removed"],
+            "questions": len(state["question_ids"]),
+            "questions_added": state["questions_added"],
+            "unchanged": state["unchanged"],
+            "pages": state["pages"],
+            "seconds": time.perf_counter() - state["started_at"],
+        }
+    
+    def list_sources(self) -> List[Dict]:
+        """列出已导入的来源"""
+        init_db()
+        db = get_db_session()
+        try:
+            sources = (
+                db.query(QuestionSource)
+                .filter(QuestionSource.collection == self.collection_name)
+                .order_by(QuestionSource.updated_at.desc())
+                .all()
+            )
+            return [
+                {
+                    "name": source.name,
+                    "file_hash": source.file_hash,
+                    "chunk_count": source.chunk_count,
+                    "question_count": len(source.question_ids or []),
+                    "created_at": source.created_at.isoformat() if source.created_at else None,
+                    "updated_at": source.updated_at.isoformat() if source.updated_at else None,
+                }
+                for source in sources
+            ]
+        finally:
+            db.close()
+    
+    def delete_source(self, source_name: str) -> Optional[int]:
+        """
+        删除来源及其文本块、问题记录（仍被其他来源引用的保留）
+        
         Returns:
-            导入的问题数量
+            移除的文本块数，来源不存在时返回 None
         """
-        path = Path(file_path)
-        suffix = path.suffix.lower()
+        with self._import_lock:
+            source = self._get_source(source_name)
+            if source is None:
+                return None
+            
+            removed = self._delete_chunks(set(source.chunk_ids), source_name)
+            self._delete_questions(set(source.question_ids or []), source_name)
+            db = get_db_session()
+            try:
+                db.query(QuestionSource).filter(
+                    QuestionSource.collection == self.collection_name,
+                    QuestionSource.name == source_name,
+                ).delete()
+                db.commit()
+            finally:
+                db.close()
+            return removed
+    
+    @staticmethod
+    def _chunk_id(content: str) -> str:
+        """文本块ID：内容的 sha256，相同内容无论来自哪个文件都只存一份"""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def _existing_ids(self, ids: List[str], store: Optional[Chroma] = None) -> Set[str]:
+        """返回集合（默认为文本块集合）中已存在的ID"""
+        collection = (store or self.vectorstore)._collection
+        existing: Set[str] = set()
+        for i in range(0, len(ids), _ID_BATCH_SIZE):
+            existing.update(collection.get(ids=ids[i:i + _ID_BATCH_SIZE], include=[])["ids"])
+        return existing
+    
+    def _unreferenced(self, ids: Set[str], source_name: str, column) -> List[str]:
+        """过滤掉仍被其他来源引用的ID（column 为 QuestionSource.chunk_ids 或 QuestionSource.question_ids）"""
+        db = get_db_session()
+        try:
+            others = db.query(column).filter(
+                QuestionSource.collection == self.collection_name,
+                QuestionSource.name != source_name,
+            ).all()
+        finally:
+            db.close()
+        for (other_ids,) in others:
+            ids = ids - set(other_ids or [])
+        return list(ids)
+    
+    def _delete_questions(self, question_ids: Set[str], source_name: str) -> int:
+        """删除不再被其他来源引用的问题记录，返回删除数量"""
+        if not question_ids:
+            return 0
+        ids = self._unreferenced(question_ids, source_name, QuestionSource.question_ids)
+        for i in range(0, len(ids), _ID_BATCH_SIZE):
+            self.question_store._collection.delete(ids=ids[i:i + _ID_BATCH_SIZE])
+        self._question_snapshot.delete(ids)
+        self.retrieval_cache.bump()
+        return len(ids)
+    
+    def _delete_chunks(self, chunk_ids: Set[str], source_name: str) -> int:
+        """删除不再被其他来源引用的文本块，返回删除数量"""
+        if not chunk_ids:
+            return 0
         
-        # 加载文档
-        if suffix == '.pdf':
-            loader = PyPDFLoader(file_path)
-        elif suffix in ['.txt', '.md']:
-            loader = TextLoader(file_path, encoding='utf-8')
-        else:
+        ids = self._unreferenced(chunk_ids, source_name, QuestionSource.chunk_ids)
+        for i in range(0, len(ids), _ID_BATCH_SIZE):
+            self.vectorstore._collection.delete(ids=ids[i:i + _ID_BATCH_SIZE])
+        self.lexical_index.delete(ids)
+        if self._uses_vector_matrix:
+            for directory in self.full_vectors_directory.glob(f"{self.storage_dtype}_*"):
+                dimension = int(directory.name.rsplit("_", 1)[1])
+                self._get_vector_matrix(dimension).delete(ids)
+        self.retrieval_cache.bump()
+        return len(ids)
+    
+    def _get_source(self, source_name: str) -> Optional[QuestionSource]:
+        init_db()
+        db = get_db_session()
+        try:
+            return db.query(QuestionSource).filter(
+                QuestionSource.collection == self.collection_name,
+                QuestionSource.name == source_name,
+            ).first()
+        finally:
+            db.close()
+    
+    def _save_source(self, source_name: str, file_hash: str, chunk_ids: List[str], question_ids: List[str]):
+        db = get_db_session()
+        try:
+            source = db.query(QuestionSource).filter(
+                QuestionSource.collection == self.collection_name,
+                QuestionSource.name == source_name,
+            ).first()
+            if source is None:
+                source = QuestionSource(collection=self.collection_name, name=source_name)
+                db.add(source)
+            source.file_hash = file_hash
+            source.chunk_ids = chunk_ids
+            source.chunk_count = len(chunk_ids)
+            source.question_ids = question_ids
+            db.commit()
+        finally:
+            db.close()
+    
+    def _load_and_split(self, file_path: str) -> List[Document]:
+        """加载并拆分问题文件"""
+        return [chunk for page in self._iter_pages(file_path) for chunk in self.text_splitter.split_documents([page])]
+    
+    def count_pages(self, file_path: str) -> int:
+        """统计文件的页数（文本文件为流式读取时的分段数），用于估算导入进度"""
+        self._check_format(file_path)
+        if Path(file_path).suffix.lower() == '.pdf':
+            return len(PdfReader(file_path).pages)
+        return sum(1 for _ in self._iter_pages(file_path))
+    
+    @staticmethod
+    def _check_format(file_path: str):
+        suffix = Path(file_path).suffix.lower()
+        if suffix not in ('.pdf', '.txt', '.md'):
             raise ValueError(f"不支持的文件格式: {suffix}")
+    
+    def _iter_pages(self, file_path: str) -> Iterator[Document]:
+        """逐页读取文件：PDF 按页，文本文件按段落边界切成约 _TEXT_PAGE_CHARS 字符的片段"""
+        self._check_format(file_path)
+        if Path(file_path).suffix.lower() == '.pdf':
+            yield from PyPDFLoader(file_path).lazy_load()
+            return
         
-        documents = loader.load()
+        buffer: List[str] = []
+        size = 0
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                buffer.append(line)
+                size += len(line)
+                # 优先在空行处切分，没有空行的长文本达到上限后在行尾切分
+                if (size >= _TEXT_PAGE_CHARS and not line.strip()) or size >= _TEXT_PAGE_CHARS * 4:
+                    yield Document(page_content="".join(buffer), metadata={"source": file_path})
+                    buffer = []
+                    size = 0
+        if buffer:
+            yield Document(page_content="".join(buffer), metadata={"source": file_path})
+    
+    def _upsert_documents(self, documents: List[Document], embeddings: List[List[float]]):
+        """
+        用已生成的向量写入向量库
         
-        # 拆分文档
-        texts = self.text_splitter.split_documents(documents)
+        启用压缩时，Chroma 中写入截断后的向量，完整向量按配置精度写入向量矩阵用于重排序；
+        矩阵检索后端同样把完整向量写入向量矩阵，并以问题类型作为行标签用于过滤。
+        """
+        if not documents:
+            return
+        ids = [self._chunk_id(doc.page_content) for doc in documents]
+        index_embeddings = embeddings
+        if self._uses_vector_matrix:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            self._get_vector_matrix(vectors.shape[1]).upsert(
+                ids, normalize(vectors), [doc.metadata.get("question_type") for doc in documents]
+            )
+            if self.index_dimension > 0:
+                index_embeddings = truncate(vectors, self.index_dimension).tolist()
         
-        # 添加到向量数据库（新版本的 Chroma 会自动持久化，无需手动调用 persist()）
-        self.vectorstore.add_documents(texts)
+        self.vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=index_embeddings,
+            documents=[doc.page_content for doc in documents],
+            # Chroma 不接受空字典作为元数据
+            metadatas=[doc.metadata or None for doc in documents],
+        )
+        self.lexical_index.add(
+            ids, [doc.page_content for doc in documents], [doc.metadata.get("question_type") for doc in documents]
+        )
+        self.retrieval_cache.bump()
+    
+    def _upsert_questions(self, questions: List[Document], embeddings: List[List[float]]):
+        """用已生成的向量写入问题记录"""
+        if not questions:
+            return
+        self.question_store._collection.upsert(
+            ids=[doc.id for doc in questions],
+            embeddings=embeddings,
+            documents=[doc.page_content for doc in questions],
+            metadatas=[doc.metadata for doc in questions],
+        )
+        self._question_snapshot.upsert(questions, embeddings)
+        self.retrieval_cache.bump()
+    
+    def search_question_records(
+        self,
+        query: str,
+        job_requirements: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+        k: int = 10,
+    ) -> List[Document]:
+        """
+        检索问题记录（导入时抽取的单个问题），每个结果都是一道完整的题目
         
-        return len(texts)
+        Args:
+            query: 查询文本
+            job_requirements: 职位要求
+            question_types: 问题类型列表，按问题记录的类型过滤
+            k: 返回数量
+        
+        Returns:
+            问题记录列表：page_content 为问题，metadata 包含 answer、question_type、source
+        """
+        search_query, filter_types = self._prepare_search(query, job_requirements, question_types)
+        key = ("records", self.retrieval_cache.generation, search_query, tuple(filter_types or ()), k)
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return list(cached)
+        results = self._search_question_records(self._embed_query(search_query), k, filter_types)
+        self.retrieval_cache.results.put(key, results)
+        return list(results)
+    
+    async def asearch_question_records(
+        self,
+        query: str,
+        job_requirements: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+        k: int = 10,
+    ) -> List[Document]:
+        """异步检索问题记录，参数同 search_question_records"""
+        search_query, filter_types = self._prepare_search(query, job_requirements, question_types)
+        key = ("records", self.retrieval_cache.generation, search_query, tuple(filter_types or ()), k)
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return list(cached)
+        embedding = await self._aembed_query(search_query)
+        results = await asyncio.to_thread(self._search_question_records, embedding, k, filter_types)
+        self.retrieval_cache.results.put(key, results)
+        return list(results)
+    
+    def _search_question_records(
+        self,
+        embedding: List[float],
+        k: int,
+        question_types: Optional[List[str]] = None,
+    ) -> List[Document]:
+        where = {"question_type": {"$in": question_types}} if question_types else None
+        return self.question_store.similarity_search_by_vector(embedding, k, filter=where)
+    
+    def search_question_records_by_type(
+        self,
+        query: str,
+        counts: Dict[str, int],
+        job_requirements: Optional[str] = None,
+    ) -> Dict[str, List[Document]]:
+        """
+        按类型配额检索问题记录
+        
+        每个类型一条查询（查询文本附加类型名），所有查询向量在一次批量 embedding 请求中生成，
+        再与内存中的问题向量矩阵做一次矩阵乘法得到各类型查询的相似度，按类型过滤后取候选。
+        按 MMR 轮流为各类型选题：同一道题只选一次，与已选题目相似的候选降权；
+        类型下的题目不足时从不限类型的候选中补足，题库足够时每个类型都恰好选满配额。
+        
+        Args:
+            query: 查询文本
+            counts: 各类型的题目数量（如 {"Java基础": 3, "多线程": 2}）
+            job_requirements: 职位要求
+        
+        Returns:
+            {类型: 问题记录列表}，类型顺序与 counts 一致
+        """
+        plans = self._quota_plans(query, counts, job_requirements)
+        if not plans:
+            return {}
+        key = ("quota", self.retrieval_cache.generation, query, job_requirements, tuple(counts.items()))
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return {question_type: list(docs) for question_type, docs in cached.items()}
+        selected = self._fill_quotas(plans, self._embed_queries([plan["query"] for plan in plans]))
+        self.retrieval_cache.results.put(key, selected)
+        return {question_type: list(docs) for question_type, docs in selected.items()}
+    
+    async def asearch_question_records_by_type(
+        self,
+        query: str,
+        counts: Dict[str, int],
+        job_requirements: Optional[str] = None,
+    ) -> Dict[str, List[Document]]:
+        """异步按类型配额检索问题记录，参数同 search_question_records_by_type"""
+        plans = self._quota_plans(query, counts, job_requirements)
+        if not plans:
+            return {}
+        key = ("quota", self.retrieval_cache.generation, query, job_requirements, tuple(counts.items()))
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return {question_type: list(docs) for question_type, docs in cached.items()}
+        embeddings = await self._aembed_queries([plan["query"] for plan in plans])
+        selected = await asyncio.to_thread(self._fill_quotas, plans, embeddings)
+        self.retrieval_cache.results.put(key, selected)
+        return {question_type: list(docs) for question_type, docs in selected.items()}
+    
+    def _quota_plans(self, query: str, counts: Dict[str, int], job_requirements: Optional[str]) -> List[Dict]:
+        """每个配额大于 0 的类型生成一条查询和类型过滤条件（无法映射到标准类型时不过滤）"""
+        plans = []
+        for question_type, count in counts.items():
+            if count <= 0:
+                continue
+            filter_types, _ = resolve_question_types([question_type])
+            plans.append({
+                "type": question_type,
+                "count": count,
+                "query": self._build_search_query(query, job_requirements, [question_type]),
+                "filter": filter_types or None,
+            })
+        return plans
+    
+    def _fill_quotas(self, plans: List[Dict], embeddings: List[List[float]]) -> Dict[str, List[Document]]:
+        """按 MMR 为各类型轮流选题；本类型候选不足时再从不限类型的候选中补足"""
+        documents, vectors, types = self._question_snapshot.get()
+        selected: Dict[str, List[Document]] = {plan["type"]: [] for plan in plans}
+        if not documents:
+            return selected
+        
+        scores = normalize(np.asarray(embeddings, dtype=np.float32)) @ vectors.T
+        selected_rows: List[int] = []
+        
+        def top_rows(i: int, plan: Dict, filtered: bool) -> List[int]:
+            """第 i 个类型查询的前若干个候选行号（已选中的除外）"""
+            row_scores = scores[i].copy()
+            if filtered and plan["filter"]:
+                row_scores[~np.isin(types, plan["filter"])] = -np.inf
+            row_scores[selected_rows] = -np.inf
+            n = min(max(plan["count"] * _QUOTA_CANDIDATE_FACTOR, 10), len(row_scores))
+            rows = np.argpartition(-row_scores, n - 1)[:n]
+            return [int(row) for row in rows if np.isfinite(row_scores[row])]
+        
+        def select(pools: List[List[int]]):
+            while True:
+                progressed = False
+                # 轮流选题，避免排在前面的类型占用多个类型共同的高分候选
+                for i, (plan, pool) in enumerate(zip(plans, pools)):
+                    chosen = selected[plan["type"]]
+                    pool[:] = [row for row in pool if row not in selected_rows]
+                    if len(chosen) >= plan["count"] or not pool:
+                        continue
+                    mmr = _MMR_LAMBDA * scores[i, pool]
+                    if selected_rows:
+                        mmr -= (1 - _MMR_LAMBDA) * (vectors[pool] @ vectors[selected_rows].T).max(axis=1)
+                    row = pool.pop(int(np.argmax(mmr)))
+                    chosen.append(documents[row])
+                    selected_rows.append(row)
+                    progressed = True
+                if not progressed:
+                    return
+        
+        select([top_rows(i, plan, filtered=True) for i, plan in enumerate(plans)])
+        short = [len(selected[plan["type"]]) < plan["count"] for plan in plans]
+        if any(short):
+            select([top_rows(i, plan, filtered=False) if short[i] else [] for i, plan in enumerate(plans)])
+        return selected
     
     def search_questions(
         self,
@@ -94,6 +808,7 @@ class QuestionBank:
         job_requirements: Optional[str] = None,
         question_types: Optional[List[str]] = None,
         k: int = 10,
+        mode: Optional[str] = None,
     ) -> List[Document]:
         """
         检索相关问题
@@ -101,13 +816,458 @@ class QuestionBank:
         Args:
             query: 查询文本（职位要求、候选人的强项/弱项等）
             job_requirements: 职位要求
-            question_types: 问题类型列表（如 ["Java基础", "多线程"]）
+            question_types: 问题类型列表（如 ["Java基础", "多线程"]），按文本块标注的类型过滤
             k: 返回的问题数量
-            
+            mode: 检索方式 vector / lexical / hybrid，默认读取 QUESTION_SEARCH_MODE（默认 vector）
+        
         Returns:
             相关文档列表
         """
-        # 构建检索查询
+        search_query, filter_types = self._prepare_search(query, job_requirements, question_types)
+        mode = self._check_search_mode(mode or self.search_mode)
+        key = self._search_key(search_query, filter_types, k, mode)
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        # 相似度检索（纯关键词检索不需要查询向量）
+        embedding = self._embed_query(search_query) if mode != SEARCH_MODE_LEXICAL else None
+        results = self._search(search_query, embedding, k, mode, filter_types)
+        self.retrieval_cache.results.put(key, results)
+        return list(results)
+    
+    async def asearch_questions(
+        self,
+        query: str,
+        job_requirements: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+        k: int = 10,
+        mode: Optional[str] = None,
+    ) -> List[Document]:
+        """异步检索相关问题，参数同 search_questions"""
+        search_query, filter_types = self._prepare_search(query, job_requirements, question_types)
+        mode = self._check_search_mode(mode or self.search_mode)
+        key = self._search_key(search_query, filter_types, k, mode)
+        cached = self.retrieval_cache.results.get(key)
+        if cached is not None:
+            return list(cached)
+        # 查询向量走异步 embedding 接口，只有本地检索放到线程池
+        embedding = await self._aembed_query(search_query) if mode != SEARCH_MODE_LEXICAL else None
+        results = await asyncio.to_thread(self._search, search_query, embedding, k, mode, filter_types)
+        self.retrieval_cache.results.put(key, results)
+        return list(results)
+    
+    def search_questions_batch(self, requests: List[Dict]) -> List[List[Document]]:
+        """
+        批量检索相关问题
+        
+        所有查询向量在一次批量 embedding 请求中生成，向量检索合并执行（多个查询与向量矩阵做一次
+        矩阵-矩阵乘积，或合并为一次 Chroma 多向量查询），N 条查询的开销接近一条。
+        已缓存的请求直接返回，批次内重复的请求只检索一次。
+        
+        Args:
+            requests: 检索请求列表，每项为 search_questions 的参数字典
+                     （query 必填，job_requirements、question_types、k、mode 可选）
+        
+        Returns:
+            与 requests 一一对应的相关文档列表
+        """
+        results, plans = self._plan_batch(requests)
+        texts = list(dict.fromkeys(plan["query"] for plan in plans if plan["mode"] != SEARCH_MODE_LEXICAL))
+        embeddings = dict(zip(texts, self._embed_queries(texts)))
+        return self._run_batch(results, plans, embeddings)
+    
+    async def asearch_questions_batch(self, requests: List[Dict]) -> List[List[Document]]:
+        """异步批量检索相关问题，参数同 search_questions_batch"""
+        results, plans = self._plan_batch(requests)
+        texts = list(dict.fromkeys(plan["query"] for plan in plans if plan["mode"] != SEARCH_MODE_LEXICAL))
+        embeddings = dict(zip(texts, await self._aembed_queries(texts)))
+        return await asyncio.to_thread(self._run_batch, results, plans, embeddings)
+    
+    def _plan_batch(self, requests: List[Dict]) -> Tuple[List[Optional[List[Document]]], List[Dict]]:
+        """
+        解析批量请求：缓存命中的直接填入结果，其余按缓存键去重
+        
+        Returns:
+            (结果列表（未命中处为 None）, 待检索的请求列表，indexes 为对应的结果下标)
+        """
+        results: List[Optional[List[Document]]] = [None] * len(requests)
+        plans: Dict[Tuple, Dict] = {}
+        for i, request in enumerate(requests):
+            search_query, filter_types = self._prepare_search(
+                request["query"], request.get("job_requirements"), request.get("question_types")
+            )
+            mode = self._check_search_mode(request.get("mode") or self.search_mode)
+            k = request.get("k", 10)
+            key = self._search_key(search_query, filter_types, k, mode)
+            cached = self.retrieval_cache.results.get(key)
+            if cached is not None:
+                results[i] = list(cached)
+                continue
+            if key not in plans:
+                plans[key] = {"key": key, "query": search_query, "types": filter_types, "k": k, "mode": mode, "indexes": []}
+            plans[key]["indexes"].append(i)
+        return results, list(plans.values())
+    
+    def _run_batch(
+        self,
+        results: List[Optional[List[Document]]],
+        plans: List[Dict],
+        embeddings: Dict[str, List[float]],
+    ) -> List[List[Document]]:
+        """执行未命中缓存的请求并写入缓存"""
+        searched = self._search_batch([
+            (plan["query"], embeddings.get(plan["query"]), plan["k"], plan["mode"], plan["types"]) for plan in plans
+        ])
+        for plan, documents in zip(plans, searched):
+            self.retrieval_cache.results.put(plan["key"], documents)
+            for i in plan["indexes"]:
+                results[i] = list(documents)
+        return results
+    
+    def _search_key(self, search_query: str, filter_types: Optional[List[str]], k: int, mode: str) -> Tuple:
+        """检索结果的缓存键（包含当前写入代数）"""
+        return ("chunks", self.retrieval_cache.generation, search_query, tuple(filter_types or ()), k, mode)
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """生成查询向量（先查缓存）"""
+        embedding = self.retrieval_cache.embeddings.get(text)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(text)
+            self.retrieval_cache.embeddings.put(text, embedding)
+        return embedding
+    
+    async def _aembed_query(self, text: str) -> List[float]:
+        embedding = self.retrieval_cache.embeddings.get(text)
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(text)
+            self.retrieval_cache.embeddings.put(text, embedding)
+        return embedding
+    
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """批量生成查询向量：缓存未命中的文本在一次批量请求中生成"""
+        embeddings = [self.retrieval_cache.embeddings.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            for i, embedding in zip(missing, self.embeddings.embed_documents([texts[i] for i in missing])):
+                embeddings[i] = embedding
+                self.retrieval_cache.embeddings.put(texts[i], embedding)
+        return embeddings
+    
+    async def _aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        embeddings = [self.retrieval_cache.embeddings.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            for i, embedding in zip(missing, await self.embeddings.aembed_documents([texts[i] for i in missing])):
+                embeddings[i] = embedding
+                self.retrieval_cache.embeddings.put(texts[i], embedding)
+        return embeddings
+    
+    @staticmethod
+    def _check_search_mode(mode: str) -> str:
+        mode = mode.lower()
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"不支持的检索方式: {mode}，可选值: {', '.join(SEARCH_MODES)}")
+        return mode
+    
+    def _search(
+        self,
+        search_query: str,
+        embedding: Optional[List[float]],
+        k: int,
+        mode: str,
+        question_types: Optional[List[str]] = None,
+    ) -> List[Document]:
+        """
+        按检索方式执行检索
+        
+        混合检索时向量和 BM25 各召回 max(4k, 20) 个候选，按倒数排名融合（RRF）后取前 k 个：
+        精确的技术名词（如 ConcurrentHashMap、G1）由关键词检索保证召回，语义相近的表述由向量检索补充。
+        提供 question_types 时两路检索都只在这些类型的文本块中进行。
+        """
+        return self._search_batch([(search_query, embedding, k, mode, question_types)])[0]
+    
+    def _search_batch(
+        self,
+        requests: List[Tuple[str, Optional[List[float]], int, str, Optional[List[str]]]],
+    ) -> List[List[Document]]:
+        """
+        批量执行检索，每条请求为 (检索查询, 查询向量, k, 检索方式, 问题类型)，各检索方式的处理同 _search
+        
+        所有请求的向量检索合并执行（见 _search_by_vectors），关键词检索逐条在本地索引中执行，
+        最后一次从向量库读取所有结果中向量检索未返回的文本块。
+        """
+        if any(question_types for *_, question_types in requests):
+            self._ensure_question_types()
+        candidates = [
+            max(k * _HYBRID_CANDIDATE_FACTOR, 20) if mode == SEARCH_MODE_HYBRID else k
+            for _, _, k, mode, _ in requests
+        ]
+        
+        rankings: List[List[str]] = [[] for _ in requests]
+        documents: Dict[str, Document] = {}
+        vector_requests = [i for i, (_, _, _, mode, _) in enumerate(requests) if mode != SEARCH_MODE_LEXICAL]
+        vector_results = self._search_by_vectors(
+            [requests[i][1] for i in vector_requests],
+            [candidates[i] for i in vector_requests],
+            [requests[i][4] for i in vector_requests],
+        )
+        for i, results in zip(vector_requests, vector_results):
+            documents.update((doc.id, doc) for doc in results)
+            rankings[i] = [doc.id for doc in results]
+        
+        for i, (search_query, _, k, mode, question_types) in enumerate(requests):
+            if mode == SEARCH_MODE_VECTOR:
+                continue
+            self._ensure_lexical_index()
+            lexical_ids = [
+                chunk_id for chunk_id, _ in self.lexical_index.search(search_query, candidates[i], question_types)
+            ]
+            rankings[i] = lexical_ids if mode == SEARCH_MODE_LEXICAL else reciprocal_rank_fusion([rankings[i], lexical_ids])[:k]
+        
+        missing = [chunk_id for ranking in rankings for chunk_id in ranking if chunk_id not in documents]
+        documents.update(self._get_documents(list(dict.fromkeys(missing))))
+        return [[documents[chunk_id] for chunk_id in ranking if chunk_id in documents] for ranking in rankings]
+    
+    def _get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        """按ID从向量库读取文本块"""
+        if not ids:
+            return {}
+        result = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            doc_id: Document(id=doc_id, page_content=content, metadata=metadata or {})
+            for doc_id, content, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+    
+    def _ensure_lexical_index(self):
+        """关键词索引为空而向量库中已有数据时（引入关键词索引前导入的题库），从向量库重建一次"""
+        if self._lexical_ready:
+            return
+        with self._lexical_lock:
+            if self._lexical_ready:
+                return
+            total = self.vectorstore._collection.count()
+            if self.lexical_index.count() == 0 and total > 0:
+                print(f"从向量库重建关键词索引: {total} 个文本块")
+                for offset in range(0, total, _ID_BATCH_SIZE):
+                    result = self.vectorstore._collection.get(
+                        include=["documents", "metadatas"], limit=_ID_BATCH_SIZE, offset=offset
+                    )
+                    self.lexical_index.add(
+                        result["ids"],
+                        result["documents"],
+                        [(metadata or {}).get("question_type") for metadata in result["metadatas"]],
+                    )
+            self._lexical_ready = True
+    
+    def _ensure_question_types(self):
+        """
+        为标注问题类型之前导入的文本块补标一次类型（没有文件上下文，只按文本块自身的标题和关键词归类）
+        
+        完成后在关键词索引中记录标记，之后导入的文本块在导入时标注。
+        """
+        if self._question_types_ready:
+            return
+        with self._lexical_lock:
+            if self._question_types_ready:
+                return
+            if self.lexical_index.get_meta(_QUESTION_TYPES_TAGGED_KEY) is None:
+                total = self.vectorstore._collection.count()
+                tagged = 0
+                for offset in range(0, total, _ID_BATCH_SIZE):
+                    result = self.vectorstore._collection.get(
+                        include=["documents", "metadatas"], limit=_ID_BATCH_SIZE, offset=offset
+                    )
+                    ids, metadatas = [], []
+                    for doc_id, content, metadata in zip(result["ids"], result["documents"], result["metadatas"]):
+                        metadata = dict(metadata or {})
+                        if "question_type" not in metadata:
+                            metadata["question_type"], _ = classify_chunk(content)
+                            ids.append(doc_id)
+                            metadatas.append(metadata)
+                    if ids:
+                        question_types = [metadata["question_type"] for metadata in metadatas]
+                        self.vectorstore._collection.update(ids=ids, metadatas=metadatas)
+                        self.lexical_index.set_question_types(ids, question_types)
+                        if self._vector_matrix is not None:
+                            self._vector_matrix.set_labels(ids, question_types)
+                        tagged += len(ids)
+                if tagged:
+                    print(f"为已有文本块补标问题类型: {tagged} 个")
+                self.lexical_index.set_meta(_QUESTION_TYPES_TAGGED_KEY, "1")
+            self._question_types_ready = True
+    
+    def _search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        ks: List[int],
+        question_types: List[Optional[List[str]]],
+    ) -> List[List[Document]]:
+        """
+        按查询向量批量检索，结果与 embeddings 一一对应
+        
+        Chroma 后端把过滤条件相同的查询合并为一次多向量查询。启用压缩时先在截断索引中召回
+        k * VECTOR_RESCORE_FACTOR 个候选，再用完整向量计算余弦相似度重排序，
+        启用压缩前导入、没有完整向量的候选保持索引顺序排在最后。
+        矩阵检索后端直接在进程内的向量矩阵上检索，见 _search_by_matrix。
+        
+        Args:
+            embeddings: 查询向量列表
+            ks: 各查询的返回数量
+            question_types: 各查询的问题类型过滤条件，先过滤再检索
+        """
+        if not embeddings:
+            return []
+        if self.vector_backend == VECTOR_BACKEND_MATRIX:
+            return self._search_by_matrix(embeddings, ks, question_types)
+        
+        wheres = [{"question_type": {"$in": types}} if types else None for types in question_types]
+        queries = np.asarray(embeddings, dtype=np.float32)
+        index_queries = truncate(queries, self.index_dimension) if self.index_dimension > 0 else queries
+        factor = self.rescore_factor if self.compressed else 1
+        results: List[List[Document]] = [[] for _ in embeddings]
+        for indexes in self._group_by_where(wheres):
+            result = self.vectorstore._collection.query(
+                query_embeddings=index_queries[indexes].tolist(),
+                n_results=max(ks[i] for i in indexes) * factor,
+                where=wheres[indexes[0]],
+                include=["documents", "metadatas"],
+            )
+            for n, i in enumerate(indexes):
+                candidates = {
+                    doc_id: Document(id=doc_id, page_content=content, metadata=metadata or {})
+                    for doc_id, content, metadata in zip(result["ids"][n], result["documents"][n], result["metadatas"][n])
+                }
+                if self.compressed:
+                    results[i] = self._rescore(queries[i], candidates, ks[i])
+                else:
+                    results[i] = list(candidates.values())[:ks[i]]
+        return results
+    
+    @staticmethod
+    def _group_by_where(wheres: List[Optional[Dict]]) -> List[List[int]]:
+        """按过滤条件把查询分组，返回各组的下标列表"""
+        groups: Dict[str, List[int]] = {}
+        for i, where in enumerate(wheres):
+            groups.setdefault(json.dumps(where, sort_keys=True, ensure_ascii=False), []).append(i)
+        return list(groups.values())
+    
+    def _rescore(self, query: np.ndarray, candidates: Dict[str, Document], k: int) -> List[Document]:
+        """用完整向量计算候选的余弦相似度并重排序，取前 k 个"""
+        if not candidates:
+            return []
+        found, vectors = self._get_vector_matrix(len(query)).get(list(candidates))
+        scores = vectors @ normalize(query)
+        ranked = [found[i] for i in np.argsort(-scores, kind="stable")]
+        rescored = set(found)
+        ranked += [doc_id for doc_id in candidates if doc_id not in rescored]
+        return [candidates[doc_id] for doc_id in ranked[:k]]
+    
+    def _search_by_matrix(
+        self,
+        embeddings: List[List[float]],
+        ks: List[int],
+        question_types: List[Optional[List[str]]],
+    ) -> List[List[Document]]:
+        """
+        在进程内的向量矩阵上批量检索，Chroma 只用于按ID读取文本和元数据
+        
+        多个查询与向量矩阵做一次矩阵-矩阵乘积；带问题类型过滤时用与矩阵行对齐的类型标签生成掩码，
+        只在符合条件的行中排序。
+        """
+        dimension = len(embeddings[0])
+        self._ensure_vector_matrix(dimension)
+        labels = [types or None for types in question_types]
+        index = self._get_matrix_index(dimension)
+        if len(embeddings) == 1:
+            hits = [index.search(embeddings[0], ks[0], labels[0])]
+        else:
+            hits = index.search_batch(np.asarray(embeddings, dtype=np.float32), max(ks), labels)
+        ids = [[doc_id for doc_id, _ in query_hits[:k]] for query_hits, k in zip(hits, ks)]
+        documents = self._get_documents(list(dict.fromkeys(doc_id for query_ids in ids for doc_id in query_ids)))
+        return [[documents[doc_id] for doc_id in query_ids if doc_id in documents] for query_ids in ids]
+    
+    def _ensure_vector_matrix(self, dimension: int):
+        """
+        矩阵检索后端首次使用时，从 Chroma 补齐一次向量矩阵：缺少的文本块（启用该后端之前导入的）写入完整向量，
+        没有类型标签的行（引入标签之前写入的）按元数据补上问题类型
+        
+        Chroma 中保存的是截断后的向量（VECTOR_INDEX_DIMENSION > 0）时无法补齐向量，需要重新导入。
+        """
+        if self._vector_matrix_ready:
+            return
+        with self._vector_matrix_ready_lock:
+            if self._vector_matrix_ready:
+                return
+            matrix = self._get_vector_matrix(dimension)
+            total = self.vectorstore._collection.count()
+            missing_vectors = len(matrix) < total
+            if missing_vectors and self.index_dimension > 0:
+                print(f"向量矩阵缺少 {total - len(matrix)} 个文本块的完整向量，需要重新导入题库")
+                missing_vectors = False
+            elif missing_vectors:
+                print(f"从向量库补齐向量矩阵: {total - len(matrix)} 个文本块")
+            # 补标类型之前的文本块在 Chroma 中也没有类型，等 _ensure_question_types 补标后再同步
+            missing_labels = (
+                matrix.unlabeled() > 0 and self.lexical_index.get_meta(_QUESTION_TYPES_TAGGED_KEY) is not None
+            )
+            if missing_vectors or missing_labels:
+                include = ["metadatas", "embeddings"] if missing_vectors else ["metadatas"]
+                for offset in range(0, total, _ID_BATCH_SIZE):
+                    result = self.vectorstore._collection.get(include=include, limit=_ID_BATCH_SIZE, offset=offset)
+                    ids = result["ids"]
+                    types = [(metadata or {}).get("question_type") for metadata in result["metadatas"]]
+                    missing = [i for i, doc_id in enumerate(ids) if doc_id not in matrix]
+                    if missing and missing_vectors:
+                        vectors = np.asarray(result["embeddings"], dtype=np.float32)[missing]
+                        matrix.upsert([ids[i] for i in missing], normalize(vectors), [types[i] for i in missing])
+                    matrix.set_labels(ids, types)
+            self._vector_matrix_ready = True
+    
+    def _get_matrix_index(self, dimension: int) -> MatrixIndex:
+        return get_matrix_index(self._get_vector_matrix(dimension), self.hnsw_min_rows)
+    
+    def _get_vector_matrix(self, dimension: int) -> VectorMatrix:
+        """完整向量矩阵（按维度和精度分目录存放，首次使用时创建，同一进程内的实例共用）"""
+        with self._vector_matrix_lock:
+            if self._vector_matrix is None or self._vector_matrix.dimension != dimension:
+                self._vector_matrix = open_vector_matrix(
+                    str(self.full_vectors_directory / f"{self.storage_dtype}_{dimension}"),
+                    dimension=dimension,
+                    dtype=self.storage_dtype,
+                )
+            return self._vector_matrix
+    
+    def _prepare_search(
+        self,
+        query: str,
+        job_requirements: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+    ) -> Tuple[str, Optional[List[str]]]:
+        """
+        构建检索查询和问题类型过滤条件
+        
+        能映射到标准类型的类型名转为元数据过滤条件，不再拼进查询文本稀释查询向量；无法映射的类型名
+        仍拼进查询文本，同时放开 "其他" 类型的文本块。查询和职位要求都为空时用类型名作为查询文本。
+        
+        Returns:
+            (检索查询, 标准类型列表；不过滤时为 None)
+        """
+        question_types = question_types or []
+        filter_types, query_types = resolve_question_types(question_types)
+        if filter_types and query_types:
+            filter_types.append(OTHER_QUESTION_TYPE)
+        if not (query or job_requirements):
+            query_types = question_types
+        return self._build_search_query(query, job_requirements, query_types), filter_types or None
+    
+    def _build_search_query(
+        self,
+        query: str,
+        job_requirements: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+    ) -> str:
+        """构建检索查询"""
         search_query = query
         if job_requirements:
             search_query = f"{job_requirements}\n{query}"
@@ -116,12 +1276,21 @@ class QuestionBank:
             type_filter = " ".join(question_types)
             search_query = f"{search_query}\n{type_filter}"
         
-        # 相似度检索
-        results = self.vectorstore.similarity_search(search_query, k=k)
-        
-        return results
+        return search_query
     
     def get_question_count(self) -> int:
         """获取问题库中的问题总数"""
-        return self.vectorstore._collection.count()
+        return self._cached_count("chunks", self.vectorstore)
+    
+    def get_question_record_count(self) -> int:
+        """获取导入时抽取的问题记录数"""
+        return self._cached_count("questions", self.question_store)
+    
+    def _cached_count(self, name: str, store: Chroma) -> int:
+        key = (name, self.retrieval_cache.generation)
+        count = self.retrieval_cache.counts.get(key)
+        if count is None:
+            count = store._collection.count()
+            self.retrieval_cache.counts.put(key, count)
+        return count
 
@@ -0,0 +1,105 @@
+"""
+题目抽取：导入时从题库文本中逐行识别问题，收集其后的答案，生成独立的问题记录
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from services.question_types import HEADING_PATTERN, OTHER_QUESTION_TYPE, classify_text
+
+
+# 问题最少字数，过短的多为误识别的编号或标题
+MIN_QUESTION_CHARS = 5
+# 答案最多保留的字数
+MAX_ANSWER_CHARS = 2000
+
+# 明确标记的问题："问题：" / "问：" / "Q1:" / "第3题：" 等，可以带 Markdown 标题前缀
+_MARKED_QUESTION = re.compile(
+    r"^(?:#{1,6}\s*)?(?:(?:问题|题目|面试题|问|q)\s*[0-9]*\s*[:：.．、]|第\s*[0-9一二三四五六七八九十百]+\s*题\s*[:：.．、]?)\s*(.+)$",
+    re.IGNORECASE,
+)
+# 以问号结尾的编号行或 Markdown 标题："1. xxx？" / "### 2.3 xxx?" / "## xxx？"
+_QUESTION_LINE = re.compile(r"^(?:#{0,6}\s*[0-9]+(?:\.[0-9]+)*\s*[.、．)）]\s*|#{1,6}\s*)(.+[?？])$")
+# 答案标记
+_ANSWER_PREFIX = re.compile(r"^(?:参考答案|答案|回答|答|a)\s*[:：]\s*", re.IGNORECASE)
+
+
+def _match_question(line: str) -> Optional[Tuple[str, str]]:
+    """
+    识别问题行
+
+    Returns:
+        (问题, 同一行中问题之后的内容)，不是问题行时返回 None
+    """
+    match = _MARKED_QUESTION.match(line)
+    if match:
+        body = match.group(1).strip()
+        # 问题到第一个问号为止；没有问号时到第一个句号为止，其余内容计入答案
+        end = re.search(r"[?？]", body) or re.search(r"。", body)
+        if end:
+            return body[:end.end()].strip(), body[end.end():].strip()
+        return body, ""
+
+    match = _QUESTION_LINE.match(line)
+    if match:
+        return match.group(1).strip(), ""
+    return None
+
+
+class QuestionExtractor:
+    """
+    问题抽取器
+
+    按文件顺序逐页（或逐段）调用 feed()，问题之后直到下一个问题或章节标题之前的内容作为答案，
+    跨页的答案会继续收集；输入结束后调用 flush() 取出最后一个问题。
+    问题类型优先取所在章节标题的类型，其次按问题和答案的关键词归类。
+    """
+
+    def __init__(self):
+        self.section_type: Optional[str] = None
+        self._current: Optional[Dict] = None
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        输入一段文本
+
+        Returns:
+            已完整的问题记录列表，每条包含 question、answer、question_type
+        """
+        records: List[Dict] = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            question = _match_question(line)
+            if question:
+                records.extend(self.flush())
+                question_text, rest = question
+                self._current = {
+                    "question": question_text,
+                    "answer": [_ANSWER_PREFIX.sub("", rest, count=1)] if rest else [],
+                    "section_type": self.section_type,
+                }
+                continue
+
+            heading = HEADING_PATTERN.match(line)
+            if heading:
+                records.extend(self.flush())
+                self.section_type = classify_text(heading.group(1))
+            elif self._current is not None:
+                self._current["answer"].append(_ANSWER_PREFIX.sub("", line, count=1))
+        return records
+
+    def flush(self) -> List[Dict]:
+        """结束当前问题，返回其记录（没有或过短时返回空列表）"""
+        current, self._current = self._current, None
+        if current is None or len(current["question"]) < MIN_QUESTION_CHARS:
+            return []
+
+        answer = "\n".join(current["answer"]).strip()[:MAX_ANSWER_CHARS]
+        question_type = (
+            current["section_type"]
+            or classify_text(f"{current['question']}\n{answer}")
+            or OTHER_QUESTION_TYPE
+        )
+        return [{"question": current["question"], "answer": answer, "question_type": question_type}]
@@ -0,0 +1,159 @@
+"""
+问题记录快照：按类型配额选题使用的内存矩阵，同一进程内访问同一集合的实例共用，写入和删除时增量更新
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from services.retrieval_cache import WriteGeneration
+from services.vector_matrix import normalize
+
+
+# 从集合加载快照时每次读取的记录数
+_LOAD_BATCH_SIZE = 500
+
+
+class QuestionSnapshot:
+    """
+    问题记录集合的内存快照：(问题记录列表, 归一化向量矩阵, 类型数组)，行号一一对应
+    
+    首次读取时从集合加载一次。之后本进程内任一实例的写入和删除通过 upsert() / delete() 记为待应用的变更，
+    下次读取时一次合并（连续多批导入只复制一次矩阵），不需要重新加载整个集合。
+    每次写入和删除都使集合的共享写入代数加一，快照记录自身对应的代数：读取时代数不一致
+    （其他 worker 进程写入或删除过，包括数量不变的替换）则重新加载。
+    """
+    
+    def __init__(self, collection, generation: WriteGeneration):
+        """
+        Args:
+            collection: 问题记录所在的 Chroma 集合
+            generation: 问题记录集合的共享写入代数
+        """
+        self._collection = collection
+        self._generation = generation
+        self._lock = threading.Lock()
+        self._data: Optional[Tuple[List[Document], np.ndarray, np.ndarray]] = None
+        self._data_generation: Optional[int] = None
+        self._pending_upserts: Dict[str, Tuple[Document, List[float]]] = {}
+        self._pending_deletes: Set[str] = set()
+    
+    def upsert(self, documents: Sequence[Document], embeddings: Sequence[List[float]]):
+        """记录写入的问题记录（在写入集合之后调用），快照尚未加载时忽略，加载时会读到"""
+        with self._lock:
+            if not self._advance():
+                return
+            for doc, embedding in zip(documents, embeddings):
+                self._pending_deletes.discard(doc.id)
+                self._pending_upserts[doc.id] = (doc, embedding)
+    
+    def delete(self, ids: Sequence[str]):
+        """记录删除的问题记录（在从集合删除之后调用）"""
+        with self._lock:
+            if not self._advance():
+                return
+            for doc_id in ids:
+                self._pending_upserts.pop(doc_id, None)
+                self._pending_deletes.add(doc_id)
+    
+    def _advance(self) -> bool:
+        """
+        写入代数加一（调用方需持有锁）
+        
+        Returns:
+            快照是否可以增量更新：已加载且加一前的代数与快照一致（期间没有其他进程的写入）
+        """
+        generation = self._generation.bump()
+        if self._data is None or self._data_generation != generation - 1:
+            return False
+        self._data_generation = generation
+        return True
+    
+    def get(self) -> Tuple[List[Document], np.ndarray, np.ndarray]:
+        """
+        返回当前快照，调用方不能修改
+        
+        Returns:
+            (问题记录列表, 归一化向量矩阵, 类型数组)
+        """
+        with self._lock:
+            generation = self._generation.get()
+            if self._data is None or self._data_generation != generation:
+                self._load(generation)
+            elif self._pending_upserts or self._pending_deletes:
+                self._apply_pending()
+            return self._data
+    
+    def _load(self, generation: int):
+        """
+        从集合加载全部问题记录（调用方需持有锁）
+        
+        Args:
+            generation: 加载前读取的写入代数；加载期间其他进程写入时代数已经变化，下次读取会再次加载
+        """
+        documents: List[Document] = []
+        embeddings: List = []
+        for offset in range(0, self._collection.count(), _LOAD_BATCH_SIZE):
+            result = self._collection.get(
+                include=["documents", "metadatas", "embeddings"], limit=_LOAD_BATCH_SIZE, offset=offset
+            )
+            documents.extend(
+                Document(id=doc_id, page_content=content, metadata=metadata or {})
+                for doc_id, content, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+            )
+            embeddings.extend(result["embeddings"])
+        self._set(documents, self._vectors(embeddings))
+        self._data_generation = generation
+        self._pending_upserts.clear()
+        self._pending_deletes.clear()
+    
+    def _apply_pending(self):
+        """
+        合并待应用的写入和删除（调用方需持有锁）
+        
+        生成新的列表和矩阵而不是原地修改，正在使用旧快照的检索不受影响。
+        """
+        documents, vectors, _ = self._data
+        changed = self._pending_deletes | set(self._pending_upserts)
+        keep = [row for row, doc in enumerate(documents) if doc.id not in changed]
+        added = list(self._pending_upserts.values())
+        new_vectors = self._vectors([embedding for _, embedding in added])
+        if keep and added:
+            new_vectors = np.concatenate([vectors[keep], new_vectors])
+        elif keep:
+            new_vectors = vectors[keep]
+        self._set([documents[row] for row in keep] + [doc for doc, _ in added], new_vectors)
+        self._pending_upserts.clear()
+        self._pending_deletes.clear()
+    
+    def _set(self, documents: List[Document], vectors: np.ndarray):
+        types = np.array([doc.metadata.get("question_type") for doc in documents], dtype=object)
+        self._data = (documents, vectors, types)
+    
+    @staticmethod
+    def _vectors(embeddings: List) -> np.ndarray:
+        if not len(embeddings):
+            return np.zeros((0, 0), dtype=np.float32)
+        return normalize(np.asarray(embeddings, dtype=np.float32))
+
+
+_question_snapshots: Dict[str, QuestionSnapshot] = {}
+_question_snapshots_lock = threading.Lock()
+
+
+def get_question_snapshot(collection_key: str, collection, generation: WriteGeneration) -> QuestionSnapshot:
+    """
+    获取问题记录集合的快照，同一进程内访问同一集合的 QuestionBank 实例共用
+    
+    Args:
+        collection_key: 集合标识（向量库目录 + 集合名）
+        collection: 问题记录所在的 Chroma 集合，首次创建快照时使用
+        generation: 问题记录集合的共享写入代数，首次创建快照时使用
+    """
+    with _question_snapshots_lock:
+        snapshot = _question_snapshots.get(collection_key)
+        if snapshot is None:
+            snapshot = QuestionSnapshot(collection, generation)
+            _question_snapshots[collection_key] = snapshot
+        return snapshot
@@ -0,0 +1,141 @@
+"""
+面试题类型分类：导入时根据标题和关键词为文本块标注问题类型，检索时把请求的类型名映射到标准类型
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# 无法归类的文本块
+OTHER_QUESTION_TYPE = "其他"
+
+# 标准问题类型及其关键词（英文关键词按整词匹配，不区分大小写）
+QUESTION_TYPE_KEYWORDS: Dict[str, List[str]] = {
+    "Java基础": [
+        "java基础", "集合", "hashmap", "arraylist", "linkedlist", "string", "泛型", "反射", "异常",
+        "抽象类", "接口", "equals", "hashcode", "自动装箱", "注解", "序列化", "object",
+    ],
+    "多线程": [
+        "多线程", "并发", "线程", "锁", "synchronized", "volatile", "aqs", "cas", "threadlocal",
+        "线程池", "reentrantlock", "concurrenthashmap", "completablefuture", "死锁", "原子类",
+    ],
+    "JVM": [
+        "jvm", "垃圾回收", "垃圾收集", "gc", "g1", "zgc", "cms", "类加载", "双亲委派", "内存模型",
+        "堆内存", "元空间", "metaspace", "jit", "内存泄漏", "oom",
+    ],
+    "数据库": [
+        "mysql", "数据库", "索引", "事务", "隔离级别", "mvcc", "b+树", "sql", "binlog", "redo",
+        "undo", "分库分表", "慢查询", "innodb", "主从复制",
+    ],
+    "Redis": [
+        "redis", "缓存", "持久化", "rdb", "aof", "哨兵", "sentinel", "缓存穿透", "缓存雪崩",
+        "缓存击穿", "分布式锁", "跳表", "过期策略",
+    ],
+    "Spring": [
+        "spring", "springboot", "ioc", "aop", "bean", "springmvc", "事务传播", "自动配置",
+        "mybatis", "依赖注入", "循环依赖",
+    ],
+    "消息队列": [
+        "消息队列", "kafka", "rocketmq", "rabbitmq", "mq", "消费者", "生产者", "offset",
+        "重复消费", "顺序消息", "消息丢失", "死信",
+    ],
+    "分布式": [
+        "分布式", "微服务", "cap", "raft", "paxos", "一致性", "rpc", "dubbo", "grpc", "注册中心",
+        "nacos", "zookeeper", "限流", "熔断", "降级", "幂等", "分布式事务",
+    ],
+    "计算机网络": [
+        "计算机网络", "tcp", "udp", "http", "https", "三次握手", "四次挥手", "nio", "epoll",
+        "netty", "socket", "dns", "拥塞控制",
+    ],
+    "操作系统": [
+        "操作系统", "进程", "虚拟内存", "页表", "进程调度", "零拷贝", "mmap", "上下文切换", "系统调用",
+    ],
+    "算法": [
+        "算法", "数据结构", "排序", "二叉树", "链表", "动态规划", "时间复杂度", "二分查找", "回溯", "贪心",
+    ],
+    "系统设计": [
+        "系统设计", "架构设计", "高并发", "高可用", "秒杀", "短链", "设计一个", "容量评估", "扩展性",
+    ],
+}
+
+QUESTION_TYPES = list(QUESTION_TYPE_KEYWORDS)
+
+
+def _keyword_pattern(keywords: Sequence[str]) -> "re.Pattern":
+    parts = []
+    for keyword in sorted(keywords, key=len, reverse=True):
+        escaped = re.escape(keyword)
+        # 英文关键词两侧不能紧挨着字母，避免 "gc" 命中 "logic"、"cas" 命中 "case"
+        parts.append(f"(?<![a-z]){escaped}(?![a-z])" if keyword.isascii() else escaped)
+    return re.compile("|".join(parts))
+
+
+_TYPE_PATTERNS = {name: _keyword_pattern(keywords + [name.lower()]) for name, keywords in QUESTION_TYPE_KEYWORDS.items()}
+
+# 标题行：Markdown 标题，或 "第X章 / 一、" 形式的中文编号标题
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]+|第[一二三四五六七八九十百零0-9]+[章节部分篇][ \t]*|[一二三四五六七八九十]+[、.．][ \t]*)(.{1,40})$",
+    re.MULTILINE,
+)
+
+
+def classify_text(text: str, min_score: int = 1) -> Optional[str]:
+    """
+    按关键词命中次数给文本归类
+
+    Args:
+        text: 文本
+        min_score: 最少命中次数
+
+    Returns:
+        命中次数最多的标准类型，不足 min_score 时返回 None
+    """
+    text = text.lower()
+    best_type, best_score = None, 0
+    for name, pattern in _TYPE_PATTERNS.items():
+        score = len(pattern.findall(text))
+        if score > best_score:
+            best_type, best_score = name, score
+    return best_type if best_score >= min_score else None
+
+
+def classify_chunk(text: str, section_type: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    确定文本块的问题类型
+
+    标题比正文关键词更可靠：文本块以标题开头时取该标题的类型，否则沿用上一个标题的类型（所在章节）；
+    都没有时按正文关键词归类（至少命中 2 次），仍无法归类时为 "其他"。
+
+    Args:
+        text: 文本块内容
+        section_type: 之前的文本块中最后一个标题的类型（按文件顺序导入时逐块传递）
+
+    Returns:
+        (文本块类型, 本文本块之后生效的章节类型)
+    """
+    headings = list(HEADING_PATTERN.finditer(text))
+    chunk_type = section_type
+    if headings and not text[:headings[0].start()].strip():
+        chunk_type = classify_text(headings[0].group(1))
+    if headings:
+        section_type = classify_text(headings[-1].group(1))
+
+    chunk_type = chunk_type or classify_text(text, min_score=2) or OTHER_QUESTION_TYPE
+    return chunk_type, section_type
+
+
+def resolve_question_types(question_types: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """
+    把请求中的类型名映射到标准类型（如 "并发编程" → "多线程"）
+
+    Returns:
+        (标准类型列表, 无法映射的类型名列表)
+    """
+    resolved: List[str] = []
+    unresolved: List[str] = []
+    for name in question_types:
+        question_type = name if name in QUESTION_TYPE_KEYWORDS else classify_text(name)
+        if question_type is None:
+            unresolved.append(name)
+        elif question_type not in resolved:
+            resolved.append(question_type)
+    return resolved, unresolved
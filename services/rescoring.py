@@ -0,0 +1,347 @@
+"""
+离线批量重新评分：评估提示词调整后，对数据库中的历史回答重新评分
+
+用法：
+    python -m services.rescoring --job prompt-v2 --batch-size 5 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from api.interviewer import Interviewer
+from services.database import InterviewRecord, get_db_session, init_db
+from services.interview_session import InterviewStage, session_manager
+
+
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parent.parent / "storage" / "rescoring"
+
+# 每次从数据库读取的记录 ID 数量
+ID_PAGE_SIZE = 500
+# 每完成该数量的记录保存一次检查点（中断后最多重新评分这么多条记录，同一任务重复写回不会覆盖原分数）
+CHECKPOINT_INTERVAL = 50
+
+QA_FIELDS = ("project_qa_list", "technical_qa_list")
+
+
+class RescoringJob:
+    """
+    批量重新评分任务
+    
+    - 分页流式读取面试记录 ID，逐条加载记录，内存占用与记录总数无关；
+    - 同一场面试的多个回答合并到一个提示词中评估（共用简历上下文），模型漏评的回答单独重评；
+    - 通过信号量限制同时进行的 LLM 调用数；
+    - 每完成一条记录就写回分数，每 CHECKPOINT_INTERVAL 条记录在线程中保存一次检查点，
+      中断后以同一任务名重新运行即可从断点继续；dry_run 时不读写检查点。
+    """
+    
+    def __init__(
+        self,
+        job_name: str = "default",
+        batch_size: int = 5,
+        concurrency: int = 4,
+        checkpoint_path: Optional[str] = None,
+        only_concluded: bool = True,
+        dry_run: bool = False,
+        interviewer: Optional[Interviewer] = None,
+    ):
+        """
+        初始化任务
+        
+        Args:
+            job_name: 任务名，用于区分检查点（每次修改评估提示词使用新的任务名）
+            batch_size: 每个提示词中评估的回答数
+            concurrency: 最大并发 LLM 调用数
+            checkpoint_path: 检查点文件路径（默认 storage/rescoring/<job_name>.json）
+            only_concluded: 是否只处理已结束的面试（避免与进行中的面试同时写入）
+            dry_run: 只评分不写回数据库，也不读写检查点
+            interviewer: 面试官实例（默认新建）
+        """
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size 和 concurrency 必须大于 0")
+        
+        self.job_name = job_name
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.checkpoint_path = Path(checkpoint_path or DEFAULT_CHECKPOINT_DIR / f"{job_name}.json")
+        self.only_concluded = only_concluded
+        self.dry_run = dry_run
+        self.interviewer = interviewer or Interviewer()
+        
+        self.completed_ids: Set[str] = set()
+        self.stats = {
+            "records": 0,
+            "answers": 0,
+            "llm_calls": 0,
+            "fallback_calls": 0,
+            "failed_records": 0,
+            "skipped_records": 0,
+        }
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._checkpoint_lock: Optional[asyncio.Lock] = None
+        self._started_at = 0.0
+    
+    def run(self, limit: Optional[int] = None) -> Dict:
+        """同步运行任务（CLI 入口）"""
+        return asyncio.run(self.arun(limit=limit))
+    
+    async def arun(self, limit: Optional[int] = None) -> Dict:
+        """
+        运行任务
+        
+        Args:
+            limit: 本次最多处理的记录数（None 表示全部）
+        
+        Returns:
+            吞吐统计
+        """
+        init_db()
+        if not self.dry_run:
+            self._load_checkpoint()
+        self.stats["skipped_records"] = len(self.completed_ids)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._checkpoint_lock = asyncio.Lock()
+        self._started_at = time.perf_counter()
+        
+        # 有界队列：生产者分页读取 ID，消费者逐条处理记录
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        
+        try:
+            await self._produce_ids(queue, limit)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await self._save_checkpoint()
+        
+        report = self.report()
+        print(f"重新评分完成: {json.dumps(report, ensure_ascii=False)}")
+        return report
+    
+    def report(self) -> Dict:
+        """返回当前吞吐统计"""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "job": self.job_name,
+            **self.stats,
+            "elapsed_seconds": round(elapsed, 2),
+            "records_per_second": round(self.stats["records"] / elapsed, 2) if elapsed else 0.0,
+            "answers_per_second": round(self.stats["answers"] / elapsed, 2) if elapsed else 0.0,
+        }
+    
+    async def _produce_ids(self, queue: asyncio.Queue, limit: Optional[int]):
+        """分页读取待处理的记录 ID 并放入队列"""
+        last_id = ""
+        produced = 0
+        while limit is None or produced < limit:
+            ids = await asyncio.to_thread(self._fetch_id_page, last_id)
+            if not ids:
+                break
+            last_id = ids[-1]
+            for record_id in ids:
+                if record_id in self.completed_ids:
+                    continue
+                await queue.put(record_id)
+                produced += 1
+                if limit is not None and produced >= limit:
+                    break
+    
+    def _fetch_id_page(self, after_id: str) -> List[str]:
+        """按主键顺序读取一页记录 ID（键集分页，不依赖 OFFSET）"""
+        db = get_db_session()
+        try:
+            query = db.query(InterviewRecord.id).filter(InterviewRecord.id > after_id)
+            if self.only_concluded:
+                query = query.filter(InterviewRecord.stage == InterviewStage.CONCLUDED.value)
+            return [row.id for row in query.order_by(InterviewRecord.id).limit(ID_PAGE_SIZE)]
+        finally:
+            db.close()
+    
+    async def _worker(self, queue: asyncio.Queue):
+        """消费者：逐条处理记录"""
+        while True:
+            record_id = await queue.get()
+            if record_id is None:
+                return
+            try:
+                await self._rescore_record(record_id)
+            except Exception as e:
+                self.stats["failed_records"] += 1
+                print(f"重新评分失败: {record_id}, {e}")
+    
+    async def _rescore_record(self, record_id: str):
+        """重新评分一条面试记录并写回"""
+        record = await asyncio.to_thread(self._load_record, record_id)
+        if record is None:
+            return
+        
+        # (字段名, 下标, 问题, 回答)
+        items: List[Tuple[str, int, str, str]] = [
+            (field_name, index, qa.get("question", ""), qa.get("answer", ""))
+            for field_name in QA_FIELDS
+            for index, qa in enumerate(record[field_name] or [])
+            if qa.get("answer")
+        ]
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        results = await asyncio.gather(*[
+            self._evaluate_batch(batch, record["resume_content"]) for batch in batches
+        ])
+        
+        scores: Dict[Tuple[str, int], Tuple[int, str]] = {}
+        for batch, batch_results in zip(batches, results):
+            for (field_name, index, _, _), result in zip(batch, batch_results):
+                scores[(field_name, index)] = result
+        
+        if not self.dry_run:
+            await asyncio.to_thread(self._write_back, record_id, scores)
+        
+        self.completed_ids.add(record_id)
+        self.stats["records"] += 1
+        self.stats["answers"] += len(items)
+        if self.stats["records"] % CHECKPOINT_INTERVAL == 0:
+            await self._save_checkpoint()
+            print(f"重新评分进度: {json.dumps(self.report(), ensure_ascii=False)}")
+    
+    async def _evaluate_batch(
+        self,
+        batch: List[Tuple[str, int, str, str]],
+        resume_content: Optional[str],
+    ) -> List[Tuple[int, str]]:
+        """评估一批回答，模型漏评的回答单独重新评估"""
+        qa_pairs = [(question, answer) for _, _, question, answer in batch]
+        async with self._semaphore:
+            self.stats["llm_calls"] += 1
+            results = await self.interviewer.aevaluate_answers_batch(qa_pairs, resume_content)
+        
+        for position, result in enumerate(results):
+            if result is None:
+                question, answer = qa_pairs[position]
+                async with self._semaphore:
+                    self.stats["fallback_calls"] += 1
+                    score, feedback, _ = await self.interviewer.aevaluate_answer(question, answer, resume_content)
+                results[position] = (score, feedback)
+        return results
+    
+    def _load_record(self, record_id: str) -> Optional[Dict]:
+        """读取评分所需的字段"""
+        db = get_db_session()
+        try:
+            record = db.query(InterviewRecord).filter(InterviewRecord.id == record_id).first()
+            if record is None:
+                return None
+            return {
+                "resume_content": record.resume_content,
+                "project_qa_list": record.project_qa_list,
+                "technical_qa_list": record.technical_qa_list,
+            }
+        finally:
+            db.close()
+    
+    def _write_back(self, record_id: str, scores: Dict[Tuple[str, int], Tuple[int, str]]):
+        """写回新分数（保留原分数为 previous_score），并重建滚动摘要和分数统计"""
+        db = get_db_session()
+        try:
+            record = db.query(InterviewRecord).filter(InterviewRecord.id == record_id).first()
+            if record is None:
+                return
+            
+            for field_name in QA_FIELDS:
+                qa_list = [dict(qa) for qa in getattr(record, field_name) or []]
+                for index, qa in enumerate(qa_list):
+                    if (field_name, index) in scores:
+                        score, feedback = scores[(field_name, index)]
+                        # 检查点之后的记录在中断后会被同一任务再次评分，保留第一次评分前的原分数
+                        if qa.get("rescoring_job") != self.job_name:
+                            qa["previous_score"] = qa.get("score")
+                        qa["score"] = score
+                        qa["feedback"] = feedback
+                        qa["rescoring_job"] = self.job_name
+                # JSON 列需要重新赋值才会被标记为已修改
+                setattr(record, field_name, qa_list)
+            
+            session = session_manager._record_to_session(record)
+            session.rebuild_summary()
+            record.summary = list(session.summary)
+            record.score_stats = dict(session.score_stats)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        
+        # 丢弃内存中的旧会话，下次访问时从数据库重新加载
+        session_manager.sessions.pop(record_id, None)
+    
+    def _load_checkpoint(self):
+        """读取检查点（已完成的记录 ID）"""
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.completed_ids = set(json.load(f).get("completed_ids", []))
+            print(f"从检查点继续: {self.checkpoint_path}，已完成 {len(self.completed_ids)} 条记录")
+    
+    async def _save_checkpoint(self):
+        """在线程中保存检查点（dry_run 时不保存），依次写入，不会互相覆盖"""
+        if self.dry_run:
+            return
+        completed_ids, stats = list(self.completed_ids), dict(self.stats)
+        async with self._checkpoint_lock:
+            await asyncio.to_thread(self._write_checkpoint, completed_ids, stats)
+    
+    def _write_checkpoint(self, completed_ids: List[str], stats: Dict):
+        """原子写入检查点"""
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "job": self.job_name,
+                "completed_ids": sorted(completed_ids),
+                "stats": stats,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+async def arescore_interviews(job_name: str = "default", limit: Optional[int] = None, **kwargs) -> Dict:
+    """
+    批量重新评分（服务接口）
+    
+    Args:
+        job_name: 任务名
+        limit: 本次最多处理的记录数
+        **kwargs: 传给 RescoringJob 的其他参数
+    
+    Returns:
+        吞吐统计
+    """
+    return await RescoringJob(job_name=job_name, **kwargs).arun(limit=limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对历史面试回答批量重新评分")
+    parser.add_argument("--job", default="default", help="任务名（用于检查点，修改提示词后使用新任务名）")
+    parser.add_argument("--batch-size", type=int, default=5, help="每个提示词评估的回答数")
+    parser.add_argument("--concurrency", type=int, default=4, help="最大并发 LLM 调用数")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多处理的记录数")
+    parser.add_argument("--checkpoint", default=None, help="检查点文件路径")
+    parser.add_argument("--all-stages", action="store_true", help="同时处理未结束的面试")
+    parser.add_argument("--dry-run", action="store_true", help="只评分不写回（不读写检查点）")
+    args = parser.parse_args()
+    
+    RescoringJob(
+        job_name=args.job,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        only_concluded=not args.all_stages,
+        dry_run=args.dry_run,
+    ).run(limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+题库检索缓存：进程内的 LRU/TTL 缓存，缓存查询向量、检索结果和题库计数，按集合的写入代数失效
+
+写入代数保存在向量库目录下的 SQLite 文件中，访问同一向量库的所有 worker 进程共享。
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.config import get_env
+
+
+RETRIEVAL_CACHE_ENABLED_ENV = "RETRIEVAL_CACHE_ENABLED"
+RETRIEVAL_CACHE_TTL_ENV = "RETRIEVAL_CACHE_TTL_SECONDS"
+RETRIEVAL_CACHE_MAX_ENTRIES_ENV = "RETRIEVAL_CACHE_MAX_ENTRIES"
+
+
+class LRUCache:
+    """
+    线程安全的内存 LRU 缓存，条目超过 TTL 后视为未命中
+    
+    max_entries 为 0 时不保存任何条目（用于关闭缓存）。
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 300):
+        """
+        Args:
+            max_entries: 最大条目数，超出后淘汰最久未访问的条目
+            ttl_seconds: 条目有效期（秒），None 表示永不过期
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """查找缓存，未命中或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, created_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+class WriteGeneration:
+    """
+    集合的写入代数：保存在 SQLite 文件中，访问同一文件的所有进程共享
+    
+    每次写入或删除集合后调用 bump() 加一，读取方比较代数判断集合是否被（任一进程）修改过。
+    """
+    
+    def __init__(self, database_path: str, name: str):
+        """
+        Args:
+            database_path: SQLite 文件路径
+            name: 集合名称，同一文件中保存多个集合的代数
+        """
+        self.database_path = database_path
+        self.name = name
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 自动提交模式，bump() 中显式开启写事务
+        self._conn = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS write_generation (name TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+    
+    def get(self) -> int:
+        """当前代数，集合从未写入过时为 0"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM write_generation WHERE name = ?", (self.name,)
+            ).fetchone()
+        return row[0] if row else 0
+    
+    def bump(self) -> int:
+        """代数加一，返回新的代数"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO write_generation (name, generation) VALUES (?, 1)"
+                    " ON CONFLICT (name) DO UPDATE SET generation = generation + 1",
+                    (self.name,),
+                )
+                generation = self._conn.execute(
+                    "SELECT generation FROM write_generation WHERE name = ?", (self.name,)
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return generation
+
+
+_write_generations: Dict[Tuple[str, str], WriteGeneration] = {}
+_write_generations_lock = threading.Lock()
+
+
+def get_write_generation(database_path: str, name: str) -> WriteGeneration:
+    """
+    获取集合的写入代数，同一进程内共用一个数据库连接
+    
+    Args:
+        database_path: SQLite 文件路径（向量库目录下的 write_generation.db）
+        name: 集合名称
+    """
+    key = (str(Path(database_path).resolve()), name)
+    with _write_generations_lock:
+        generation = _write_generations.get(key)
+        if generation is None:
+            generation = WriteGeneration(database_path, name)
+            _write_generations[key] = generation
+        return generation
+
+
+class RetrievalCache:
+    """
+    一个题库集合的检索缓存
+    
+    - embeddings：查询文本 → 查询向量，与题库内容无关，只受 LRU/TTL 限制
+    - results：检索结果，键中包含写入代数
+    - counts：文本块数 / 问题记录数，键中包含写入代数
+    
+    每次导入写入或删除都调用 bump() 使写入代数加一并清空 results、counts：检索开始时记下代数，
+    检索期间发生写入时结果存入旧代数的键下，不会被之后的检索命中。
+    传入 shared_generation 时代数保存在数据库中，每次读取 generation 都与数据库比较，
+    其他 worker 进程的导入或删除同样使本进程的旧结果立即失效；不传时代数只在进程内有效。
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 300,
+        enabled: bool = True,
+        shared_generation: Optional[WriteGeneration] = None,
+    ):
+        """
+        Args:
+            max_entries: 每类缓存的最大条目数
+            ttl_seconds: 条目有效期（秒），None 表示永不过期
+            enabled: 是否启用，关闭时仍维护写入代数
+            shared_generation: 多进程共享的写入代数
+        """
+        self.enabled = enabled
+        self._shared_generation = shared_generation
+        self._generation = shared_generation.get() if shared_generation is not None else 0
+        self._lock = threading.Lock()
+        capacity = max_entries if enabled else 0
+        self.embeddings = LRUCache(capacity, ttl_seconds)
+        self.results = LRUCache(capacity, ttl_seconds)
+        self.counts = LRUCache(capacity, ttl_seconds)
+    
+    @property
+    def generation(self) -> int:
+        """当前写入代数，用作检索结果和计数缓存键的一部分"""
+        if self._shared_generation is None:
+            return self._generation
+        generation = self._shared_generation.get()
+        if generation != self._generation:
+            # 其他进程修改了题库：旧代数下的条目不会再命中，直接清空
+            with self._lock:
+                self._generation = generation
+            self.results.clear()
+            self.counts.clear()
+        return generation
+    
+    def bump(self):
+        """题库内容变化：写入代数加一，丢弃旧代数下的检索结果和计数"""
+        with self._lock:
+            if self._shared_generation is not None:
+                self._generation = self._shared_generation.bump()
+            else:
+                self._generation += 1
+        self.results.clear()
+        self.counts.clear()
+    
+    def stats(self) -> Dict:
+        """返回各类缓存的命中统计"""
+        return {
+            "enabled": self.enabled,
+            "generation": self.generation,
+            "max_entries": self.embeddings.max_entries,
+            "ttl_seconds": self.embeddings.ttl_seconds,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "counts": self.counts.stats(),
+        }
+
+
+_retrieval_caches: Dict[str, RetrievalCache] = {}
+_retrieval_caches_lock = threading.Lock()
+
+
+def get_retrieval_cache(collection_key: str, shared_generation: Optional[WriteGeneration] = None) -> RetrievalCache:
+    """
+    获取集合的检索缓存，同一进程内访问同一集合的 QuestionBank 实例共用，
+    任一实例（以及传入 shared_generation 时任一进程）的导入或删除都会使缓存失效
+    
+    读取环境变量：
+      - RETRIEVAL_CACHE_ENABLED（可选，默认 true，设置为 false 关闭缓存）
+      - RETRIEVAL_CACHE_TTL_SECONDS（可选，默认 300，0 表示永不过期）
+      - RETRIEVAL_CACHE_MAX_ENTRIES（可选，每类缓存的最大条目数，默认 1024）
+    
+    Args:
+        collection_key: 集合标识（向量库目录 + 集合名）
+        shared_generation: 多进程共享的写入代数，首次创建缓存时使用
+    """
+    with _retrieval_caches_lock:
+        cache = _retrieval_caches.get(collection_key)
+        if cache is None:
+            ttl_seconds = float(get_env(RETRIEVAL_CACHE_TTL_ENV, "300"))
+            cache = RetrievalCache(
+                max_entries=int(get_env(RETRIEVAL_CACHE_MAX_ENTRIES_ENV, "1024")),
+                ttl_seconds=ttl_seconds or None,
+                enabled=get_env(RETRIEVAL_CACHE_ENABLED_ENV, "true").lower() not in ("false", "0", "no"),
+                shared_generation=shared_generation,
+            )
+            _retrieval_caches[collection_key] = cache
+        return cache
@@ -0,0 +1,430 @@
+"""
+向量矩阵存储：按行追加写入的内存映射文件，支持 float16 / int8（每行一个缩放系数）量化
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只能单进程写入
+    fcntl = None
+
+
+# 支持的存储精度
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# 进程内共享的矩阵：同一目录只打开一次，多个 QuestionBank 实例共用同一份 ID 映射和内存映射
+_shared_matrices: Dict[Tuple[str, int, str], "VectorMatrix"] = {}
+_shared_lock = threading.Lock()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """按行做 L2 归一化"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def truncate(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """截取前 dimension 维并重新归一化（text-embedding-v4 的前若干维携带了主要信息）"""
+    return normalize(np.asarray(vectors, dtype=np.float32)[..., :dimension])
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    量化向量
+    
+    Args:
+        vectors: (n, dim) float32 矩阵
+        dtype: float32 / float16 / int8
+    
+    Returns:
+        (量化后的矩阵, 每行的缩放系数)；int8 以每行最大绝对值 / 127 作为缩放系数，其余精度系数为 1
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(dtype), np.ones(len(vectors), dtype=np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """还原为 float32 矩阵"""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class VectorMatrix:
+    """
+    按 ID 存取的向量矩阵
+    
+    向量和缩放系数分别以定长行写入二进制文件，读取时通过 np.memmap 映射，
+    不需要把整个矩阵加载到内存；ID 与行号的对应关系记录在追加写入的日志文件中。
+    每行可以带一个标签（如问题类型），同样记录在日志中，检索时按标签生成行掩码过滤。
+    删除只标记 ID，行空间在 compact() 时回收。
+    
+    多个进程可以同时读写同一目录：映射的文件页由操作系统页缓存共享，读取前检查日志文件，
+    其他进程追加的写入和删除会被增量加载。写入、删除和 compact 持有目录下 .lock 文件的排他锁，
+    加锁后先加载其他进程的日志再分配行号；读取方加载新日志时持有共享锁。
+    """
+    
+    def __init__(self, directory: str, dimension: int, dtype: str = "float32"):
+        """
+        Args:
+            directory: 存储目录（不同维度、精度的矩阵应使用不同目录）
+            dimension: 向量维度
+            dtype: 存储精度（float32 / float16 / int8）
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"不支持的向量存储精度: {dtype}，可选值: {', '.join(VECTOR_DTYPES)}")
+        
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.dtype = dtype
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.bin"
+        self._scales_path = self.directory / "scales.bin"
+        self._ids_path = self.directory / "ids.log"
+        self._lock_path = self.directory / ".lock"
+        self._lock = threading.RLock()
+        self._row_bytes = dimension * np.dtype(dtype).itemsize
+        
+        # ID → 行号，以及行号 → ID（已删除的行为 None）、行号 → 标签
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._row_labels: List[Optional[str]] = []
+        self._log_offset = 0  # 已加载到的日志文件位置
+        # 保持日志文件打开：compact 用新文件替换日志后，旧文件的 inode 不会被复用，可以据此发现替换
+        self._log_file: Optional[BinaryIO] = None
+        self._log_inode: Optional[int] = None
+        self._flock_held = False
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        # 每次写入、删除后递增，供调用方判断缓存的派生数据（存活行掩码、图索引等）是否过期
+        self.version = 0
+        # 已有行的向量被原地覆盖或行号变化（compact）时递增，按行号增量维护的派生数据（图索引等）需要重建
+        self.epoch = 0
+        self._live: Optional[Tuple[int, np.ndarray]] = None
+        # 标签 → 编号，以及按版本缓存的行号 → 标签编号数组（无标签为 -1）
+        self._label_codes: Dict[str, int] = {}
+        self._label_array: Optional[Tuple[int, np.ndarray]] = None
+        self._load_ids()
+    
+    def _load_ids(self):
+        """从上次读到的位置继续加载日志（日志被 compact 替换时从头加载），调用方需持有线程锁"""
+        try:
+            stat = self._ids_path.stat()
+        except FileNotFoundError:
+            return
+        if stat.st_ino == self._log_inode and stat.st_size == self._log_offset:
+            return
+        with self._flock(fcntl.LOCK_SH if fcntl else None):
+            stat = self._ids_path.stat()
+            if stat.st_ino != self._log_inode:
+                if self._log_file is not None:
+                    self._log_file.close()
+                self._log_file = open(self._ids_path, "rb")
+                self._log_inode = os.fstat(self._log_file.fileno()).st_ino
+                self._rows, self._row_ids, self._row_labels, self._log_offset = {}, [], [], 0
+                self._invalidate()
+                self.epoch += 1
+            self._log_file.seek(self._log_offset)
+            data = self._log_file.read()
+            # 只处理完整的行（没有文件锁时其他进程可能正在写入半行）
+            data = data[:data.rfind(b"\n") + 1]
+            self._log_offset += len(data)
+            self._apply_log(data.decode("utf-8"))
+            # 在锁内映射新写入的行，不会映射到 compact 替换了一半的文件
+            self._mapped()
+            self.version += 1
+    
+    def _apply_log(self, text: str):
+        """
+        应用日志行：
+          - "+ ID[\t标签]"：新增一行
+          - "= ID\t标签"：修改标签（标签为空表示清除）
+          - "* ID"：原地覆盖向量
+          - "- ID"：删除
+        """
+        for line in text.splitlines():
+            op, _, entry = line.partition(" ")
+            vector_id, _, label = entry.partition("\t")
+            if op == "+":
+                self._rows[vector_id] = len(self._row_ids)
+                self._row_ids.append(vector_id)
+                self._row_labels.append(label or None)
+            elif op == "=" and vector_id in self._rows:
+                self._row_labels[self._rows[vector_id]] = label or None
+            elif op == "*" and vector_id in self._rows:
+                self.epoch += 1
+            elif op == "-" and vector_id in self._rows:
+                row = self._rows.pop(vector_id)
+                self._row_ids[row] = None
+                self._row_labels[row] = None
+    
+    def refresh(self):
+        """加载其他进程追加的写入和删除"""
+        with self._lock:
+            self._load_ids()
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._rows
+    
+    @property
+    def nbytes(self) -> int:
+        """磁盘占用（字节）"""
+        return sum(path.stat().st_size for path in (self._vectors_path, self._scales_path) if path.exists())
+    
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, labels: Optional[Sequence[Optional[str]]] = None):
+        """
+        写入向量，已存在的 ID 原地覆盖
+        
+        Args:
+            ids: 向量 ID
+            vectors: (n, dimension) 矩阵
+            labels: 各向量的标签，不提供时新增的行没有标签、已有的行保留原标签
+        """
+        codes, scales = quantize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension), self.dtype)
+        with self._write_lock():
+            self._write(ids, codes, scales, labels)
+    
+    def delete(self, ids: Sequence[str]):
+        """删除向量（只标记，行空间在 compact 时回收）"""
+        with self._write_lock():
+            deleted = [vector_id for vector_id in ids if vector_id in self._rows]
+            if not deleted:
+                return
+            self._append_log("".join(f"- {vector_id}\n" for vector_id in deleted))
+            self.version += 1
+    
+    def set_labels(self, ids: Sequence[str], labels: Sequence[Optional[str]]):
+        """修改已有向量的标签（不存在的 ID 忽略）"""
+        with self._write_lock():
+            self._relabel(ids, labels)
+    
+    def labels(self, ids: Sequence[str]) -> List[Optional[str]]:
+        """ID 对应的标签（不存在或没有标签时为 None）"""
+        with self._lock:
+            return [self._row_labels[self._rows[vector_id]] if vector_id in self._rows else None for vector_id in ids]
+    
+    def unlabeled(self) -> int:
+        """没有标签的存活行数"""
+        with self._lock:
+            return sum(1 for row in self._rows.values() if self._row_labels[row] is None)
+    
+    def label_mask(self, labels: Sequence[str]) -> np.ndarray:
+        """
+        标签属于 labels 的行掩码（长度为当前行数，已删除的行为 False）
+        
+        行号 → 标签编号的数组按版本缓存，每次只需一次向量化比较。
+        """
+        with self._lock:
+            if self._label_array is None or self._label_array[0] != self.version:
+                for label in self._row_labels:
+                    if label is not None and label not in self._label_codes:
+                        self._label_codes[label] = len(self._label_codes)
+                codes = np.array(
+                    [-1 if label is None else self._label_codes[label] for label in self._row_labels], dtype=np.int32
+                )
+                self._label_array = (self.version, codes)
+            wanted = [self._label_codes[label] for label in labels if label in self._label_codes]
+            return np.isin(self._label_array[1], wanted)
+    
+    @contextmanager
+    def _flock(self, operation: Optional[int]):
+        """持有目录锁文件的跨进程锁（已持有或平台不支持时不加锁）"""
+        if operation is None or self._flock_held:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            self._flock_held = True
+            try:
+                yield
+            finally:
+                self._flock_held = False
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _write_lock(self):
+        """持有线程锁和跨进程排他锁，并先加载其他进程已经写入的日志，保证行号按文件中的实际行数分配"""
+        with self._lock, self._flock(fcntl.LOCK_EX if fcntl else None):
+            self._load_ids()
+            yield
+    
+    def _write(
+        self,
+        ids: Sequence[str],
+        codes: np.ndarray,
+        scales: np.ndarray,
+        labels: Optional[Sequence[Optional[str]]] = None,
+    ):
+        """写入量化后的向量（调用方需持有写锁）"""
+        new_rows = [i for i, vector_id in enumerate(ids) if vector_id not in self._rows]
+        existing = [(self._rows[vector_id], i) for i, vector_id in enumerate(ids) if vector_id in self._rows]
+        
+        if existing:
+            self._invalidate()
+            with open(self._vectors_path, "r+b") as vectors_file, open(self._scales_path, "r+b") as scales_file:
+                for row, i in existing:
+                    vectors_file.seek(row * self._row_bytes)
+                    vectors_file.write(codes[i].tobytes())
+                    scales_file.seek(row * 4)
+                    scales_file.write(scales[i].tobytes())
+            # 记录覆盖的 ID，其他进程加载日志时据此递增 epoch
+            self._append_log("".join(self._log_line("*", ids[i]) for _, i in existing))
+            if labels is not None:
+                self._relabel([ids[i] for _, i in existing], [labels[i] for _, i in existing])
+        
+        if new_rows:
+            self._invalidate()
+            # 从日志记录的行数处写入：写入向量后、追加日志前中断留下的多余行会被覆盖
+            rows = len(self._row_ids)
+            with open(self._vectors_path, "ab") as vectors_file, open(self._scales_path, "ab") as scales_file:
+                vectors_file.truncate(rows * self._row_bytes)
+                scales_file.truncate(rows * 4)
+                vectors_file.write(codes[new_rows].tobytes())
+                scales_file.write(scales[new_rows].tobytes())
+            self._append_log("".join(
+                self._log_line("+", ids[i], labels[i] if labels is not None else None) for i in new_rows
+            ))
+        self.version += 1
+    
+    def _relabel(self, ids: Sequence[str], labels: Sequence[Optional[str]]):
+        """为标签有变化的已有行追加标签日志（调用方需持有写锁）"""
+        changed = [
+            (vector_id, label) for vector_id, label in zip(ids, labels)
+            if vector_id in self._rows and self._row_labels[self._rows[vector_id]] != (label or None)
+        ]
+        if changed:
+            self._append_log("".join(self._log_line("=", vector_id, label or "") for vector_id, label in changed))
+            self.version += 1
+    
+    @staticmethod
+    def _log_line(op: str, vector_id: str, label: Optional[str] = None) -> str:
+        if label is None:
+            return f"{op} {vector_id}\n"
+        # 标签中的换行和制表符会破坏日志格式
+        label = label.replace("\t", " ").replace("\n", " ")
+        return f"{op} {vector_id}\t{label}\n"
+    
+    def _append_log(self, text: str):
+        """追加日志、应用到内存中的映射并推进已加载位置（调用方需持有写锁，日志已加载到文件末尾）"""
+        data = text.encode("utf-8")
+        with open(self._ids_path, "ab") as ids_file:
+            ids_file.write(data)
+        if self._log_file is None:
+            self._log_file = open(self._ids_path, "rb")
+            self._log_inode = os.fstat(self._log_file.fileno()).st_ino
+        self._log_offset += len(data)
+        self._apply_log(text)
+    
+    def get(self, ids: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        读取向量
+        
+        Returns:
+            (存在的 ID 列表, 对应的 float32 矩阵)
+        """
+        with self._lock:
+            found = [vector_id for vector_id in ids if vector_id in self._rows]
+            if not found:
+                return [], np.zeros((0, self.dimension), dtype=np.float32)
+            rows = np.array([self._rows[vector_id] for vector_id in found])
+            codes, scales = self._mapped()
+            return found, dequantize(codes[rows], scales[rows])
+    
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        整个矩阵的只读内存映射
+        
+        Returns:
+            (量化矩阵, 缩放系数, 行号 → ID 列表)，已删除的行 ID 为 None
+        """
+        with self._lock:
+            codes, scales = self._mapped()
+            return codes, scales, list(self._row_ids)
+    
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Optional[str]], int, int]:
+        """
+        检索用的一致快照（先加载其他进程的写入）
+        
+        Returns:
+            (量化矩阵, 缩放系数, 存活行掩码, 行号 → ID 列表, 版本号, epoch)；行号 → ID 列表与内部共用，调用方不能修改
+        """
+        with self._lock:
+            self._load_ids()
+            codes, scales = self._mapped()
+            if self._live is None or self._live[0] != self.version:
+                self._live = (self.version, np.array([vector_id is not None for vector_id in self._row_ids], dtype=bool))
+            return codes, scales, self._live[1], self._row_ids, self.version, self.epoch
+    
+    def rows(self, ids: Sequence[str]) -> np.ndarray:
+        """ID 对应的行号（不存在的 ID 忽略）"""
+        with self._lock:
+            return np.array([self._rows[vector_id] for vector_id in ids if vector_id in self._rows], dtype=np.int64)
+    
+    def compact(self):
+        """重写文件，回收已删除的行（新文件写完后替换，其他进程的映射和读取不受影响）"""
+        with self._write_lock():
+            live_ids = [vector_id for vector_id in self._row_ids if vector_id is not None]
+            live_labels = self.labels(live_ids)
+            codes, scales = self._mapped()
+            rows = self.rows(live_ids)
+            log = "".join(self._log_line("+", vector_id, label) for vector_id, label in zip(live_ids, live_labels))
+            contents = (
+                (self._vectors_path, codes[rows].tobytes()),
+                (self._scales_path, scales[rows].tobytes()),
+                (self._ids_path, log.encode("utf-8")),
+            )
+            # 日志最后替换：其他进程看到新日志时，向量文件已经是新的
+            for path, data in contents:
+                tmp_path = path.with_name(path.name + ".tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            
+            self._invalidate()
+            if self._log_file is not None:
+                self._log_file.close()
+            self._log_file = open(self._ids_path, "rb")
+            self._log_inode = os.fstat(self._log_file.fileno()).st_ino
+            self._log_offset = len(contents[-1][1])
+            self._rows = {vector_id: row for row, vector_id in enumerate(live_ids)}
+            self._row_ids = live_ids
+            self._row_labels = live_labels
+            self.version += 1
+            self.epoch += 1
+    
+    def _mapped(self) -> Tuple[np.ndarray, np.ndarray]:
+        """按当前文件大小映射矩阵（调用方需持有锁）"""
+        if self._codes is None or len(self._codes) != len(self._row_ids):
+            rows = len(self._row_ids)
+            if rows == 0:
+                return np.zeros((0, self.dimension), dtype=self.dtype), np.zeros(0, dtype=np.float32)
+            self._codes = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dimension))
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+        return self._codes, self._scales
+    
+    def _invalidate(self):
+        """写入前释放旧的映射（调用方需持有锁）"""
+        self._codes = None
+        self._scales = None
+
+
+def open_vector_matrix(directory: str, dimension: int, dtype: str = "float32") -> VectorMatrix:
+    """打开向量矩阵，同一进程内相同目录、维度和精度的矩阵只创建一次"""
+    key = (str(Path(directory).resolve()), dimension, dtype)
+    with _shared_lock:
+        matrix = _shared_matrices.get(key)
+        if matrix is None:
+            matrix = VectorMatrix(directory, dimension=dimension, dtype=dtype)
+            _shared_matrices[key] = matrix
+        return matrix
@@ -7,12 +7,17 @@ import requests
 import json
 import random
 from typing import Optional, Dict, List
-from core.config import get_llm
+from core.config import get_env, get_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# 录制回放模式（LLM_REPLAY_MODE=record/replay）下固定随机种子，保证每次运行发出的请求序列一致
+_random_seed = get_env("TEST_RANDOM_SEED") or (None if get_env("LLM_REPLAY_MODE", "off") == "off" else "0")
+if _random_seed is not None:
+    random.seed(int(_random_seed))
+
 
 class CandidateAgent:
     """面试者 Agent - 根据简历和问题生成回答"""
@@ -0,0 +1,71 @@
+"""
+录制回放：多次回放的调用序列和耗时一致，不受 LLM 响应缓存影响
+"""
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import core.config
+import core.llm_cache
+import core.replay
+from core.config import get_llm
+from core.replay import ReplayChatModel, get_cassette
+
+REPLAY_LATENCY = 0.05
+PROMPTS = ["请生成开场白", "请候选人做自我介绍"]
+
+
+@pytest.fixture
+def replay_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_REPLAY_MODE", "replay")
+    monkeypatch.setenv("REPLAY_CASSETTE_DIR", str(tmp_path / "cassettes"))
+    monkeypatch.setenv("REPLAY_LATENCY_SECONDS", str(REPLAY_LATENCY))
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(core.config, "_llm_registry", {})
+    monkeypatch.setattr(core.replay, "_cassettes", {})
+    monkeypatch.setattr(core.llm_cache, "_response_cache", None)
+    
+    # 写入录制：按回放模型的请求哈希保存每条提示词的响应
+    model = ReplayChatModel(model_name="deepseek-chat", temperature=0.3)
+    cassette = get_cassette("llm")
+    for prompt in PROMPTS:
+        cassette.put(model._key([HumanMessage(content=prompt)], None, {}), f"响应：{prompt}")
+    return tmp_path
+
+
+async def replay_run(monkeypatch):
+    """模拟一次独立进程中的回放运行：清空模型注册表，按固定顺序调用，返回 (读取的请求哈希, 响应, 耗时)"""
+    monkeypatch.setattr(core.config, "_llm_registry", {})
+    keys = []
+    original_get = core.replay.Cassette.get
+    
+    def tracking_get(self, key):
+        keys.append(key)
+        return original_get(self, key)
+    
+    monkeypatch.setattr(core.replay.Cassette, "get", tracking_get)
+    try:
+        llm = get_llm(cache=True)
+        start = time.perf_counter()
+        responses = [(await llm.ainvoke(PROMPTS[0])).content]
+        responses.append("".join([chunk.content async for chunk in llm.astream(PROMPTS[1])]))
+        return keys, responses, time.perf_counter() - start
+    finally:
+        monkeypatch.setattr(core.replay.Cassette, "get", original_get)
+
+
+def test_replay_runs_are_reproducible(replay_env, monkeypatch):
+    first_keys, first_responses, first_elapsed = asyncio.run(replay_run(monkeypatch))
+    second_keys, second_responses, second_elapsed = asyncio.run(replay_run(monkeypatch))
+    
+    assert isinstance(get_llm(cache=True), ReplayChatModel)
+    assert second_keys == first_keys and len(first_keys) == len(PROMPTS)
+    assert second_responses == first_responses == [f"响应：{prompt}" for prompt in PROMPTS]
+    # 每次调用都从录制文件返回并等待模拟延迟，第二次回放没有因缓存命中而变快
+    for elapsed in (first_elapsed, second_elapsed):
+        assert elapsed >= REPLAY_LATENCY * len(PROMPTS)
+    assert abs(second_elapsed - first_elapsed) < REPLAY_LATENCY
+    assert not (replay_env / "llm_cache.db").exists()